@@ -0,0 +1,121 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Sequence
+
+import networkx as nx
+
+from analytics import centrality, graph_metrics, sync
+from analytics.cache import LRUCache
+
+MAX_WORKERS = 8
+MAX_BATCH_POSTS = 50
+CACHE_SIZE = 256
+
+_backend_cache = LRUCache(CACHE_SIZE)
+_merged_cache = LRUCache(16)
+
+
+def analyze_one(post_id: str, api_client=None, approx_threshold: int = graph_metrics.DEFAULT_APPROX_THRESHOLD,
+                accuracy: str = centrality.DEFAULT_ACCURACY) -> Optional[Dict]:
+    """Analyse one post locally, falling back to the backend's link analysis.
+
+    Local results are cached by `graph_metrics.analyze_post`; backend results
+    are cached here per dataset version.
+    """
+    analysis = graph_metrics.analyze_post(post_id, approx_threshold, accuracy)
+    if analysis is not None or api_client is None:
+        return analysis
+    return _backend_cache.get_or_compute(
+        (post_id, sync.dataset_version()), lambda: api_client.get_link_analysis(post_id) or None
+    )
+
+
+def analyze_posts(post_ids: Sequence[str], api_client=None,
+                  approx_threshold: int = graph_metrics.DEFAULT_APPROX_THRESHOLD,
+                  accuracy: str = centrality.DEFAULT_ACCURACY, max_workers: int = MAX_WORKERS,
+                  progress: Optional[Callable[[int, int, str], None]] = None) -> Dict[str, Optional[Dict]]:
+    """Analyse many posts concurrently on a bounded thread pool.
+
+    Backend fallbacks are I/O bound and large local graphs hand their
+    centralities to the process pool, so threads keep the page responsive
+    without copying graphs between processes. `progress(done, total, post_id)`
+    is called from the calling thread as each analysis finishes. Failed
+    analyses map to None.
+    """
+    post_ids = list(dict.fromkeys(post_ids))
+    results: Dict[str, Optional[Dict]] = {}
+    if not post_ids:
+        return results
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(post_ids))) as executor:
+        futures = {
+            executor.submit(analyze_one, post_id, api_client, approx_threshold, accuracy): post_id
+            for post_id in post_ids
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            post_id = futures[future]
+            try:
+                results[post_id] = future.result()
+            except Exception:
+                results[post_id] = None
+            if progress is not None:
+                progress(done, len(post_ids), post_id)
+    return {post_id: results[post_id] for post_id in post_ids}
+
+
+def comparison_table(results: Dict[str, Optional[Dict]]) -> List[Dict]:
+    """One row of headline metrics per analysed post."""
+    rows = []
+    for post_id, analysis in results.items():
+        if not analysis:
+            rows.append({'post': post_id, 'status': 'failed'})
+            continue
+        metrics = analysis.get('metrics', {})
+        nodes = analysis.get('nodes', [])
+        top = max(nodes, key=lambda node: node.get('betweenness', 0), default=None)
+        rows.append({
+            'post': post_id,
+            'status': 'ok',
+            'nodes': len(nodes),
+            'edges': len(analysis.get('edges', [])),
+            'users': sum(1 for node in nodes if node.get('type') == 'user'),
+            'density': metrics.get('density', 0.0),
+            'avgDegree': metrics.get('avgDegree', 0.0),
+            'diameter': metrics.get('diameter', 0),
+            'clustering': metrics.get('clustering', 0.0),
+            'modularity': metrics.get('modularity', 0.0),
+            'communities': len(analysis.get('communities', [])),
+            'topBroker': top.get('label', top.get('id')) if top and top.get('betweenness', 0) > 0 else None
+        })
+    return rows
+
+
+def merge_analyses(results: Dict[str, Optional[Dict]],
+                   approx_threshold: int = graph_metrics.DEFAULT_APPROX_THRESHOLD,
+                   accuracy: str = centrality.DEFAULT_ACCURACY) -> Optional[Dict]:
+    """Analyse the union of the per-post graphs; shared users and hashtags become bridges.
+
+    Nodes are matched by id and the weights of edges seen in several posts
+    add up. Cached per set of posts and dataset version.
+    """
+    analysed = {post_id: analysis for post_id, analysis in results.items() if analysis}
+    if not analysed:
+        return None
+
+    def merge() -> Dict:
+        G = nx.Graph()
+        for analysis in analysed.values():
+            for node in analysis.get('nodes', []):
+                if node.get('id') not in G:
+                    G.add_node(node['id'], label=node.get('label', node['id']), type=node.get('type', 'default'))
+            for edge in analysis.get('edges', []):
+                source, target = edge.get('source'), edge.get('target')
+                if source not in G or target not in G or source == target:
+                    continue
+                weight = edge.get('weight', 1) or 1
+                if G.has_edge(source, target):
+                    G[source][target]['weight'] += weight
+                else:
+                    G.add_edge(source, target, type=edge.get('type', 'default'), weight=weight)
+        return graph_metrics.graph_to_analysis(G, None, approx_threshold, accuracy)
+
+    key = (tuple(sorted(analysed)), sync.dataset_version(), approx_threshold, accuracy)
+    return _merged_cache.get_or_compute(key, merge)
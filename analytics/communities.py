@@ -0,0 +1,253 @@
+import re
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import scipy.sparse as sp
+
+from analytics import graph_core, store, sync
+from analytics.cache import LRUCache
+
+RESOLUTION = 1.0
+MAX_LEVELS = 10
+MIN_GAIN = 1e-12
+MAX_LISTED_MEMBERS = 50
+PARTITION_CACHE_SIZE = 8
+
+
+def _local_moving(adjacency: sp.csr_matrix, labels: np.ndarray, active: np.ndarray,
+                  resolution: float, rng: np.random.Generator) -> bool:
+    """Move queued nodes to the neighbouring community with the best modularity gain.
+
+    A node that moves re-queues its neighbours outside its new community, so
+    work stays proportional to the part of the graph that actually changes.
+    Returns True when any node moved.
+    """
+    indptr, indices, data = adjacency.indptr, adjacency.indices, adjacency.data
+    strength = np.asarray(adjacency.sum(axis=1)).ravel()
+    two_m = strength.sum()
+    if two_m <= 0:
+        return False
+    totals = np.bincount(labels, weights=strength, minlength=len(labels))
+
+    queue = deque(rng.permutation(active).tolist())
+    queued = np.zeros(len(labels), dtype=bool)
+    queued[active] = True
+    moved = False
+    while queue:
+        node = queue.popleft()
+        queued[node] = False
+        start, end = indptr[node], indptr[node + 1]
+        neighbours = indices[start:end]
+        weights = data[start:end]
+        not_self = neighbours != node
+        neighbours, weights = neighbours[not_self], weights[not_self]
+        if not len(neighbours):
+            continue
+
+        current = labels[node]
+        k = strength[node]
+        totals[current] -= k
+        candidates, inverse = np.unique(labels[neighbours], return_inverse=True)
+        links = np.bincount(inverse, weights=weights)
+        gains = links - resolution * totals[candidates] * k / two_m
+
+        stay = np.flatnonzero(candidates == current)
+        stay_gain = gains[stay[0]] if len(stay) else -resolution * totals[current] * k / two_m
+        best = int(np.argmax(gains))
+        if gains[best] > stay_gain + MIN_GAIN and candidates[best] != current:
+            target = candidates[best]
+            labels[node] = target
+            moved = True
+            for neighbour in neighbours[labels[neighbours] != target]:
+                if not queued[neighbour]:
+                    queued[neighbour] = True
+                    queue.append(neighbour)
+        totals[labels[node]] += k
+    return moved
+
+
+def _renumber(labels: np.ndarray) -> np.ndarray:
+    return np.unique(labels, return_inverse=True)[1]
+
+
+def louvain(adjacency: sp.spmatrix, initial: Optional[np.ndarray] = None, active: Optional[np.ndarray] = None,
+            resolution: float = RESOLUTION, seed: int = 42) -> np.ndarray:
+    """Louvain modularity optimisation on a symmetric sparse adjacency matrix.
+
+    With `initial`, optimisation warm-starts from that partition and the first
+    local-moving pass only visits `active` nodes (and whatever their moves
+    disturb). Higher levels run on the aggregated community graph, which is
+    small. Returns community labels ordered by decreasing community size.
+    """
+    matrix = sp.csr_matrix(adjacency, dtype=np.float64)
+    n = matrix.shape[0]
+    if not n:
+        return np.zeros(0, dtype=np.int64)
+    rng = np.random.default_rng(seed)
+
+    labels = _renumber(initial) if initial is not None else np.arange(n)
+    if active is None or initial is None:
+        active = np.arange(n)
+    membership = np.arange(n)
+    graph = matrix
+    for _ in range(MAX_LEVELS):
+        moved = _local_moving(graph, labels, np.asarray(active, dtype=np.int64), resolution, rng)
+        labels = _renumber(labels)
+        membership = labels[membership]
+        if (not moved and graph is not matrix) or labels.max() + 1 == graph.shape[0]:
+            break
+        indicator = sp.csr_matrix((np.ones(len(labels)), (np.arange(len(labels)), labels)))
+        graph = (indicator.T @ graph @ indicator).tocsr()
+        labels = np.arange(graph.shape[0])
+        active = labels
+
+    # Largest community first, matching how the network page lists them.
+    sizes = np.bincount(membership)
+    order = np.argsort(-sizes, kind='stable')
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return rank[membership]
+
+
+def modularity(adjacency: sp.spmatrix, labels: np.ndarray, resolution: float = RESOLUTION) -> float:
+    """Newman modularity of a partition of a symmetric weighted graph."""
+    matrix = sp.csr_matrix(adjacency, dtype=np.float64)
+    two_m = matrix.sum()
+    if two_m <= 0:
+        return 0.0
+    return float(sum(metric['modularity'] for metric in community_metrics(matrix, labels, resolution)))
+
+
+def community_metrics(adjacency: sp.spmatrix, labels: np.ndarray, resolution: float = RESOLUTION) -> List[Dict]:
+    """Size, internal weight, edge density and modularity contribution of every community."""
+    matrix = sp.csr_matrix(adjacency, dtype=np.float64)
+    n_communities = int(labels.max()) + 1 if len(labels) else 0
+    coo = sp.triu(matrix, k=1).tocoo()
+    internal = labels[coo.row] == labels[coo.col]
+    internal_edges = np.bincount(labels[coo.row[internal]], minlength=n_communities)
+    internal_weight = np.bincount(labels[coo.row[internal]], weights=coo.data[internal], minlength=n_communities)
+    internal_weight += np.bincount(labels, weights=matrix.diagonal(), minlength=n_communities)
+
+    strength = np.asarray(matrix.sum(axis=1)).ravel()
+    totals = np.bincount(labels, weights=strength, minlength=n_communities)
+    sizes = np.bincount(labels, minlength=n_communities)
+    two_m = strength.sum()
+    possible = sizes * (sizes - 1) / 2
+    density = np.divide(internal_edges, possible, out=np.zeros(n_communities), where=possible > 0)
+    if two_m > 0:
+        contribution = 2 * internal_weight / two_m - resolution * (totals / two_m) ** 2
+    else:
+        contribution = np.zeros(n_communities)
+    return [
+        {
+            'size': int(sizes[c]),
+            'density': float(density[c]),
+            'modularity': float(contribution[c]),
+            'internalWeight': float(internal_weight[c])
+        }
+        for c in range(n_communities)
+    ]
+
+
+def _slug(kind: str, min_weight: float) -> str:
+    return f"communities/{re.sub(r'[^a-z0-9]+', '_', kind.lower()).strip('_')}_w{min_weight:g}"
+
+
+class Partition:
+    """Communities of one network, with metrics and a few members of each."""
+
+    def __init__(self, kind: str, min_weight: float, names: np.ndarray, labels: np.ndarray,
+                 strength: np.ndarray, metrics: List[Dict], members: List[List[str]],
+                 warm_started: bool, changed_nodes: int):
+        self.kind = kind
+        self.min_weight = min_weight
+        self.names = names
+        self.labels = labels
+        self.strength = strength
+        self.metrics = metrics
+        self.members = members
+        self.modularity = float(sum(metric['modularity'] for metric in metrics))
+        self.warm_started = warm_started
+        self.changed_nodes = changed_nodes
+        self.computed_at = datetime.now()
+
+    def summary(self, limit: int = 10) -> List[Dict]:
+        """Return the largest communities with their metrics and leading members."""
+        return [
+            {'community': c, **self.metrics[c], 'topMembers': self.members[c][:5]}
+            for c in range(min(limit, len(self.metrics)))
+        ]
+
+
+def _node_names(graph: graph_core.SparseGraph) -> np.ndarray:
+    return np.array([f"{node_type}:{label}" for node_type, label in zip(graph.types, graph.labels)], dtype=object)
+
+
+def _top_members(graph: graph_core.SparseGraph, labels: np.ndarray, n_communities: int) -> List[List[str]]:
+    """Labels of each community's highest-strength members."""
+    strength = graph.degree(weighted=True)
+    order = np.lexsort((-strength, labels))
+    starts = np.searchsorted(labels[order], np.arange(n_communities))
+    ends = np.searchsorted(labels[order], np.arange(n_communities), side='right')
+    return [
+        [str(graph.labels[node]) for node in order[start:min(end, start + MAX_LISTED_MEMBERS)]]
+        for start, end in zip(starts, ends)
+    ]
+
+
+_partition_cache = LRUCache(PARTITION_CACHE_SIZE)
+_partition_lock = threading.Lock()
+
+
+def compute_partition(kind: str, min_weight: float, graph: graph_core.SparseGraph) -> Partition:
+    """Optimise communities, warm-starting from the persisted partition when there is one."""
+    names = _node_names(graph)
+    strength = graph.degree(weighted=True)
+    previous = store.load_state(_slug(kind, min_weight))
+
+    initial = active = None
+    warm_started = False
+    changed_nodes = graph.n_nodes
+    if isinstance(previous, Partition) and len(previous.names):
+        previous_index = {name: i for i, name in enumerate(previous.names)}
+        positions = np.array([previous_index.get(name, -1) for name in names], dtype=np.int64)
+        known = positions >= 0
+        if known.mean() >= 0.5:
+            # New nodes start alone; nodes whose weighted degree changed gained edges.
+            initial = np.where(known, previous.labels[np.maximum(positions, 0)], -1)
+            initial[~known] = previous.labels.max() + 1 + np.arange(int((~known).sum()))
+            changed = ~known | ~np.isclose(strength, previous.strength[np.maximum(positions, 0)])
+            active = np.flatnonzero(changed)
+            warm_started = True
+            changed_nodes = len(active)
+
+    labels = louvain(graph.adjacency, initial, active)
+
+    n_communities = int(labels.max()) + 1 if len(labels) else 0
+    partition = Partition(
+        kind, min_weight, names, labels, strength,
+        community_metrics(graph.adjacency, labels),
+        _top_members(graph, labels, n_communities),
+        warm_started, changed_nodes
+    )
+    store.save_state(_slug(kind, min_weight), partition)
+    return partition
+
+
+def get_partition(kind: str, min_weight: float = graph_core.DEFAULT_MIN_WEIGHT) -> Optional[Partition]:
+    """Return the communities of a network built from synced data, updated incrementally."""
+    graph = graph_core.build_network(kind, min_weight)
+    if graph is None or not graph.n_nodes:
+        return None
+    with _partition_lock:
+        key = (kind, min_weight, sync.dataset_version())
+        return _partition_cache.get_or_compute(key, lambda: compute_partition(kind, min_weight, graph))
+
+
+def load_partition(kind: str, min_weight: float = graph_core.DEFAULT_MIN_WEIGHT) -> Optional[Partition]:
+    """Return the last persisted partition of a network without recomputing it."""
+    partition = store.load_state(_slug(kind, min_weight))
+    return partition if isinstance(partition, Partition) else None
@@ -0,0 +1,353 @@
+import os
+import threading
+from array import array
+from datetime import datetime
+from itertools import combinations_with_replacement
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import scipy.sparse as sp
+
+from analytics import graph_core, records, store, sync
+from analytics.cache import LRUCache
+
+STATE_DIR = "cooccurrence"
+DEFAULT_LIMIT = 10
+# Pending pairs are folded into the base matrix once they outnumber this
+# share of its stored entries (and at least MIN_COMPACT_PAIRS).
+COMPACT_RATIO = 0.25
+MIN_COMPACT_PAIRS = 100000
+
+_BASE_ARRAYS = ('indptr', 'indices', 'data')
+# Dated pairs of distinct tags, one (day, row, col) file per month of post time
+DATED_DIR = "dated"
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _path(name: str) -> str:
+    return store.data_path(f"{STATE_DIR}/{name}")
+
+
+def _read_pairs(generation: int) -> np.ndarray:
+    """Read the (row, col) pairs appended since the base of a generation was written."""
+    try:
+        pairs = np.fromfile(_path(f"pairs-{generation}.bin"), dtype=np.int32)
+    except FileNotFoundError:
+        return np.empty((0, 2), dtype=np.int32)
+    # A pair cut short by a crash is dropped.
+    return pairs[:len(pairs) // 2 * 2].reshape(-1, 2)
+
+
+def _day(timestamp: datetime) -> int:
+    """Days since the epoch of a naive UTC time."""
+    return (timestamp - _EPOCH).days
+
+
+def _month(day: int) -> int:
+    """Months since the epoch of a day number, naming its dated-pairs file."""
+    return int(np.datetime64(day, 'D').astype('datetime64[M]').astype(np.int64))
+
+
+def _dated_months() -> List[int]:
+    """Months that have a dated-pairs file, oldest first."""
+    folder = os.path.dirname(_path(f"{DATED_DIR}/pairs-0.bin"))
+    return sorted(int(name[len('pairs-'):-len('.bin')]) for name in os.listdir(folder)
+                  if name.startswith('pairs-') and name.endswith('.bin'))
+
+
+def _read_dated(month: int) -> np.ndarray:
+    """The (day, row, col) triples of one month; a triple cut short by a crash is dropped."""
+    triples = np.fromfile(_path(f"{DATED_DIR}/pairs-{month}.bin"), dtype=np.int32)
+    return triples[:len(triples) // 3 * 3].reshape(-1, 3)
+
+
+def _ranked(rows: np.ndarray, cols: np.ndarray, counts: np.ndarray, names: List[str], limit: int, offset: int,
+            min_count: int, max_count: Optional[int]) -> List[Dict]:
+    """Ranks [offset, offset + limit) of pairs sorted by descending count, within a count range."""
+    # Counts are sorted descending, so a count range is a contiguous slice.
+    lo = 0 if max_count is None else int(np.searchsorted(-counts, -max_count, side='left'))
+    hi = int(np.searchsorted(-counts, -min_count, side='right'))
+    start, end = lo + offset, min(lo + offset + limit, hi)
+    return [{
+        'source': f"#{names[a]}",
+        'target': f"#{names[b]}",
+        'count': int(count)
+    } for a, b, count in zip(rows[start:end], cols[start:end], counts[start:end])]
+
+
+def _symmetric(rows: np.ndarray, cols: np.ndarray, n: int) -> sp.csr_matrix:
+    """Symmetric count matrix from upper-triangle pairs; diagonal pairs count once."""
+    off = rows != cols
+    data = np.ones(len(rows) + int(np.count_nonzero(off)), dtype=np.int64)
+    return sp.csr_matrix(
+        (data, (np.concatenate([rows, cols[off]]), np.concatenate([cols, rows[off]]))), shape=(n, n)
+    )
+
+
+def _resize(matrix: sp.csr_matrix, n: int) -> sp.csr_matrix:
+    """Pad a square CSR matrix with empty rows and columns up to n x n without copying its data."""
+    indptr = np.concatenate([matrix.indptr, np.full(n - matrix.shape[0], matrix.indptr[-1])])
+    return sp.csr_matrix((matrix.data, matrix.indices, indptr), shape=(n, n), copy=False)
+
+
+class HashtagCooccurrence:
+    """Symmetric hashtag x hashtag matrix counting the posts that use both tags.
+
+    The diagonal holds how many posts use each tag. The matrix is a base CSR
+    memory-mapped from disk plus the pairs synced since it was written, which
+    are appended to a binary log as they arrive; once the log grows past a
+    share of the base both are folded into a new base generation. Hashtags
+    are interned in an append-only vocabulary, so ids are stable on disk.
+
+    For time-range queries, the pairs of distinct tags are also logged with
+    the day of their post, in one file per month, so a range reads only its
+    months. Posts are dated separately from counting, so posts counted
+    before dating existed are dated when they next sync.
+    """
+
+    def __init__(self):
+        self.vocabulary = graph_core.Vocabulary()
+        for name in store.read_lines(f"{STATE_DIR}/hashtags.txt"):
+            self.vocabulary.intern(name)
+        self.generation = store.load_state(f"{STATE_DIR}/generation", 0)
+        self.base = self._map_base(self.generation)
+        pairs = _read_pairs(self.generation)
+        self._pending_rows = array('i', pairs[:, 0].tolist())
+        self._pending_cols = array('i', pairs[:, 1].tolist())
+        self._seen = store.SeenIds(f"{STATE_DIR}/posts")
+        self._dated_seen = store.SeenIds(f"{STATE_DIR}/{DATED_DIR}/posts")
+        self._views = LRUCache(8)
+        self.version = 0
+        self.dated_version = 0
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.vocabulary)
+
+    def _map_base(self, generation: int) -> sp.csr_matrix:
+        if not generation:
+            return sp.csr_matrix((0, 0), dtype=np.int64)
+        indptr, indices, data = (store.load_array(f"{STATE_DIR}/base-{generation}-{name}")
+                                 for name in _BASE_ARRAYS)
+        n = len(indptr) - 1
+        return sp.csr_matrix((data, indices, indptr), shape=(n, n), copy=False)
+
+    def add_posts(self, posts: List[Dict]) -> int:
+        """Count the hashtag pairs of posts not seen before and return how many posts had tags."""
+        with self._lock:
+            undated = self._dated_seen.filter_new(posts)
+            posts = self._seen.filter_new(posts)
+            n_known = len(self.vocabulary)
+            rows, cols = array('i'), array('i')
+            tagged = 0
+            for post in posts:
+                tags = sorted(set(self.vocabulary.intern(tag) for tag in records.post_hashtags(post)))
+                if tags:
+                    tagged += 1
+                for a, b in combinations_with_replacement(tags, 2):
+                    rows.append(a)
+                    cols.append(b)
+
+            dated = {}
+            for post in undated:
+                timestamp = records.parse_timestamp(post.get('timestamp'))
+                tags = sorted(set(self.vocabulary.intern(tag) for tag in records.post_hashtags(post)))
+                if timestamp is None or len(tags) < 2:
+                    continue
+                day = _day(timestamp)
+                triples = dated.setdefault(_month(day), array('i'))
+                for i, a in enumerate(tags):
+                    for b in tags[i + 1:]:
+                        triples.extend((day, a, b))
+
+            # The vocabulary goes to disk before any pair that refers to it.
+            if len(self.vocabulary) > n_known:
+                store.append_lines(f"{STATE_DIR}/hashtags.txt", self.vocabulary.names[n_known:])
+            if rows:
+                with open(_path(f"pairs-{self.generation}.bin"), 'ab') as f:
+                    np.column_stack([np.frombuffer(rows, dtype=np.int32),
+                                     np.frombuffer(cols, dtype=np.int32)]).tofile(f)
+                self._pending_rows.extend(rows)
+                self._pending_cols.extend(cols)
+                self.version += 1
+                if len(self._pending_rows) > max(MIN_COMPACT_PAIRS, COMPACT_RATIO * self.base.nnz):
+                    self._compact()
+            for month, triples in dated.items():
+                with open(_path(f"{DATED_DIR}/pairs-{month}.bin"), 'ab') as f:
+                    np.frombuffer(triples, dtype=np.int32).tofile(f)
+            if dated:
+                self.dated_version += 1
+            self._seen.mark(post['id'] for post in posts)
+            self._dated_seen.mark(post['id'] for post in undated)
+            return tagged
+
+    def _pending(self) -> sp.csr_matrix:
+        """Symmetric matrix of the pairs not folded into the base yet."""
+        def build():
+            with self._lock:
+                return _symmetric(np.frombuffer(self._pending_rows, dtype=np.int32),
+                                  np.frombuffer(self._pending_cols, dtype=np.int32), len(self.vocabulary))
+
+        return self._views.get_or_compute(('pending', self.generation, self.version), build)
+
+    def matrix(self) -> sp.csr_matrix:
+        """The full co-occurrence matrix: base plus pending pairs."""
+        def build():
+            with self._lock:
+                merged = _resize(self.base, len(self.vocabulary)) + self._pending()
+                return merged.tocsr()
+
+        return self._views.get_or_compute(('matrix', self.generation, self.version), build)
+
+    def _compact(self):
+        """Fold the pending pairs into a new base generation (caller holds the lock)."""
+        merged = self.matrix()
+        generation = self.generation + 1
+        for name in _BASE_ARRAYS:
+            store.save_array(f"{STATE_DIR}/base-{generation}-{name}", getattr(merged, name))
+        # Switching the generation is the commit point; until then the old base and log stay valid.
+        store.save_state(f"{STATE_DIR}/generation", generation)
+        old = self.generation
+        self.generation = generation
+        self.base = self._map_base(generation)
+        self._pending_rows, self._pending_cols = array('i'), array('i')
+        self._views.clear()
+        for name in [f"base-{old}-{array_name}.npy" for array_name in _BASE_ARRAYS] + [f"pairs-{old}.bin"]:
+            store.remove(f"{STATE_DIR}/{name}")
+
+    def _row(self, tag_id: int) -> sp.csr_matrix:
+        """One row of the matrix, read from the mapped base and the pending pairs only."""
+        with self._lock:
+            n = len(self.vocabulary)
+            row = self._pending()[tag_id]
+            if tag_id < self.base.shape[0]:
+                start, end = self.base.indptr[tag_id], self.base.indptr[tag_id + 1]
+                row = row + sp.csr_matrix(
+                    (self.base.data[start:end], self.base.indices[start:end], [0, end - start]), shape=(1, n)
+                )
+            return row.tocsr()
+
+    def _tag_id(self, tag: str) -> Optional[int]:
+        return self.vocabulary.index.get(tag.lstrip('#').lower())
+
+    def tag_counts(self) -> np.ndarray:
+        """How many posts use each hashtag, by vocabulary id."""
+        def count():
+            with self._lock:
+                counts = np.zeros(len(self.vocabulary), dtype=np.int64)
+                counts[:self.base.shape[0]] = self._views.get_or_compute(
+                    ('base_counts', self.generation), self.base.diagonal
+                )
+                rows = np.frombuffer(self._pending_rows, dtype=np.int32)
+                diagonal = rows[rows == np.frombuffer(self._pending_cols, dtype=np.int32)]
+                return counts + np.bincount(diagonal, minlength=len(counts))
+
+        return self._views.get_or_compute(('counts', self.generation, self.version), count)
+
+    def top_hashtags(self, limit: int = DEFAULT_LIMIT) -> List[Dict]:
+        """The most used hashtags with the number of posts using each."""
+        counts = self.tag_counts()
+        top = _top_indices(counts, limit)
+        return [{'hashtag': f"#{self.vocabulary.names[i]}", 'count': int(counts[i])} for i in top if counts[i]]
+
+    def related(self, tag: str, limit: int = DEFAULT_LIMIT) -> List[Dict]:
+        """Hashtags used most often together with `tag`.
+
+        `share` is the fraction of the posts using `tag` that also use the
+        related hashtag.
+        """
+        tag_id = self._tag_id(tag)
+        if tag_id is None:
+            return []
+        row = self._row(tag_id)
+        uses = row[0, tag_id]
+        others = row.indices != tag_id
+        indices, counts = row.indices[others], row.data[others]
+        top = _top_indices(counts, limit)
+        return [{
+            'hashtag': f"#{self.vocabulary.names[indices[i]]}",
+            'count': int(counts[i]),
+            'share': float(counts[i] / uses) if uses else 0.0
+        } for i in top]
+
+    def suggest(self, tags: Sequence[str], limit: int = DEFAULT_LIMIT) -> List[str]:
+        """Hashtags that co-occur most with all of `tags` together, best first."""
+        tag_ids = [tag_id for tag_id in (self._tag_id(tag) for tag in tags) if tag_id is not None]
+        if not tag_ids:
+            return []
+        rows = [self._row(tag_id) for tag_id in tag_ids]
+        # Ranked by the weakest link so every given tag supports the suggestion.
+        scores = rows[0]
+        for row in rows[1:]:
+            scores = scores.minimum(row)
+        scores = scores.toarray().ravel()
+        scores[tag_ids] = 0
+        return [f"#{self.vocabulary.names[i]}" for i in _top_indices(scores, limit) if scores[i] > 0]
+
+    def _range_pairs(self, first_day: int, end_day: int):
+        """Distinct-tag pairs of posts dated in days [first_day, end_day), by descending count."""
+        with self._lock:
+            months = [month for month in _dated_months() if _month(first_day) <= month <= _month(end_day - 1)]
+            triples = np.concatenate([_read_dated(month) for month in months] or [np.empty((0, 3), np.int32)])
+        triples = triples[(triples[:, 0] >= first_day) & (triples[:, 0] < end_day)]
+        keys, counts = np.unique(triples[:, 1].astype(np.int64) << 32 | triples[:, 2], return_counts=True)
+        order = np.argsort(-counts, kind='stable')
+        keys = keys[order]
+        return (keys >> 32).astype(np.int32), (keys & 0xffffffff).astype(np.int32), counts[order]
+
+    def top_pairs(self, limit: int = DEFAULT_LIMIT, offset: int = 0, min_count: int = 1,
+                  max_count: Optional[int] = None, start: Optional[datetime] = None,
+                  end: Optional[datetime] = None) -> List[Dict]:
+        """Hashtag pairs ranked by co-occurrence, ranks [offset, offset + limit) within a count range.
+
+        With `start` or `end` (naive UTC), only posts dated in that time
+        range count, at day resolution: every day overlapping it is included.
+        """
+        if start is None and end is None:
+            def upper():
+                pairs = sp.triu(self.matrix(), k=1).tocoo()
+                order = np.argsort(-pairs.data, kind='stable')
+                return pairs.row[order], pairs.col[order], pairs.data[order]
+
+            rows, cols, counts = self._views.get_or_compute(('pairs', self.generation, self.version), upper)
+        else:
+            first_day = _day(start) if start is not None else np.iinfo(np.int32).min
+            end_day = -(-(end - _EPOCH).total_seconds() // 86400) if end is not None else np.iinfo(np.int32).max
+            first_day, end_day = int(first_day), int(end_day)
+            rows, cols, counts = self._views.get_or_compute(
+                ('range_pairs', first_day, end_day, self.dated_version),
+                lambda: self._range_pairs(first_day, end_day)
+            )
+        return _ranked(rows, cols, counts, self.vocabulary.names, limit, offset, min_count, max_count)
+
+    def graph(self, min_weight: float = graph_core.DEFAULT_MIN_WEIGHT) -> graph_core.SparseGraph:
+        """The Hashtag Network built straight from the matrix."""
+        matrix = self.matrix()
+        return graph_core.hashtag_network(matrix, self.vocabulary.names[:matrix.shape[0]], min_weight)
+
+
+def _top_indices(values: np.ndarray, limit: int) -> np.ndarray:
+    """Indices of the `limit` largest values, largest first."""
+    if limit <= 0 or not len(values):
+        return np.empty(0, dtype=np.int64)
+    if len(values) > limit:
+        top = np.argpartition(-values, limit - 1)[:limit]
+    else:
+        top = np.arange(len(values))
+    return top[np.argsort(-values[top], kind='stable')]
+
+
+_index: Optional[HashtagCooccurrence] = None
+_index_lock = threading.Lock()
+
+
+def get_cooccurrence() -> HashtagCooccurrence:
+    """Return the process-wide co-occurrence matrix, memory-mapping it on first use."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = HashtagCooccurrence()
+        return _index
+
+
+sync.posts_log.register('cooccurrence', lambda posts: get_cooccurrence().add_posts(posts))
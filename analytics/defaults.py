@@ -0,0 +1,32 @@
+"""Defaults of the network analysis settings.
+
+Kept free of heavy imports so the Network Graph page can show its settings
+before networkx, scipy or the analysis modules are loaded.
+"""
+
+# Path metrics (diameter, path length, efficiency) are sampled above this many nodes
+DEFAULT_APPROX_THRESHOLD = 2000
+
+# Each level trades sampled BFS sources ("pivots") and power-iteration
+# tolerance for speed. Graphs with no more nodes than the pivot count are
+# computed exactly.
+ACCURACY_LEVELS = {
+    'Fast': {'pivots': 64, 'tol': 1e-4},
+    'Balanced': {'pivots': 256, 'tol': 1e-6},
+    'Accurate': {'pivots': 1024, 'tol': 1e-8},
+    'Exact': {'pivots': None, 'tol': 1e-10}
+}
+DEFAULT_ACCURACY = 'Balanced'
+
+# Level of detail: larger graphs are drawn with communities collapsed
+RENDER_NODE_BUDGET = 300
+
+# Post neighbourhoods
+DEFAULT_HOPS = 2
+DEFAULT_FAN_OUT = 25
+NEIGHBOURHOOD_NODE_BUDGET = 500
+MAX_HOPS = 4
+
+# Aggregate networks
+DEFAULT_MIN_WEIGHT = 1
+DEFAULT_MAX_VIEW_NODES = 2000
@@ -0,0 +1,112 @@
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+LTTB = 'lttb'
+MIN_MAX = 'min-max'
+METHODS = (LTTB, MIN_MAX)
+
+DEFAULT_CHART_WIDTH_PX = 600
+# Min/max reduction keeps two points (the low and the high) per pixel column.
+POINTS_PER_PIXEL = 2
+MIN_POINTS = 50
+
+
+def points_for_width(width_px: int = DEFAULT_CHART_WIDTH_PX) -> int:
+    """Point budget of one trace drawn `width_px` pixels wide."""
+    return max(MIN_POINTS, int(width_px * POINTS_PER_PIXEL))
+
+
+def _as_float(x) -> np.ndarray:
+    """x values as floats; dates become epoch nanoseconds."""
+    x = np.asarray(x)
+    if x.dtype == object:
+        x = pd.to_datetime(x).to_numpy()
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype('datetime64[ns]').astype(np.int64).astype(float)
+    return x.astype(float)
+
+
+def lttb_indices(x, y, max_points: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: indices of `max_points` points keeping the series' visual shape.
+
+    The first and last points are always kept; from each bucket in between
+    the point forming the largest triangle with the previously kept point and
+    the next bucket's average is chosen, so spikes survive.
+    """
+    n = len(y)
+    if n <= max_points:
+        return np.arange(n)
+    if max_points < 3:
+        return np.array([0, n - 1])
+
+    x, y = _as_float(x), np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for i in range(max_points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_hi = edges[i + 2] if i + 2 < len(edges) else n
+        next_x, next_y = x[hi:next_hi].mean(), y[hi:next_hi].mean()
+        areas = np.abs((x[previous] - next_x) * (y[lo:hi] - y[previous])
+                       - (x[previous] - x[lo:hi]) * (next_y - y[previous]))
+        previous = lo + int(np.argmax(areas))
+        selected[i + 1] = previous
+    return selected
+
+
+def min_max_indices(y, max_points: int) -> np.ndarray:
+    """Indices of the lowest and highest point of each bucket, plus the first and last points.
+
+    Every local extreme at bucket resolution is kept exactly, so peaks are
+    never flattened. Buckets are equal runs of points, which matches
+    evenly spaced series such as the time rollups.
+    """
+    n = len(y)
+    if n <= max_points:
+        return np.arange(n)
+
+    y = np.asarray(y, dtype=float)
+    n_buckets = max(1, (max_points - 2) // 2)
+    edges = np.linspace(1, n - 1, n_buckets + 1).astype(np.int64)
+    selected = [0, n - 1]
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        if hi > lo:
+            selected.append(lo + int(np.argmin(y[lo:hi])))
+            selected.append(lo + int(np.argmax(y[lo:hi])))
+    return np.unique(selected)
+
+
+def downsample_indices(x, y, max_points: int, method: str = MIN_MAX) -> np.ndarray:
+    """Sorted indices of at most `max_points` points of one trace."""
+    if method == LTTB:
+        return lttb_indices(x, y, max_points)
+    if method == MIN_MAX:
+        return min_max_indices(y, max_points)
+    raise ValueError(f"Unknown downsampling method: {method}")
+
+
+def downsample_frame(frame: pd.DataFrame, x: str, y: str, max_points: Optional[int] = None,
+                     method: str = MIN_MAX) -> pd.DataFrame:
+    """The rows of `frame` kept when trace `y` over `x` is capped at `max_points` points."""
+    max_points = max_points or points_for_width()
+    if len(frame) <= max_points:
+        return frame
+    return frame.iloc[downsample_indices(frame[x].to_numpy(), frame[y].to_numpy(), max_points, method)]
+
+
+def downsample_traces(frame: pd.DataFrame, x: str, ys: Sequence[str], max_points: Optional[int] = None,
+                      method: str = MIN_MAX) -> pd.DataFrame:
+    """Several traces sharing `x`, each capped separately, in long format (x, 'variable', 'value').
+
+    Each trace keeps its own peaks, so the result is plotted with
+    `color='variable'` rather than as wide columns.
+    """
+    max_points = max_points or points_for_width()
+    traces = []
+    for y in ys:
+        trace = downsample_frame(frame[[x, y]], x, y, max_points, method)
+        traces.append(pd.DataFrame({x: trace[x].to_numpy(), 'variable': y, 'value': trace[y].to_numpy()}))
+    return pd.concat(traces, ignore_index=True) if traces else pd.DataFrame(columns=[x, 'variable', 'value'])
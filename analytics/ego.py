@@ -0,0 +1,101 @@
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+
+from analytics import graph_core, sync
+from analytics.cache import LRUCache
+from analytics.defaults import DEFAULT_FAN_OUT, DEFAULT_HOPS, MAX_HOPS
+from analytics.defaults import NEIGHBOURHOOD_NODE_BUDGET as DEFAULT_NODE_BUDGET
+CACHE_SIZE = 64
+
+_ego_cache = LRUCache(CACHE_SIZE)
+_full_network_info = LRUCache(4)
+
+
+def _top_neighbours(adjacency: sp.csr_matrix, strength: np.ndarray, node: int,
+                    fan_out: int) -> Tuple[np.ndarray, np.ndarray]:
+    """The `fan_out` heaviest neighbours of a node, ties going to better-connected neighbours."""
+    start, end = adjacency.indptr[node], adjacency.indptr[node + 1]
+    neighbours = adjacency.indices[start:end]
+    weights = adjacency.data[start:end]
+    if len(neighbours) > fan_out:
+        # Preselect by weight, then rank only the candidates that can make the cut.
+        cutoff = np.partition(weights, len(weights) - fan_out)[len(weights) - fan_out]
+        candidates = np.flatnonzero(weights >= cutoff)
+        order = candidates[np.lexsort((-strength[neighbours[candidates]], -weights[candidates]))[:fan_out]]
+        neighbours, weights = neighbours[order], weights[order]
+    return neighbours, weights
+
+
+def extract(graph: graph_core.SparseGraph, seed: int, hops: int = DEFAULT_HOPS,
+            fan_out: int = DEFAULT_FAN_OUT, node_budget: int = DEFAULT_NODE_BUDGET,
+            strength: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Nodes within `hops` of `seed` and the hop each was reached at, seed first.
+
+    Every expanded node contributes at most `fan_out` neighbours (its heaviest
+    edges), and expansion stops once `node_budget` nodes are collected, so
+    the cost depends on the caps rather than on the seed's degree. Within a
+    hop, candidates reached through heavier edges are taken first. Pass the
+    graph's weighted degree as `strength` to avoid recomputing it per call.
+    """
+    adjacency = graph.adjacency
+    if strength is None:
+        strength = graph.degree(weighted=True)
+    seen = {seed}
+    nodes = [seed]
+    levels = [0]
+    frontier = [seed]
+    for hop in range(1, hops + 1):
+        if not frontier or len(nodes) >= node_budget:
+            break
+        reached = [_top_neighbours(adjacency, strength, node, fan_out) for node in frontier]
+        candidates = np.concatenate([neighbours for neighbours, _ in reached])
+        weights = np.concatenate([weights for _, weights in reached])
+        order = np.lexsort((-strength[candidates], -weights))
+        frontier = []
+        for node in candidates[order].tolist():
+            if node in seen:
+                continue
+            seen.add(node)
+            nodes.append(node)
+            levels.append(hop)
+            frontier.append(node)
+            if len(nodes) >= node_budget:
+                break
+    return np.array(nodes, dtype=np.int64), np.array(levels, dtype=np.int64)
+
+
+def _network_info(graph: graph_core.SparseGraph, min_weight: float) -> Tuple[int, np.ndarray]:
+    """Index of the first post node (users come first) and weighted degrees of a full network."""
+    key = (min_weight, sync.dataset_version())
+    return _full_network_info.get_or_compute(
+        key, lambda: (int(np.count_nonzero(graph.types == 'user')), graph.degree(weighted=True))
+    )
+
+
+def post_ego_network(post_id: str, hops: int = DEFAULT_HOPS, fan_out: int = DEFAULT_FAN_OUT,
+                     node_budget: int = DEFAULT_NODE_BUDGET,
+                     min_weight: float = graph_core.DEFAULT_MIN_WEIGHT) -> Optional[Dict]:
+    """The k-hop neighbourhood of a post in the full network: authors, commenters, their posts, hashtags.
+
+    Returns {'graph': SparseGraph, 'hops': hop of each node} with the post as
+    node 0, memoised per (post, hops, caps, dataset version); None when the
+    post is not part of the synced full network.
+    """
+    hops = max(0, min(int(hops), MAX_HOPS))
+
+    def build() -> Optional[Dict]:
+        graph = graph_core.build_network(graph_core.FULL_NETWORK, min_weight)
+        row = graph_core.graph_store.posts.index.get(post_id)
+        if graph is None or row is None:
+            return None
+        post_offset, strength = _network_info(graph, min_weight)
+        seed = post_offset + row
+        if seed >= graph.n_nodes:
+            return None
+        nodes, levels = extract(graph, seed, hops, fan_out, node_budget, strength)
+        return {'graph': graph.subgraph(nodes), 'hops': levels}
+
+    key = (post_id, hops, fan_out, node_budget, min_weight, sync.dataset_version())
+    return _ego_cache.get_or_compute(key, build)
@@ -0,0 +1,316 @@
+import threading
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse import csgraph
+
+from analytics import records, sync
+from analytics.cache import LRUCache
+from analytics.defaults import DEFAULT_MAX_VIEW_NODES, DEFAULT_MIN_WEIGHT
+
+USER_NETWORK = "User Network"
+HASHTAG_NETWORK = "Hashtag Network"
+FULL_NETWORK = "Full Network"
+
+# Hashtags used by more users than this are left out of the user co-hashtag
+# projection: they connect almost everyone and make the product quadratic.
+MAX_PROJECTION_HASHTAG_USERS = 1000
+GRAPH_CACHE_SIZE = 8
+
+EDGE_TYPES = {
+    ('user', 'user'): 'interacts',
+    ('hashtag', 'hashtag'): 'co-occurs',
+    ('post', 'user'): 'posts',
+    ('hashtag', 'post'): 'contains',
+}
+
+
+class Vocabulary:
+    """Interned names mapped to dense integer ids."""
+
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+        self.names: List[str] = []
+
+    def __len__(self):
+        return len(self.names)
+
+    def intern(self, name: str) -> int:
+        """Return the id of `name`, assigning the next id if it is new."""
+        node_id = self.index.get(name)
+        if node_id is None:
+            node_id = len(self.names)
+            self.index[name] = node_id
+            self.names.append(name)
+        return node_id
+
+
+class SparseGraph:
+    """Undirected weighted graph stored as a symmetric CSR adjacency matrix."""
+
+    def __init__(self, adjacency: sp.csr_matrix, labels: np.ndarray, types: np.ndarray):
+        self.adjacency = adjacency.tocsr().astype(np.float32)
+        self.adjacency.sum_duplicates()
+        self.labels = labels
+        self.types = types
+
+    @property
+    def n_nodes(self) -> int:
+        return self.adjacency.shape[0]
+
+    @property
+    def n_edges(self) -> int:
+        self_loops = np.count_nonzero(self.adjacency.diagonal())
+        return int((self.adjacency.nnz - self_loops) // 2 + self_loops)
+
+    def degree(self, weighted: bool = False) -> np.ndarray:
+        """Return the (optionally weighted) degree of every node."""
+        if weighted:
+            return np.asarray(self.adjacency.sum(axis=1)).ravel()
+        return np.diff(self.adjacency.indptr)
+
+    def edges(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return each undirected edge once as (sources, targets, weights)."""
+        upper = sp.triu(self.adjacency, k=1).tocoo()
+        return upper.row, upper.col, upper.data
+
+    def edge_types(self, sources: np.ndarray, targets: np.ndarray) -> List[str]:
+        """Return the relationship type of each edge from its endpoint node types."""
+        return [
+            EDGE_TYPES.get(tuple(sorted((self.types[a], self.types[b]))), 'default')
+            for a, b in zip(sources, targets)
+        ]
+
+    def subgraph(self, nodes: np.ndarray) -> 'SparseGraph':
+        """Return the subgraph induced by `nodes`, in the given order."""
+        nodes = np.asarray(nodes)
+        return SparseGraph(self.adjacency[nodes][:, nodes], self.labels[nodes], self.types[nodes])
+
+    def components(self) -> Tuple[int, np.ndarray]:
+        """Return the number of connected components and each node's component."""
+        return csgraph.connected_components(self.adjacency, directed=False)
+
+    def basic_metrics(self) -> Dict:
+        """Return size metrics that are cheap to compute on any graph size."""
+        n = self.n_nodes
+        m = self.n_edges
+        return {
+            'nodes': n,
+            'edges': m,
+            'density': 2 * m / (n * (n - 1)) if n > 1 else 0.0,
+            'avgDegree': 2 * m / n if n else 0.0,
+            'components': int(self.components()[0]) if n else 0
+        }
+
+
+class ColumnarGraphStore:
+    """Columnar, interned view of synced posts and comments for graph construction.
+
+    Each record appends a few integers to typed arrays, so building a network
+    later is a handful of vectorised sparse-matrix operations.
+    """
+
+    def __init__(self):
+        self.users = Vocabulary()
+        self.posts = Vocabulary()
+        self.hashtags = Vocabulary()
+        self.post_author = array('q')
+        self.post_tag_posts = array('q')
+        self.post_tag_tags = array('q')
+        self.comment_users = array('q')
+        self.comment_posts = array('q')
+        self._lock = threading.Lock()
+
+    def _post_row(self, post_id: str) -> int:
+        row = self.posts.intern(post_id)
+        if row == len(self.post_author):
+            self.post_author.append(-1)
+        return row
+
+    def add_posts(self, posts: List[Dict]):
+        with self._lock:
+            for post in posts:
+                row = self._post_row(post['id'])
+                if post.get('author'):
+                    self.post_author[row] = self.users.intern(post['author'])
+                for tag in records.post_hashtags(post):
+                    self.post_tag_posts.append(row)
+                    self.post_tag_tags.append(self.hashtags.intern(tag))
+
+    def add_comments(self, comments: List[Dict]):
+        with self._lock:
+            for comment in comments:
+                if comment.get('postId') and comment.get('author'):
+                    self.comment_posts.append(self._post_row(comment['postId']))
+                    self.comment_users.append(self.users.intern(comment['author']))
+
+    def snapshot(self) -> Dict[str, np.ndarray]:
+        """Return copies of the columns and vocabulary sizes, taken under the lock."""
+        with self._lock:
+            return {
+                'n_users': len(self.users),
+                'n_posts': len(self.posts),
+                'n_hashtags': len(self.hashtags),
+                'post_author': np.frombuffer(self.post_author, dtype=np.int64).copy(),
+                'post_tag_posts': np.frombuffer(self.post_tag_posts, dtype=np.int64).copy(),
+                'post_tag_tags': np.frombuffer(self.post_tag_tags, dtype=np.int64).copy(),
+                'comment_users': np.frombuffer(self.comment_users, dtype=np.int64).copy(),
+                'comment_posts': np.frombuffer(self.comment_posts, dtype=np.int64).copy()
+            }
+
+
+graph_store = ColumnarGraphStore()
+sync.posts_log.register('graph_core_posts', graph_store.add_posts)
+sync.comments_log.register('graph_core_comments', graph_store.add_comments)
+
+
+def _incidence(rows: np.ndarray, cols: np.ndarray, shape: Tuple[int, int]) -> sp.csr_matrix:
+    """Build a CSR count matrix from (row, col) pairs; duplicate pairs are summed."""
+    data = np.ones(len(rows), dtype=np.float32)
+    return sp.csr_matrix((data, (rows, cols)), shape=shape)
+
+
+def authorship_matrix(columns: Dict) -> sp.csr_matrix:
+    """Users x posts matrix with a 1 where the user wrote the post."""
+    posts = np.flatnonzero(columns['post_author'] >= 0)
+    return _incidence(columns['post_author'][posts], posts, (columns['n_users'], columns['n_posts']))
+
+
+def post_hashtag_matrix(columns: Dict) -> sp.csr_matrix:
+    """Posts x hashtags matrix with a 1 where the post carries the hashtag."""
+    matrix = _incidence(columns['post_tag_posts'], columns['post_tag_tags'],
+                        (columns['n_posts'], columns['n_hashtags']))
+    matrix.data[:] = 1
+    return matrix
+
+
+def comment_matrix(columns: Dict) -> sp.csr_matrix:
+    """Users x posts matrix counting each user's comments on each post."""
+    return _incidence(columns['comment_users'], columns['comment_posts'], (columns['n_users'], columns['n_posts']))
+
+
+def user_hashtag_incidence(columns: Dict) -> sp.csr_matrix:
+    """Users x hashtags bipartite incidence: how often each user used each hashtag."""
+    return (authorship_matrix(columns) @ post_hashtag_matrix(columns)).tocsr()
+
+
+def user_post_incidence(columns: Dict) -> sp.csr_matrix:
+    """Users x posts bipartite incidence: authorship plus comment counts."""
+    return (authorship_matrix(columns) + comment_matrix(columns)).tocsr()
+
+
+def _finish_projection(matrix: sp.spmatrix, min_weight: float) -> sp.csr_matrix:
+    """Drop self-loops and edges lighter than `min_weight`."""
+    matrix = matrix.tocsr()
+    matrix = matrix - sp.diags(matrix.diagonal())
+    matrix = matrix.tocsr()
+    matrix.data[matrix.data < min_weight] = 0
+    matrix.eliminate_zeros()
+    return matrix
+
+
+def user_network(columns: Dict, names: List[str], min_weight: float = DEFAULT_MIN_WEIGHT) -> SparseGraph:
+    """Users linked by shared hashtags plus comment interactions with post authors."""
+    uh = user_hashtag_incidence(columns)
+    uh.data[:] = 1
+    tag_users = np.diff(uh.tocsc().indptr)
+    keep = sp.diags((tag_users <= MAX_PROJECTION_HASHTAG_USERS).astype(np.float32))
+    uh = uh @ keep
+    co_hashtag = uh @ uh.T
+
+    interactions = comment_matrix(columns) @ authorship_matrix(columns).T
+    adjacency = _finish_projection(co_hashtag + interactions + interactions.T, min_weight)
+    return SparseGraph(adjacency, np.array(names, dtype=object), np.full(len(names), 'user', dtype=object))
+
+
+def hashtag_network(cooccurrence: sp.spmatrix, names: List[str], min_weight: float = DEFAULT_MIN_WEIGHT) -> SparseGraph:
+    """Hashtags linked by how many posts use both, from a hashtag co-occurrence matrix."""
+    adjacency = _finish_projection(cooccurrence.astype(np.float32), min_weight)
+    labels = np.array([f"#{name}" for name in names], dtype=object)
+    return SparseGraph(adjacency, labels, np.full(len(names), 'hashtag', dtype=object))
+
+
+def full_network(columns: Dict, user_names: List[str], post_ids: List[str],
+                 hashtag_names: List[str], min_weight: float = DEFAULT_MIN_WEIGHT) -> SparseGraph:
+    """Users, posts and hashtags in one graph: user-post and post-hashtag edges."""
+    up = user_post_incidence(columns)
+    ph = post_hashtag_matrix(columns)
+    adjacency = sp.bmat([
+        [None, up, None],
+        [up.T, None, ph],
+        [None, ph.T, None]
+    ], format='csr')
+    adjacency = _finish_projection(adjacency, min_weight)
+
+    labels = np.array(
+        list(user_names) + [f"Post {post_id}" for post_id in post_ids] + [f"#{name}" for name in hashtag_names],
+        dtype=object
+    )
+    types = np.array(
+        ['user'] * len(user_names) + ['post'] * len(post_ids) + ['hashtag'] * len(hashtag_names),
+        dtype=object
+    )
+    return SparseGraph(adjacency, labels, types)
+
+
+_graph_cache = LRUCache(GRAPH_CACHE_SIZE)
+
+
+def build_network(kind: str, min_weight: float = DEFAULT_MIN_WEIGHT) -> Optional[SparseGraph]:
+    """Build (or fetch from cache) the network of the given kind from synced data."""
+
+    def build():
+        columns = graph_store.snapshot()
+        users = graph_store.users.names[:columns['n_users']]
+        hashtags = graph_store.hashtags.names[:columns['n_hashtags']]
+        if kind == USER_NETWORK:
+            return user_network(columns, users, min_weight)
+        if kind == HASHTAG_NETWORK:
+            # Served from the persisted co-occurrence matrix instead of re-projecting every post.
+            from analytics import cooccurrence
+            return cooccurrence.get_cooccurrence().graph(min_weight)
+        if kind == FULL_NETWORK:
+            posts = graph_store.posts.names[:columns['n_posts']]
+            return full_network(columns, users, posts, hashtags, min_weight)
+        return None
+
+    return _graph_cache.get_or_compute((kind, min_weight, sync.dataset_version()), build)
+
+
+def top_nodes(graph: SparseGraph, limit: int) -> np.ndarray:
+    """Return up to `limit` nodes: the heaviest hubs and their strongest neighbours.
+
+    Picking hubs alone leaves bipartite graphs (users and hashtags only meet
+    through posts) without edges, so the hubs' edges are ranked by the summed
+    weighted degree of their endpoints and nodes are taken in that order.
+    """
+    if graph.n_nodes <= limit:
+        return np.arange(graph.n_nodes)
+    strength = graph.degree(weighted=True)
+    hubs = np.argpartition(-strength, limit - 1)[:limit]
+    hubs = hubs[np.argsort(-strength[hubs], kind='stable')]
+
+    rows = graph.adjacency[hubs].tocoo()
+    sources = hubs[rows.row]
+    targets = rows.col
+    order = np.argsort(-(strength[sources] + strength[targets]), kind='stable')
+    candidates = np.concatenate([np.column_stack([sources[order], targets[order]]).ravel(), hubs])
+    _, first_seen = np.unique(candidates, return_index=True)
+    return np.sort(candidates[np.sort(first_seen)][:limit])
+
+
+def to_networkx(graph: SparseGraph):
+    """Convert a (small) sparse graph to networkx with label, type and weight attributes."""
+    import networkx as nx
+
+    G = nx.Graph()
+    node_names = [f"{graph.types[node]}:{graph.labels[node]}" for node in range(graph.n_nodes)]
+    for node, name in enumerate(node_names):
+        G.add_node(name, label=graph.labels[node], type=graph.types[node])
+
+    sources, targets, weights = graph.edges()
+    for a, b, weight, edge_type in zip(sources, targets, weights, graph.edge_types(sources, targets)):
+        G.add_edge(node_names[a], node_names[b], weight=float(weight), type=edge_type)
+    return G
@@ -0,0 +1,247 @@
+import io
+import tempfile
+import zipfile
+from typing import Dict, IO, Iterator, List, Optional, Tuple
+from xml.sax.saxutils import escape, quoteattr
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from analytics import centrality, communities, graph_core, sync
+from analytics.cache import LRUCache
+
+GEXF = "GEXF (Gephi)"
+GRAPHML = "GraphML"
+CSV_EDGES = "CSV edge list"
+BINARY_EDGES = "Binary edge list"
+# Format -> (file extension, MIME type)
+FORMATS = {
+    GEXF: ('gexf', 'application/xml'),
+    GRAPHML: ('graphml', 'application/xml'),
+    CSV_EDGES: ('zip', 'application/zip'),
+    BINARY_EDGES: ('zip', 'application/zip'),
+}
+CHUNK_SIZE = 20000
+# Exports stay in memory up to this size and spill to a temporary file beyond it.
+SPOOL_MAX_BYTES = 16 * 1024 * 1024
+BINARY_EDGE_DTYPE = np.dtype([('source', '<u4'), ('target', '<u4'), ('weight', '<f4')])
+CENTRALITY_COLUMNS = ('betweenness', 'closeness', 'eigenvector', 'pagerank')
+CENTRALITY_CACHE_SIZE = 4
+
+
+def _edge_chunks(graph: graph_core.SparseGraph) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """Yield each undirected edge once, a block of adjacency rows at a time."""
+    adjacency = graph.adjacency
+    for start in range(0, graph.n_nodes, CHUNK_SIZE):
+        block = adjacency[start:start + CHUNK_SIZE].tocoo()
+        rows = block.row + start
+        upper = block.col > rows
+        yield rows[upper], block.col[upper], block.data[upper]
+
+
+def _attribute_kind(values: np.ndarray) -> str:
+    if np.issubdtype(values.dtype, np.integer):
+        return 'integer'
+    if np.issubdtype(values.dtype, np.floating):
+        return 'double'
+    return 'string'
+
+
+def _format_values(values: np.ndarray) -> List[str]:
+    if np.issubdtype(values.dtype, np.floating):
+        return [f"{value:.6g}" for value in values]
+    return [str(value) for value in values]
+
+
+def _write_gexf(f: IO[bytes], graph: graph_core.SparseGraph, attributes: Dict[str, np.ndarray]):
+    names = list(attributes)
+    f.write(b'<?xml version="1.0" encoding="UTF-8"?>\n'
+            b'<gexf xmlns="http://gexf.net/1.3" version="1.3">\n'
+            b'<graph defaultedgetype="undirected" mode="static">\n<attributes class="node">\n')
+    for i, name in enumerate(names):
+        f.write(f'<attribute id="{i}" title={quoteattr(name)} type="{_attribute_kind(attributes[name])}"/>\n'.encode())
+    f.write(b'</attributes>\n<attributes class="edge">\n<attribute id="0" title="type" type="string"/>\n'
+            b'</attributes>\n<nodes>\n')
+    for start in range(0, graph.n_nodes, CHUNK_SIZE):
+        stop = min(start + CHUNK_SIZE, graph.n_nodes)
+        columns = [_format_values(attributes[name][start:stop]) for name in names]
+        lines = [
+            f'<node id="{node}" label={quoteattr(str(label))}><attvalues>'
+            + ''.join(f'<attvalue for="{i}" value={quoteattr(value)}/>' for i, value in enumerate(values))
+            + '</attvalues></node>\n'
+            for node, label, *values in zip(range(start, stop), graph.labels[start:stop], *columns)
+        ]
+        f.write(''.join(lines).encode())
+    f.write(b'</nodes>\n<edges>\n')
+    edge_id = 0
+    for sources, targets, weights in _edge_chunks(graph):
+        lines = [
+            f'<edge id="{edge_id + i}" source="{a}" target="{b}" weight="{w:.6g}"><attvalues>'
+            f'<attvalue for="0" value="{edge_type}"/></attvalues></edge>\n'
+            for i, (a, b, w, edge_type) in enumerate(zip(sources, targets, weights,
+                                                          graph.edge_types(sources, targets)))
+        ]
+        edge_id += len(lines)
+        f.write(''.join(lines).encode())
+    f.write(b'</edges>\n</graph>\n</gexf>\n')
+
+
+def _write_graphml(f: IO[bytes], graph: graph_core.SparseGraph, attributes: Dict[str, np.ndarray]):
+    names = list(attributes)
+    f.write(b'<?xml version="1.0" encoding="UTF-8"?>\n'
+            b'<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n'
+            b'<key id="label" for="node" attr.name="label" attr.type="string"/>\n')
+    for i, name in enumerate(names):
+        kind = _attribute_kind(attributes[name])
+        kind = 'long' if kind == 'integer' else kind
+        f.write(f'<key id="d{i}" for="node" attr.name={quoteattr(name)} attr.type="{kind}"/>\n'.encode())
+    f.write(b'<key id="weight" for="edge" attr.name="weight" attr.type="double"/>\n'
+            b'<key id="type" for="edge" attr.name="type" attr.type="string"/>\n'
+            b'<graph id="G" edgedefault="undirected">\n')
+    for start in range(0, graph.n_nodes, CHUNK_SIZE):
+        stop = min(start + CHUNK_SIZE, graph.n_nodes)
+        columns = [_format_values(attributes[name][start:stop]) for name in names]
+        lines = [
+            f'<node id="n{node}"><data key="label">{escape(str(label))}</data>'
+            + ''.join(f'<data key="d{i}">{escape(value)}</data>' for i, value in enumerate(values))
+            + '</node>\n'
+            for node, label, *values in zip(range(start, stop), graph.labels[start:stop], *columns)
+        ]
+        f.write(''.join(lines).encode())
+    for sources, targets, weights in _edge_chunks(graph):
+        lines = [
+            f'<edge source="n{a}" target="n{b}"><data key="weight">{w:.6g}</data>'
+            f'<data key="type">{edge_type}</data></edge>\n'
+            for a, b, w, edge_type in zip(sources, targets, weights, graph.edge_types(sources, targets))
+        ]
+        f.write(''.join(lines).encode())
+    f.write(b'</graph>\n</graphml>\n')
+
+
+def _write_node_table(archive: zipfile.ZipFile, graph: graph_core.SparseGraph, attributes: Dict[str, np.ndarray]):
+    with archive.open('nodes.csv', 'w') as raw, io.TextIOWrapper(raw, encoding='utf-8', newline='') as f:
+        for start in range(0, graph.n_nodes, CHUNK_SIZE):
+            stop = min(start + CHUNK_SIZE, graph.n_nodes)
+            pd.DataFrame({
+                'id': np.arange(start, stop),
+                'label': graph.labels[start:stop],
+                **{name: values[start:stop] for name, values in attributes.items()}
+            }).to_csv(f, index=False, header=start == 0, float_format='%.6g')
+
+
+def _write_csv(f: IO[bytes], graph: graph_core.SparseGraph, attributes: Dict[str, np.ndarray]):
+    with zipfile.ZipFile(f, 'w', zipfile.ZIP_DEFLATED) as archive:
+        _write_node_table(archive, graph, attributes)
+        with archive.open('edges.csv', 'w') as raw, io.TextIOWrapper(raw, encoding='utf-8', newline='') as out:
+            header = True
+            for sources, targets, weights in _edge_chunks(graph):
+                pd.DataFrame({
+                    'source': sources,
+                    'target': targets,
+                    'weight': weights,
+                    'type': graph.edge_types(sources, targets)
+                }).to_csv(out, index=False, header=header, float_format='%.6g')
+                header = False
+
+
+def _write_binary(f: IO[bytes], graph: graph_core.SparseGraph, attributes: Dict[str, np.ndarray]):
+    """Node table as CSV plus edges as packed little-endian (uint32, uint32, float32) records."""
+    with zipfile.ZipFile(f, 'w', zipfile.ZIP_DEFLATED) as archive:
+        _write_node_table(archive, graph, attributes)
+        with archive.open('edges.bin', 'w') as out:
+            for sources, targets, weights in _edge_chunks(graph):
+                records = np.empty(len(sources), dtype=BINARY_EDGE_DTYPE)
+                records['source'] = sources
+                records['target'] = targets
+                records['weight'] = weights
+                out.write(records.tobytes())
+
+
+_WRITERS = {
+    GEXF: _write_gexf,
+    GRAPHML: _write_graphml,
+    CSV_EDGES: _write_csv,
+    BINARY_EDGES: _write_binary,
+}
+
+
+def write_graph(graph: graph_core.SparseGraph, attributes: Dict[str, np.ndarray], fmt: str) -> IO[bytes]:
+    """Stream a graph and its node attributes into a spooled file, rewound for reading.
+
+    Nodes and edges are written a chunk at a time straight from the CSR
+    adjacency, so memory beyond the graph itself stays bounded by the chunk
+    size and `SPOOL_MAX_BYTES`.
+    """
+    if fmt not in _WRITERS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    f = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    _WRITERS[fmt](f, graph, attributes)
+    f.seek(0)
+    return f
+
+
+_centrality_cache = LRUCache(CENTRALITY_CACHE_SIZE)
+
+
+def network_attributes(kind: str, min_weight: float, graph: graph_core.SparseGraph,
+                       accuracy: Optional[str] = None) -> Dict[str, np.ndarray]:
+    """Type, degree, community and (with an `accuracy`) centralities of every node."""
+    attributes = {
+        'type': np.asarray(graph.types, dtype=object),
+        'degree': graph.degree().astype(np.int64),
+        'strength': graph.degree(weighted=True).astype(np.float64),
+    }
+    partition = communities.get_partition(kind, min_weight)
+    if partition is not None and len(partition.labels) == graph.n_nodes:
+        attributes['community'] = partition.labels.astype(np.int64)
+    if accuracy is not None:
+        key = (kind, min_weight, sync.dataset_version(), accuracy)
+        values = _centrality_cache.get_or_compute(
+            key, lambda: centrality.compute_centralities(graph.adjacency, accuracy)
+        )
+        attributes.update({name: np.asarray(values[name], dtype=np.float64) for name in CENTRALITY_COLUMNS})
+    return attributes
+
+
+def export_network(kind: str, min_weight: float, fmt: str, accuracy: Optional[str] = None) -> Optional[IO[bytes]]:
+    """Export a whole user, hashtag or full network; None when it has no nodes."""
+    graph = graph_core.build_network(kind, min_weight)
+    if graph is None or not graph.n_nodes:
+        return None
+    return write_graph(graph, network_attributes(kind, min_weight, graph, accuracy), fmt)
+
+
+def export_payload(nodes: List[Dict], edges: List[Dict], fmt: str, include_centralities: bool = True) -> IO[bytes]:
+    """Export an analysis payload (e.g. a post network) with its computed node metrics.
+
+    Degree and community are always written; the centrality columns only
+    with `include_centralities`.
+    """
+    frame = pd.DataFrame(nodes)
+    index = pd.Series(np.arange(len(frame)), index=frame['id'].astype(str).to_numpy()) \
+        if not frame.empty else pd.Series(dtype=np.int64)
+    index = index[~index.index.duplicated()]
+    edge_frame = pd.DataFrame(edges)
+    adjacency = sp.csr_matrix((len(frame), len(frame)), dtype=np.float32)
+    if not edge_frame.empty:
+        sources = edge_frame['source'].astype(str).map(index)
+        targets = edge_frame['target'].astype(str).map(index)
+        valid = (sources.notna() & targets.notna()).to_numpy()
+        weights = edge_frame['weight'].fillna(1).to_numpy(dtype=np.float32) \
+            if 'weight' in edge_frame else np.ones(len(edge_frame), dtype=np.float32)
+        adjacency = sp.csr_matrix(
+            (weights[valid], (sources[valid].astype(np.int64), targets[valid].astype(np.int64))),
+            shape=adjacency.shape
+        )
+        adjacency = adjacency.maximum(adjacency.T)
+
+    labels = (frame['label'].fillna(frame['id']) if 'label' in frame else frame.get('id', pd.Series(dtype=str)))
+    types = frame['type'].fillna('default') if 'type' in frame else pd.Series('default', index=frame.index)
+    graph = graph_core.SparseGraph(adjacency, labels.astype(str).to_numpy(dtype=object), types.to_numpy(dtype=object))
+    attributes = {'type': graph.types}
+    for name in ('degree', 'community') + (CENTRALITY_COLUMNS if include_centralities else ()):
+        if name in frame:
+            dtype = np.int64 if name in ('degree', 'community') else np.float64
+            attributes[name] = frame[name].fillna(-1 if name == 'community' else 0).to_numpy(dtype=dtype)
+    return write_graph(graph, attributes, fmt)
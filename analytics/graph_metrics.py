@@ -0,0 +1,416 @@
+import math
+import random
+import threading
+import warnings
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+
+import networkx as nx
+
+from analytics import centrality, communities, ego, graph_core, jobs, records, sync
+from analytics.cache import LRUCache
+from analytics.defaults import DEFAULT_APPROX_THRESHOLD
+
+PATH_SAMPLE_SOURCES = 64
+CLUSTERING_TRIALS = 2000
+MAX_REPORTED_PATHS = 10
+CACHE_SIZE = 64
+
+
+def user_node(name: str) -> str:
+    return f"user:{name}"
+
+
+def post_node(post_id: str) -> str:
+    return f"post:{post_id}"
+
+
+def hashtag_node(tag: str) -> str:
+    return f"hashtag:{tag}"
+
+
+class InteractionIndex:
+    """Posts by id and comments by post id, maintained from the sync logs."""
+
+    def __init__(self):
+        self.posts_by_id: Dict[str, Dict] = {}
+        self.comments_by_post: Dict[str, List[Dict]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def add_posts(self, posts: List[Dict]):
+        with self._lock:
+            for post in posts:
+                self.posts_by_id[post['id']] = post
+
+    def add_comments(self, comments: List[Dict]):
+        with self._lock:
+            for comment in comments:
+                if comment.get('postId'):
+                    self.comments_by_post[comment['postId']].append(comment)
+
+
+interaction_index = InteractionIndex()
+sync.posts_log.register('interaction_index_posts', interaction_index.add_posts)
+sync.comments_log.register('interaction_index_comments', interaction_index.add_comments)
+
+
+def _add_edge(G: nx.Graph, source: str, target: str, edge_type: str):
+    """Add an edge or bump the weight of an existing one."""
+    if source == target:
+        return
+    if G.has_edge(source, target):
+        G[source][target]['weight'] += 1
+    else:
+        G.add_edge(source, target, type=edge_type, weight=1)
+
+
+def build_post_graph(post: Dict, comments: List[Dict]) -> nx.Graph:
+    """Build the interaction graph of one post: author, hashtags, commenters and mentions."""
+    G = nx.Graph()
+    root = post_node(post['id'])
+    G.add_node(root, label=f"Post {post['id']}", type='post')
+
+    author = post.get('author')
+    if author:
+        G.add_node(user_node(author), label=author, type='user')
+        _add_edge(G, user_node(author), root, 'author')
+
+    for tag in records.post_hashtags(post):
+        G.add_node(hashtag_node(tag), label=f"#{tag}", type='hashtag')
+        _add_edge(G, root, hashtag_node(tag), 'contains')
+
+    for name in records.mentions(post.get('content')):
+        G.add_node(user_node(name), label=name, type='user')
+        _add_edge(G, root, user_node(name), 'mentions')
+
+    for comment in comments:
+        commenter = comment.get('author')
+        if not commenter:
+            continue
+        G.add_node(user_node(commenter), label=commenter, type='user')
+        _add_edge(G, user_node(commenter), root, 'replies')
+        if author:
+            _add_edge(G, user_node(commenter), user_node(author), 'interacts')
+        for name in records.mentions(comment.get('text')):
+            G.add_node(user_node(name), label=name, type='user')
+            _add_edge(G, user_node(commenter), user_node(name), 'mentions')
+
+    return G
+
+
+def _sampled_distances(G: nx.Graph, sources: List) -> Dict:
+    """Run a BFS from each source and return its distance map."""
+    return {source: nx.single_source_shortest_path_length(G, source) for source in sources}
+
+
+def compute_metrics(G: nx.Graph, approx_threshold: int = DEFAULT_APPROX_THRESHOLD) -> Dict:
+    """Compute whole-network metrics, approximating path-based ones on large graphs."""
+    n = G.number_of_nodes()
+    m = G.number_of_edges()
+    metrics = {
+        'density': nx.density(G) if n > 1 else 0.0,
+        'avgDegree': 2 * m / n if n else 0.0,
+        'components': nx.number_connected_components(G) if n else 0,
+        'diameter': 0,
+        'radius': 0,
+        'avgPathLength': 0.0,
+        'efficiency': 0.0,
+        'clustering': 0.0,
+        'assortativity': 0.0,
+        'approximate': n > approx_threshold
+    }
+    if n < 2:
+        return metrics
+
+    giant = G.subgraph(max(nx.connected_components(G), key=len))
+
+    if not metrics['approximate']:
+        eccentricity = nx.eccentricity(giant)
+        metrics['diameter'] = max(eccentricity.values())
+        metrics['radius'] = min(eccentricity.values())
+        metrics['avgPathLength'] = nx.average_shortest_path_length(giant) if len(giant) > 1 else 0.0
+        metrics['efficiency'] = nx.global_efficiency(G)
+        metrics['clustering'] = nx.average_clustering(G)
+    else:
+        rng = random.Random(42)
+        sources = rng.sample(list(giant.nodes()), min(PATH_SAMPLE_SOURCES, len(giant)))
+        distances = _sampled_distances(giant, sources)
+        # Double sweep: a BFS from the farthest node found tightens the diameter bound.
+        farthest = max(distances[sources[0]].items(), key=lambda item: item[1])[0]
+        distances[farthest] = nx.single_source_shortest_path_length(giant, farthest)
+
+        eccentricities = [max(lengths.values()) for lengths in distances.values()]
+        path_lengths = [d for lengths in distances.values() for d in lengths.values() if d > 0]
+        metrics['diameter'] = max(eccentricities)
+        metrics['radius'] = min(eccentricities)
+        metrics['avgPathLength'] = sum(path_lengths) / len(path_lengths) if path_lengths else 0.0
+        # Efficiency over the whole graph; nodes outside the giant component add 0.
+        giant_share = len(giant) / n
+        metrics['efficiency'] = giant_share * sum(
+            sum(1 / d for d in lengths.values() if d > 0) / (n - 1) for lengths in distances.values()
+        ) / len(distances)
+        metrics['clustering'] = nx.approximation.average_clustering(G, trials=CLUSTERING_TRIALS, seed=42)
+
+    if m:
+        with warnings.catch_warnings():
+            # Regular graphs have zero degree variance; the NaN is handled below.
+            warnings.simplefilter('ignore', RuntimeWarning)
+            assortativity = nx.degree_assortativity_coefficient(G)
+        metrics['assortativity'] = 0.0 if math.isnan(assortativity) else assortativity
+    return metrics
+
+
+def compute_node_metrics(G: nx.Graph, accuracy: str = centrality.DEFAULT_ACCURACY,
+                         progress: Optional[Callable[[float, str], None]] = None) -> Dict[str, Dict]:
+    """Compute per-node centralities used to size nodes in the network view."""
+    nodes = list(G)
+    if not nodes:
+        return {}
+
+    adjacency = nx.to_scipy_sparse_array(G, nodelist=nodes, weight='weight', format='csr')
+    values = centrality.compute_centralities(adjacency, accuracy, progress)
+    return {
+        node: {
+            'degree': int(values['degree'][i]),
+            'centrality': float(values['centrality'][i]),
+            'betweenness': float(values['betweenness'][i]),
+            'closeness': float(values['closeness'][i]),
+            'eigenvector': float(values['eigenvector'][i]),
+            'pagerank': float(values['pagerank'][i])
+        }
+        for i, node in enumerate(nodes)
+    }
+
+
+def detect_communities(G: nx.Graph, node_metrics: Dict[str, Dict]) -> Dict:
+    """Detect communities and report real per-community metrics."""
+    if not G.number_of_edges():
+        return {'communities': [], 'communityMetrics': [], 'modularity': 0.0, 'membership': {}}
+
+    nodes = list(G)
+    adjacency = nx.to_scipy_sparse_array(G, nodelist=nodes, weight='weight', format='csr')
+    labels = communities.louvain(adjacency)
+    community_metrics = communities.community_metrics(adjacency, labels)
+    members = [[] for _ in community_metrics]
+    for node, label in zip(nodes, labels):
+        members[label].append(node)
+    for metric, community in zip(community_metrics, members):
+        metric['centrality'] = sum(node_metrics[node]['centrality'] for node in community) / len(community)
+
+    return {
+        'communities': [sorted(G.nodes[node].get('label', node) for node in community) for community in members],
+        'communityMetrics': community_metrics,
+        'modularity': sum(metric['modularity'] for metric in community_metrics),
+        'membership': dict(zip(nodes, labels.tolist()))
+    }
+
+
+def partition_communities(G: nx.Graph, node_metrics: Dict[str, Dict], partition) -> Dict:
+    """Report communities of a whole network, from its partition, for a view of it.
+
+    Metrics describe each community in the whole network; centrality is
+    averaged over the community's members present in `G`.
+    """
+    index = {name: i for i, name in enumerate(partition.names)}
+    membership = {node: int(partition.labels[index[node]]) for node in G if node in index}
+    centrality_sums = defaultdict(float)
+    counts = defaultdict(int)
+    for node, label in membership.items():
+        centrality_sums[label] += node_metrics[node]['centrality']
+        counts[label] += 1
+
+    community_metrics = [
+        {**metric, 'centrality': centrality_sums[c] / counts[c] if counts[c] else 0.0}
+        for c, metric in enumerate(partition.metrics)
+    ]
+    return {
+        'communities': partition.members,
+        'communityMetrics': community_metrics,
+        'modularity': partition.modularity,
+        'membership': membership
+    }
+
+
+def sample_shortest_paths(G: nx.Graph, source: str, limit: int = MAX_REPORTED_PATHS) -> List[Dict]:
+    """Return shortest paths from `source` to its farthest reachable user nodes."""
+    if source not in G:
+        return []
+    paths = nx.single_source_shortest_path(G, source)
+    targets = sorted(
+        (node for node in paths if node != source and G.nodes[node].get('type') == 'user'),
+        key=lambda node: len(paths[node]),
+        reverse=True
+    )[:limit]
+    return [
+        {
+            'nodes': [G.nodes[node].get('label', node) for node in paths[target]],
+            'length': len(paths[target]) - 1,
+            'weight': float(sum(G[a][b]['weight'] for a, b in zip(paths[target], paths[target][1:])))
+        }
+        for target in targets
+    ]
+
+
+def graph_to_analysis(G: nx.Graph, root: Optional[str] = None,
+                      approx_threshold: int = DEFAULT_APPROX_THRESHOLD,
+                      accuracy: str = centrality.DEFAULT_ACCURACY, partition=None,
+                      progress: Optional[Callable[[float, str], None]] = None) -> Dict:
+    """Convert a graph to the analysis payload rendered by the network page.
+
+    With a `partition` of the network `G` was cut from, communities come
+    from it instead of being detected on `G`. `progress(fraction, message)`
+    is called between the steps (see `centrality.compute_centralities`).
+    """
+    report = progress or (lambda fraction, message: None)
+    node_metrics = compute_node_metrics(G, accuracy, lambda fraction, message: report(0.7 * fraction, message))
+    report(0.7, "Computing network metrics...")
+    metrics = compute_metrics(G, approx_threshold)
+    report(0.9, "Summarising communities...")
+    pivots = centrality.ACCURACY_LEVELS.get(accuracy, {}).get('pivots')
+    metrics['approximate'] = metrics['approximate'] or (pivots is not None and pivots < G.number_of_nodes())
+    if partition is None:
+        community_data = detect_communities(G, node_metrics)
+    else:
+        community_data = partition_communities(G, node_metrics, partition)
+    metrics['modularity'] = community_data['modularity']
+
+    return {
+        'nodes': [
+            {
+                'id': node,
+                'label': data.get('label', node),
+                'type': data.get('type', 'default'),
+                'community': community_data['membership'].get(node, -1),
+                **node_metrics[node]
+            }
+            for node, data in G.nodes(data=True)
+        ],
+        'edges': [
+            {'source': source, 'target': target, 'type': data.get('type', 'default'), 'weight': data.get('weight', 1)}
+            for source, target, data in G.edges(data=True)
+        ],
+        'metrics': metrics,
+        'communities': community_data['communities'],
+        'communityMetrics': community_data['communityMetrics'],
+        'shortestPaths': sample_shortest_paths(G, root) if root else []
+    }
+
+
+_analysis_cache = LRUCache(CACHE_SIZE)
+
+
+def analyze_post(post_id: str, approx_threshold: int = DEFAULT_APPROX_THRESHOLD,
+                 accuracy: str = centrality.DEFAULT_ACCURACY) -> Optional[Dict]:
+    """Analyse a synced post's interaction network, cached per dataset version.
+
+    Returns None when the post has not been synced locally.
+    """
+    post = interaction_index.posts_by_id.get(post_id)
+    if post is None:
+        return None
+
+    def analyze():
+        G = build_post_graph(post, interaction_index.comments_by_post.get(post_id, []))
+        return graph_to_analysis(G, post_node(post_id), approx_threshold, accuracy)
+
+    key = (post_id, sync.dataset_version(), approx_threshold, accuracy)
+    return _analysis_cache.get_or_compute(key, analyze)
+
+
+def analyze_post_neighbourhood(post_id: str, hops: int = ego.DEFAULT_HOPS, fan_out: int = ego.DEFAULT_FAN_OUT,
+                               node_budget: int = ego.DEFAULT_NODE_BUDGET,
+                               approx_threshold: int = DEFAULT_APPROX_THRESHOLD,
+                               accuracy: str = centrality.DEFAULT_ACCURACY) -> Optional[Dict]:
+    """Analyse a post's k-hop neighbourhood in the full network (see `ego.post_ego_network`).
+
+    Nodes carry the 'hop' they were reached at. Returns None when the post
+    has not been synced locally.
+    """
+    def analyze():
+        neighbourhood = ego.post_ego_network(post_id, hops, fan_out, node_budget)
+        if neighbourhood is None:
+            return None
+        G = graph_core.to_networkx(neighbourhood['graph'])
+        root = next(iter(G.nodes))
+        analysis = graph_to_analysis(G, root, approx_threshold, accuracy)
+        for node, hop in zip(analysis['nodes'], neighbourhood['hops'].tolist()):
+            node['hop'] = hop
+        return analysis
+
+    key = ('neighbourhood', post_id, hops, fan_out, node_budget, sync.dataset_version(), approx_threshold, accuracy)
+    return _analysis_cache.get_or_compute(key, analyze)
+
+
+def _network_analysis(graph: graph_core.SparseGraph, partition, max_nodes: int,
+                      approx_threshold: int, accuracy: str,
+                      progress: Optional[Callable[[float, str], None]] = None) -> Dict:
+    """Analyse a built network, drawing the subgraph of its heaviest `max_nodes` nodes."""
+    view = graph
+    if graph.n_nodes > max_nodes:
+        view = graph.subgraph(graph_core.top_nodes(graph, max_nodes))
+    analysis = graph_to_analysis(graph_core.to_networkx(view), None, approx_threshold, accuracy, partition,
+                                 progress)
+    totals = graph.basic_metrics()
+    analysis['metrics']['totalNodes'] = totals['nodes']
+    analysis['metrics']['totalEdges'] = totals['edges']
+    analysis['metrics']['totalComponents'] = totals['components']
+    return analysis
+
+
+def analyze_network(kind: str, min_weight: float, max_nodes: int,
+                    approx_threshold: int = DEFAULT_APPROX_THRESHOLD,
+                    accuracy: str = centrality.DEFAULT_ACCURACY) -> Optional[Dict]:
+    """Analyse a user, hashtag or full network built from all synced data.
+
+    Graphs larger than `max_nodes` are analysed and drawn as the subgraph of
+    their heaviest nodes; `metrics['totalNodes']`/`totalEdges` describe the
+    whole graph. Returns None when the network has no edges.
+    """
+    def analyze():
+        graph = graph_core.build_network(kind, min_weight)
+        if graph is None or not graph.n_edges:
+            return None
+        partition = communities.get_partition(kind, min_weight)
+        return _network_analysis(graph, partition, max_nodes, approx_threshold, accuracy)
+
+    key = (kind, min_weight, max_nodes, sync.dataset_version(), approx_threshold, accuracy)
+    return _analysis_cache.get_or_compute(key, analyze)
+
+
+def network_analysis_job(kind: str, min_weight: float, graph: graph_core.SparseGraph, max_nodes: int,
+                         approx_threshold: int, accuracy: str) -> Dict:
+    """`analyze_network` as a job body: runs in a worker process on the already built graph.
+
+    Reports the whole graph's size as a partial result first, then the
+    community count and modularity once the partition is known. Every
+    centrality and metric step reports progress too, so a cancelled job
+    stops at the next step (or pivot batch).
+    """
+    totals = graph.basic_metrics()
+    jobs.report_progress(0.05, "Detecting communities...", {'totals': totals})
+    partition = communities.compute_partition(kind, min_weight, graph)
+    partial = {'totals': totals, 'communities': len(partition.metrics), 'modularity': partition.modularity}
+    jobs.report_progress(0.4, "Computing centralities...", partial)
+    return _network_analysis(
+        graph, partition, max_nodes, approx_threshold, accuracy,
+        lambda fraction, message: jobs.report_progress(0.4 + 0.6 * fraction, message, partial)
+    )
+
+
+def submit_network_analysis(kind: str, min_weight: float, max_nodes: int,
+                            approx_threshold: int = DEFAULT_APPROX_THRESHOLD,
+                            accuracy: str = centrality.DEFAULT_ACCURACY, retry: bool = False) -> Optional[str]:
+    """Queue `analyze_network` on the job queue and return the job id.
+
+    The graph is built here (a few sparse products) and shipped to the
+    worker; identical requests for the same dataset version share one job.
+    Returns None when the network has no edges.
+    """
+    graph = graph_core.build_network(kind, min_weight)
+    if graph is None or not graph.n_edges:
+        return None
+    group = ('network', kind, min_weight, max_nodes, approx_threshold, accuracy)
+    return jobs.get_job_queue().submit(
+        network_analysis_job, (kind, min_weight, graph, max_nodes, approx_threshold, accuracy),
+        key=group + (sync.dataset_version(),), group=group, label=f"{kind} analysis", retry=retry
+    )
@@ -0,0 +1,305 @@
+import contextlib
+import hashlib
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+import types
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence
+
+MAX_WORKERS = min(2, os.cpu_count() or 1)
+# Finished jobs (and their results) kept for polling and de-duplication.
+MAX_FINISHED_JOBS = 64
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+
+class JobCancelled(Exception):
+    """Raised inside a job by `report_progress` once the job has been cancelled."""
+
+
+# Set in a worker process while it runs a job: (run token, progress channel, cancelled tokens).
+_current = None
+
+
+def report_progress(fraction: float, message: str = '', partial: Any = None):
+    """Report a running job's progress and, optionally, a partial result.
+
+    Also the job's cancellation point: raises JobCancelled once the job was
+    cancelled. Outside a job (when the work runs inline) it does nothing.
+    """
+    if _current is None:
+        return
+    token, channel, cancelled = _current
+    if token in cancelled:
+        raise JobCancelled(token)
+    channel.put((token, RUNNING, float(fraction), message, partial))
+
+
+def _run(token: str, fn: Callable, args: Sequence, channel, cancelled) -> Any:
+    """Worker-side wrapper: marks the job running and exposes it to `report_progress`."""
+    global _current
+    _current = (token, channel, cancelled)
+    try:
+        channel.put((token, RUNNING, 0.0, '', None))
+        return fn(*args)
+    finally:
+        _current = None
+
+
+@contextlib.contextmanager
+def bare_main():
+    """Start processes with an empty `__main__`; wrap anything that spawns pool workers.
+
+    Streamlit runs the page script as `__main__`, and spawn re-runs the
+    parent's `__main__` in every child, which would render the whole app
+    there. Job functions live in importable modules, so workers need none.
+    """
+    main = sys.modules.get('__main__')
+    sys.modules['__main__'] = types.ModuleType('__main__')
+    try:
+        yield
+    finally:
+        sys.modules['__main__'] = main
+
+
+def job_id_of(key: Hashable) -> str:
+    """A stable id for a job key, so identical submissions share one job."""
+    return hashlib.blake2b(repr(key).encode('utf-8'), digest_size=8).hexdigest()
+
+
+class Job:
+    """One submitted unit of work and what is known about it so far."""
+
+    def __init__(self, job_id: str, key: Hashable, group: Hashable, label: str):
+        self.id = job_id
+        # Identifies this run in worker messages; a resubmitted job gets a new one.
+        self.token = f"{job_id}-{time.monotonic_ns()}"
+        self.key = key
+        # Ungrouped jobs keep their latest result to themselves
+        self.group = group if group is not None else key
+        self.label = label
+        self.status = QUEUED
+        self.progress = 0.0
+        self.message = ''
+        self.partial: Any = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.future: Optional[Future] = None
+
+    def snapshot(self) -> Dict:
+        """A plain-dict view of the job for the pages."""
+        end = self.finished_at or time.time()
+        return {
+            'id': self.id,
+            'label': self.label,
+            'status': self.status,
+            'progress': self.progress,
+            'message': self.message,
+            'error': self.error,
+            'elapsed': end - (self.started_at or self.submitted_at),
+            'hasPartial': self.partial is not None
+        }
+
+
+class JobQueue:
+    """Process-pool job queue with ids, de-duplication, progress, cancellation and cached results.
+
+    A job is a module-level function and picklable arguments, identified by a
+    caller-supplied key (typically the inputs plus the dataset version):
+    submitting a known key returns the existing job.
+    Workers report progress and partial results over a manager queue, which
+    is drained whenever a page polls. The last result of each job `group`
+    (the key without its version; an ungrouped job is its own group) is
+    kept so pages can render it while a newer job runs.
+    """
+
+    def __init__(self, max_workers: int = MAX_WORKERS):
+        self.max_workers = max_workers
+        self._jobs: 'OrderedDict[str, Job]' = OrderedDict()
+        self._latest: Dict[Hashable, Any] = {}
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._manager = None
+        self._channel = None
+        self._cancelled = None
+        self._lock = threading.RLock()
+
+    def _start(self):
+        """Start the worker pool and the progress manager on first use (caller holds the lock)."""
+        context = multiprocessing.get_context('spawn')
+        if self._manager is None:
+            with bare_main():
+                self._manager = context.Manager()
+            self._channel = self._manager.Queue()
+            self._cancelled = self._manager.dict()
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+
+    def _discard_pool(self, pool: ProcessPoolExecutor):
+        """Drop a broken worker pool, e.g. after a worker was killed; the next submission starts a new one."""
+        if pool is self._pool:
+            pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def submit(self, fn: Callable, args: Sequence, key: Hashable, group: Hashable = None,
+               label: str = '', retry: bool = False) -> str:
+        """Queue `fn(*args)` unless a job with the same key exists, and return its id.
+
+        A failed or cancelled job stays that way (so a rerun does not restart
+        it) unless `retry` is set. If the worker pool broke (a worker died),
+        it is replaced and the job submitted once more before it is marked failed.
+        """
+        job_id = job_id_of(key)
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and (job.status in ACTIVE_STATES + (DONE,) or not retry):
+                self._jobs.move_to_end(job_id)
+                return job_id
+
+            job = Job(job_id, key, group, label)
+            self._jobs[job_id] = job
+            for _ in range(2):
+                self._start()
+                pool = self._pool
+                try:
+                    # Workers are spawned on demand by submit
+                    with bare_main():
+                        job.future = pool.submit(_run, job.token, fn, list(args), self._channel, self._cancelled)
+                    break
+                except BrokenProcessPool as e:
+                    self._discard_pool(pool)
+                    error = e
+            else:
+                job.status = FAILED
+                job.error = str(error) or type(error).__name__
+                job.finished_at = time.time()
+                self._trim()
+                return job_id
+            job.future.add_done_callback(lambda future: self._finish(job, future, pool))
+            self._trim()
+            return job_id
+
+    def _finish(self, job: Job, future: Future, pool: ProcessPoolExecutor):
+        with self._lock:
+            self._drain()
+            # The worker is done with the job, so its cancellation flag is no longer read
+            self._cancelled.pop(job.token, None)
+            if job.status == CANCELLED:
+                return
+            job.finished_at = time.time()
+            if future.cancelled():
+                job.status = CANCELLED
+                return
+            error = future.exception()
+            if isinstance(error, JobCancelled):
+                job.status = CANCELLED
+            elif error is not None:
+                if isinstance(error, BrokenProcessPool):
+                    self._discard_pool(pool)
+                job.status = FAILED
+                job.error = str(error) or type(error).__name__
+            else:
+                job.status = DONE
+                job.progress = 1.0
+                job.result = future.result()
+                job.partial = None
+                self._latest[job.group] = job.result
+
+    def _drain(self):
+        """Apply progress updates sent by the workers (caller holds the lock)."""
+        if self._channel is None:
+            return
+        while True:
+            try:
+                token, status, fraction, message, partial = self._channel.get_nowait()
+            except (queue.Empty, EOFError, OSError):
+                return
+            job = self._jobs.get(token.rsplit('-', 1)[0])
+            if job is None or job.token != token or job.status not in ACTIVE_STATES:
+                continue
+            if job.started_at is None:
+                job.started_at = time.time()
+            job.status = status
+            job.progress = max(job.progress, fraction)
+            job.message = message or job.message
+            if partial is not None:
+                job.partial = partial
+
+    def _trim(self):
+        """Forget the oldest finished jobs beyond MAX_FINISHED_JOBS (caller holds the lock)."""
+        finished = [job_id for job_id, job in self._jobs.items() if job.status not in ACTIVE_STATES]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            job = self._jobs.pop(job_id)
+            if job.group == job.key:
+                self._latest.pop(job.group, None)
+
+    def status(self, job_id: str) -> Optional[Dict]:
+        """The job's current status, progress and message; None for unknown ids."""
+        with self._lock:
+            self._drain()
+            job = self._jobs.get(job_id)
+            return job.snapshot() if job is not None else None
+
+    def result(self, job_id: str) -> Any:
+        """The result of a finished job, or None."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.result if job is not None and job.status == DONE else None
+
+    def partial(self, job_id: str) -> Any:
+        """The latest partial result a running job reported, or None."""
+        with self._lock:
+            self._drain()
+            job = self._jobs.get(job_id)
+            return job.partial if job is not None else None
+
+    def previous(self, job_id: str) -> Any:
+        """The most recent completed result in the job's group, or None."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return self._latest.get(job.group) if job is not None else None
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job; a running job stops at its next progress report."""
+        with self._lock:
+            self._drain()
+            job = self._jobs.get(job_id)
+            if job is None or job.status not in ACTIVE_STATES:
+                return False
+            if not job.future.cancel():
+                self._cancelled[job.token] = True
+            job.status = CANCELLED
+            job.finished_at = time.time()
+            return True
+
+    def jobs(self) -> List[Dict]:
+        """Snapshots of every known job, most recent first."""
+        with self._lock:
+            self._drain()
+            return [job.snapshot() for job in reversed(self._jobs.values())]
+
+
+_queue: Optional[JobQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """Return the process-wide job queue; workers start with the first job."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue()
+        return _queue
@@ -0,0 +1,264 @@
+import hashlib
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse import csgraph
+
+from analytics.cache import LRUCache
+
+FORCE_ATLAS = "Force Atlas"
+SPRING = "Spring"
+CIRCULAR = "Circular"
+RANDOM = "Random"
+HIERARCHICAL = "Hierarchical"
+
+COLD_ITERATIONS = 60
+WARM_ITERATIONS = 15
+COLD_TEMPERATURE = 0.1
+WARM_TEMPERATURE = 0.02
+# Above this many nodes each iteration repels against a random sample of nodes.
+EXACT_REPULSION_NODES = 2000
+REPULSION_SAMPLE = 1000
+REPULSION_CHUNK_CELLS = 2 ** 22
+# A cached layout is reused as a warm start when it shares this share of nodes.
+MIN_WARM_OVERLAP = 0.8
+RECENT_LAYOUTS = 8
+LAYOUT_CACHE_SIZE = 32
+# Rendered coordinates span about this many pixels per sqrt(node).
+PIXELS_PER_NODE = 60
+
+
+def graph_fingerprint(nodes: List[Dict], edges: List[Dict]) -> str:
+    """Return a digest identifying a graph payload by its node ids and weighted edges."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update('\x1f'.join(str(node.get('id', '')) for node in nodes).encode('utf-8'))
+    digest.update(b'\x1e')
+    digest.update('\x1f'.join(
+        f"{edge.get('source', '')}\t{edge.get('target', '')}\t{edge.get('weight', 1)}" for edge in edges
+    ).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def node_attributes_digest(nodes: List[Dict], fields: Sequence[str]) -> str:
+    """Return a digest of the given node attributes, which `graph_fingerprint` leaves out.
+
+    Renderings and reductions depend on metric values, types and labels, so
+    their caches key on this as well: a re-analysis of the same graph with
+    other centralities must not return the old result.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for field in fields:
+        digest.update(f"{field}\x1e".encode('utf-8'))
+        digest.update('\x1f'.join(str(node.get(field, '')) for node in nodes).encode('utf-8'))
+        digest.update(b'\x1d')
+    return digest.hexdigest()
+
+
+def _adjacency(node_ids: List[str], edges: List[Dict]) -> sp.csr_matrix:
+    """Symmetric adjacency with log-damped weights, ignoring edges to unknown nodes."""
+    index = {node_id: i for i, node_id in enumerate(node_ids)}
+    pairs = [
+        (index[edge.get('source')], index[edge.get('target')], float(edge.get('weight', 1) or 1))
+        for edge in edges
+        if edge.get('source') in index and edge.get('target') in index and edge.get('source') != edge.get('target')
+    ]
+    n = len(node_ids)
+    if not pairs:
+        return sp.csr_matrix((n, n))
+    rows, cols, weights = (np.array(column) for column in zip(*pairs))
+    weights = 1.0 + np.log1p(np.maximum(weights, 0.0))
+    matrix = sp.csr_matrix((weights, (rows, cols)), shape=(n, n))
+    return (matrix + matrix.T).tocsr()
+
+
+def _repulsion(positions: np.ndarray, k: float, rng: np.random.Generator) -> np.ndarray:
+    """Fruchterman-Reingold repulsion k^2/d for every node, in row chunks."""
+    n = len(positions)
+    others = positions
+    scale = 1.0
+    if n > EXACT_REPULSION_NODES:
+        others = positions[rng.choice(n, size=REPULSION_SAMPLE, replace=False)]
+        scale = n / REPULSION_SAMPLE
+
+    x = positions[:, 0].astype(np.float32)
+    y = positions[:, 1].astype(np.float32)
+    other_x = others[:, 0].astype(np.float32)
+    other_y = others[:, 1].astype(np.float32)
+    k_sq = np.float32(k * k)
+    displacement = np.zeros_like(positions)
+    chunk = max(1, REPULSION_CHUNK_CELLS // len(others))
+    for start in range(0, n, chunk):
+        dx = x[start:start + chunk, None] - other_x[None, :]
+        dy = y[start:start + chunk, None] - other_y[None, :]
+        factor = dx * dx
+        factor += dy * dy
+        np.maximum(factor, np.float32(1e-6), out=factor)
+        np.divide(k_sq, factor, out=factor)
+        displacement[start:start + chunk, 0] = np.einsum('ij,ij->i', dx, factor)
+        displacement[start:start + chunk, 1] = np.einsum('ij,ij->i', dy, factor)
+    return displacement * scale
+
+
+def force_directed(adjacency: sp.csr_matrix, positions: np.ndarray, iterations: int,
+                   temperature: float, seed: int = 42) -> np.ndarray:
+    """Vectorised Fruchterman-Reingold in the unit square, starting from `positions`."""
+    n = adjacency.shape[0]
+    positions = positions.copy()
+    if n < 2:
+        return positions
+
+    rng = np.random.default_rng(seed)
+    k = 1.0 / np.sqrt(n)
+    edges = adjacency.tocoo()
+    cooling = temperature / (iterations + 1)
+    for _ in range(iterations):
+        displacement = _repulsion(positions, k, rng)
+
+        delta = positions[edges.row] - positions[edges.col]
+        distance = np.sqrt((delta ** 2).sum(axis=1))
+        pull = delta * (distance * edges.data / k)[:, None]
+        displacement[:, 0] -= np.bincount(edges.row, weights=pull[:, 0], minlength=n)
+        displacement[:, 1] -= np.bincount(edges.row, weights=pull[:, 1], minlength=n)
+
+        length = np.maximum(np.sqrt((displacement ** 2).sum(axis=1)), 1e-9)
+        positions += displacement * (np.minimum(length, temperature) / length)[:, None]
+        temperature -= cooling
+    return positions
+
+
+def circular(n: int) -> np.ndarray:
+    angles = 2 * np.pi * np.arange(n) / max(n, 1)
+    return 0.5 + 0.5 * np.column_stack([np.cos(angles), np.sin(angles)])
+
+
+def hierarchical(adjacency: sp.csr_matrix) -> np.ndarray:
+    """Layer nodes by BFS depth from the highest-degree node of each component."""
+    n = adjacency.shape[0]
+    if not n:
+        return np.zeros((0, 2))
+    _, component = csgraph.connected_components(adjacency, directed=False)
+    degree = np.diff(adjacency.indptr)
+    order = np.lexsort((-degree, component))
+    roots = order[np.r_[True, component[order][1:] != component[order][:-1]]]
+
+    depth = np.full(n, -1)
+    depth[roots] = 0
+    frontier = np.zeros(n)
+    frontier[roots] = 1.0
+    level = 0
+    structure = adjacency.astype(bool).astype(np.float64)
+    while frontier.any():
+        level += 1
+        reached = (structure @ frontier > 0) & (depth < 0)
+        depth[reached] = level
+        frontier = reached.astype(np.float64)
+
+    positions = np.zeros((n, 2))
+    layer_order = np.lexsort((np.arange(n), component, depth))
+    layers = depth[layer_order]
+    starts = np.r_[0, np.flatnonzero(layers[1:] != layers[:-1]) + 1]
+    sizes = np.diff(np.r_[starts, n])
+    rank_in_layer = np.arange(n) - np.repeat(starts, sizes)
+    positions[layer_order, 0] = (rank_in_layer + 0.5) / np.repeat(sizes, sizes)
+    positions[:, 1] = depth / max(depth.max(), 1)
+    return positions
+
+
+class _RecentLayouts:
+    """The last few force-directed layouts, kept for warm starts."""
+
+    def __init__(self, maxlen: int = RECENT_LAYOUTS):
+        self._layouts = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def add(self, algorithm: str, node_ids: List[str], positions: np.ndarray):
+        with self._lock:
+            self._layouts.append((algorithm, {node_id: i for i, node_id in enumerate(node_ids)}, positions))
+
+    def best_match(self, algorithm: str, node_ids: List[str]) -> Optional[Tuple[Dict[str, int], np.ndarray]]:
+        """Return the recent layout sharing the most nodes, if it shares enough of them."""
+        best, best_shared = None, 0
+        with self._lock:
+            layouts = list(self._layouts)
+        for layout_algorithm, index, positions in layouts:
+            if layout_algorithm != algorithm:
+                continue
+            shared = sum(1 for node_id in node_ids if node_id in index)
+            if shared > best_shared:
+                best, best_shared = (index, positions), shared
+        if best is None or best_shared < MIN_WARM_OVERLAP * max(len(node_ids), len(best[0])):
+            return None
+        return best
+
+
+_recent = _RecentLayouts()
+_layout_cache = LRUCache(LAYOUT_CACHE_SIZE)
+
+
+def _warm_start(adjacency: sp.csr_matrix, node_ids: List[str], previous: Tuple[Dict[str, int], np.ndarray],
+                rng: np.random.Generator) -> np.ndarray:
+    """Keep known nodes where they were; put new ones next to their placed neighbours."""
+    index, previous_positions = previous
+    n = len(node_ids)
+    positions = rng.random((n, 2))
+    known = np.array([node_id in index for node_id in node_ids])
+    positions[known] = previous_positions[[index[node_id] for node_id in node_ids if node_id in index]]
+
+    placed = known.astype(np.float64)
+    neighbour_count = adjacency.astype(bool).astype(np.float64) @ placed
+    new_with_neighbours = ~known & (neighbour_count > 0)
+    if new_with_neighbours.any():
+        neighbour_sum = adjacency.astype(bool).astype(np.float64) @ (positions * placed[:, None])
+        jitter = (rng.random((n, 2)) - 0.5) * (0.05 / np.sqrt(n))
+        centroid = neighbour_sum / np.maximum(neighbour_count, 1)[:, None] + jitter
+        positions[new_with_neighbours] = centroid[new_with_neighbours]
+    return positions
+
+
+def _to_pixels(positions: np.ndarray) -> np.ndarray:
+    """Centre unit-square coordinates on the origin and scale them for rendering."""
+    if not len(positions):
+        return positions
+    span = PIXELS_PER_NODE * np.sqrt(len(positions))
+    return (positions - positions.mean(axis=0)) * span
+
+
+def compute_layout(nodes: List[Dict], edges: List[Dict], algorithm: str = FORCE_ATLAS,
+                   fingerprint: Optional[str] = None) -> np.ndarray:
+    """Return fixed (x, y) pixel coordinates aligned with `nodes`.
+
+    Layouts are cached by graph fingerprint and algorithm. A force-directed
+    layout of a graph that mostly overlaps a recent one starts from the
+    recent positions and runs a few cooler iterations instead of a full run.
+    The returned array is shared and read-only.
+    """
+    fingerprint = fingerprint or graph_fingerprint(nodes, edges)
+
+    def layout():
+        node_ids = [node.get('id') for node in nodes]
+        rng = np.random.default_rng(42)
+        if algorithm == CIRCULAR:
+            positions = circular(len(node_ids))
+        elif algorithm == RANDOM:
+            positions = rng.random((len(node_ids), 2))
+        elif algorithm == HIERARCHICAL:
+            positions = hierarchical(_adjacency(node_ids, edges))
+        else:
+            adjacency = _adjacency(node_ids, edges)
+            previous = _recent.best_match(algorithm, node_ids)
+            if previous is not None:
+                start = _warm_start(adjacency, node_ids, previous, rng)
+                positions = force_directed(adjacency, start, WARM_ITERATIONS, WARM_TEMPERATURE)
+            else:
+                positions = force_directed(adjacency, rng.random((len(node_ids), 2)),
+                                           COLD_ITERATIONS, COLD_TEMPERATURE)
+            _recent.add(algorithm, node_ids, positions)
+
+        pixels = _to_pixels(positions)
+        pixels.flags.writeable = False
+        return pixels
+
+    return _layout_cache.get_or_compute((fingerprint, algorithm), layout)
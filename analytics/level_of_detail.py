@@ -0,0 +1,158 @@
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from analytics.cache import LRUCache
+from analytics.defaults import RENDER_NODE_BUDGET as DEFAULT_NODE_BUDGET
+from analytics.layout import node_attributes_digest
+
+EDGES_PER_NODE = 5
+# At most this share of the node budget is spent on community supernodes;
+# the smallest communities beyond it share one "other" supernode.
+SUPERNODE_SHARE = 0.25
+# Share of the individual node slots reserved for members of expanded communities.
+EXPANDED_SHARE = 0.75
+OTHER_COMMUNITY = -1
+CACHE_SIZE = 32
+
+
+def supernode_id(community: int) -> str:
+    return "community:other" if community == OTHER_COMMUNITY else f"community:{community}"
+
+
+def _top(candidates: np.ndarray, scores: np.ndarray, limit: int) -> np.ndarray:
+    """Return up to `limit` candidates with the highest score."""
+    if limit <= 0 or not len(candidates):
+        return candidates[:0]
+    if len(candidates) <= limit:
+        return candidates
+    return candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+
+
+def reduce_graph(nodes: List[Dict], edges: List[Dict], size_metric: str, node_budget: int,
+                 edge_budget: int, expanded: Tuple[int, ...] = ()) -> Dict:
+    """Reduce an analysed graph to at most `node_budget` nodes and `edge_budget` edges.
+
+    The highest-scoring nodes by `size_metric` are kept as they are; all
+    other nodes collapse into one supernode per community, weighted by the
+    summed metric of their members. Members of `expanded` communities get
+    most of the individual slots, which is how a supernode is drilled into.
+    Edges are re-aggregated onto the rendered nodes and only the heaviest
+    are kept.
+    """
+    n = len(nodes)
+    frame = pd.DataFrame(nodes)
+    scores = frame[size_metric].fillna(0.0).to_numpy(dtype=float) if size_metric in frame else np.zeros(n)
+    community = frame['community'].fillna(-1).to_numpy(dtype=int) if 'community' in frame else np.full(n, -1)
+    # Nodes without a community are grouped with the small ones.
+    community = np.where(community < 0, OTHER_COMMUNITY, community)
+
+    sizes = pd.Series(community).value_counts()
+    max_supernodes = max(1, int(node_budget * SUPERNODE_SHARE))
+    kept_communities = [c for c in sizes.index if c != OTHER_COMMUNITY][:max_supernodes - 1]
+    group = np.where(np.isin(community, kept_communities), community, OTHER_COMMUNITY)
+
+    # Individual nodes: expanded communities first, then the global top.
+    slots = n if n <= node_budget else node_budget - min(len(sizes), max_supernodes)
+    expanded = [c for c in expanded if c in set(group.tolist())]
+    chosen = np.zeros(n, dtype=bool)
+    if expanded:
+        per_community = int(slots * EXPANDED_SHARE) // len(expanded)
+        for c in expanded:
+            chosen[_top(np.flatnonzero(group == c), scores, per_community)] = True
+    chosen[_top(np.flatnonzero(~chosen), scores, slots - int(chosen.sum()))] = True
+
+    # Map every node to its rendered representative.
+    collapsed_groups = sorted(set(group[~chosen].tolist()))
+    group_slot = {c: i for i, c in enumerate(collapsed_groups)}
+    individual = np.flatnonzero(chosen)
+    representative = np.empty(n, dtype=np.int64)
+    representative[individual] = np.arange(len(individual))
+    hidden = np.flatnonzero(~chosen)
+    representative[hidden] = len(individual) + np.array([group_slot[c] for c in group[hidden]], dtype=np.int64)
+
+    rendered_nodes = [dict(nodes[i]) for i in individual]
+    member_counts = np.bincount(representative[hidden] - len(individual), minlength=len(collapsed_groups))
+    metric_sums = np.bincount(representative[hidden] - len(individual), weights=scores[hidden],
+                              minlength=len(collapsed_groups))
+    for c, members, metric_sum in zip(collapsed_groups, member_counts, metric_sums):
+        name = "Other communities" if c == OTHER_COMMUNITY else f"Community {c + 1}"
+        more = " more" if c in expanded else ""
+        rendered_nodes.append({
+            'id': supernode_id(c),
+            'label': f"{name} ({members}{more})",
+            'type': 'community',
+            'community': c,
+            'members': int(members),
+            'degree': int(members),
+            'centrality': 0.0,
+            size_metric: float(metric_sum)
+        })
+
+    # Aggregate edges onto representatives, dropping those inside one supernode.
+    index = {node.get('id'): i for i, node in enumerate(nodes)}
+    edge_frame = pd.DataFrame(edges)
+    rendered_edges: List[Dict] = []
+    pruned = 0
+    if not edge_frame.empty:
+        sources = edge_frame['source'].map(index)
+        targets = edge_frame['target'].map(index)
+        valid = sources.notna() & targets.notna()
+        sources = representative[sources[valid].to_numpy(dtype=np.int64)]
+        targets = representative[targets[valid].to_numpy(dtype=np.int64)]
+        weights = edge_frame.loc[valid, 'weight'].fillna(1).to_numpy(dtype=float) \
+            if 'weight' in edge_frame else np.ones(len(sources))
+        types = edge_frame.loc[valid, 'type'].fillna('default').to_numpy() \
+            if 'type' in edge_frame else np.full(len(sources), 'default', dtype=object)
+
+        low = np.minimum(sources, targets)
+        high = np.maximum(sources, targets)
+        aggregated = pd.DataFrame({'low': low, 'high': high, 'weight': weights, 'type': types})
+        aggregated = aggregated[aggregated['low'] != aggregated['high']]
+        aggregated = aggregated.groupby(['low', 'high'], sort=False).agg(weight=('weight', 'sum'), type=('type', 'first'))
+        aggregated = aggregated.reset_index()
+        pruned = max(0, len(aggregated) - edge_budget)
+        aggregated = aggregated.nlargest(edge_budget, 'weight')
+
+        ids = [node['id'] for node in rendered_nodes]
+        rendered_edges = [
+            {'source': ids[a], 'target': ids[b], 'type': edge_type, 'weight': float(weight)}
+            for a, b, weight, edge_type in zip(aggregated['low'], aggregated['high'],
+                                                aggregated['weight'], aggregated['type'])
+        ]
+
+    return {
+        'nodes': rendered_nodes,
+        'edges': rendered_edges,
+        'hiddenNodes': int(len(hidden)),
+        'supernodes': [
+            {'community': c, 'members': int(members)} for c, members in zip(collapsed_groups, member_counts)
+        ],
+        'prunedEdges': int(pruned)
+    }
+
+
+_reduction_cache = LRUCache(CACHE_SIZE)
+
+
+def over_budget(nodes: List[Dict], edges: List[Dict], node_budget: int = DEFAULT_NODE_BUDGET) -> bool:
+    return len(nodes) > node_budget or len(edges) > node_budget * EDGES_PER_NODE
+
+
+def level_of_detail(nodes: List[Dict], edges: List[Dict], fingerprint: str, size_metric: str = 'degree',
+                    node_budget: int = DEFAULT_NODE_BUDGET, expanded: Tuple[int, ...] = ()) -> Dict:
+    """Return the graph to draw: unchanged when within budget, else reduced and cached.
+
+    The edge budget is `EDGES_PER_NODE` times the node budget.
+    """
+    if not over_budget(nodes, edges, node_budget):
+        return {'nodes': nodes, 'edges': edges, 'hiddenNodes': 0, 'supernodes': [], 'prunedEdges': 0}
+    expanded = tuple(sorted(expanded))
+    edge_budget = node_budget * EDGES_PER_NODE
+    # Which nodes survive depends on their metric values and communities, not just the structure.
+    attributes = node_attributes_digest(nodes, ('type', 'label', 'community', 'degree', 'centrality', size_metric))
+    key = (fingerprint, attributes, size_metric, node_budget, expanded)
+    return _reduction_cache.get_or_compute(
+        key, lambda: reduce_graph(nodes, edges, size_metric, node_budget, edge_budget, expanded)
+    )
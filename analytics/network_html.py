@@ -0,0 +1,183 @@
+import json
+import re
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from analytics.cache import LRUCache
+from analytics.layout import node_attributes_digest
+
+NODE_COLORS = {
+    'post': '#ff7675',
+    'user': '#74b9ff',
+    'hashtag': '#55a3ff',
+    'comment': '#a29bfe',
+    'community': '#fdcb6e',
+    'default': '#636e72'
+}
+EDGE_COLORS = {
+    'mentions': '#e17055',
+    'replies': '#00b894',
+    'shares': '#fdcb6e',
+    'likes': '#6c5ce7',
+    'default': '#636e72'
+}
+SEGMENT_CACHE_SIZE = 64
+HTML_CACHE_SIZE = 16
+
+# vis-network page with named slots. It is split once into literal chunks and
+# slot names, so rendering is a single join of cached, pre-serialised segments.
+_TEMPLATE = """<html>
+<head>
+<meta charset="utf-8">
+<link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/vis-network/9.1.2/dist/dist/vis-network.min.css" integrity="sha512-WgxfT5LWjfszlPHXRmBWHkV2eceiWTOBvrKCNbdgDYTHrT2AeLCGbF4sZlZw3UMN3WtL0tGUoIAKsu8mllg/XA==" crossorigin="anonymous" referrerpolicy="no-referrer" />
+<script src="https://cdnjs.cloudflare.com/ajax/libs/vis-network/9.1.2/dist/vis-network.min.js" integrity="sha512-LnvoEWDFrqGHlHmDD2101OrLcbsfkrzoSpvtSQtxK3RMnRV0eOkhhBN2dXHKRrUU8p2DGRTk35n4O8nWSVe1mQ==" crossorigin="anonymous" referrerpolicy="no-referrer"></script>
+<style type="text/css">
+  html, body { margin: 0; }
+  #network { width: 100%; height: __HEIGHT__; background-color: #ffffff; border: 1px solid lightgray; }
+</style>
+</head>
+<body>
+<div id="network"></div>
+<script type="text/javascript">
+  var nodeData = __NODES__;
+  var edgeData = __EDGES__;
+  if (__SHOW_NODE_LABELS__) {
+    var nodeLabels = __NODE_LABELS__;
+    for (var i = 0; i < nodeData.length; i++) { nodeData[i].label = nodeLabels[i]; }
+  }
+  if (__SHOW_EDGE_LABELS__) {
+    var edgeLabels = __EDGE_LABELS__;
+    for (var j = 0; j < edgeData.length; j++) { edgeData[j].label = edgeLabels[j]; }
+  }
+  var network = new vis.Network(
+    document.getElementById("network"),
+    {nodes: new vis.DataSet(nodeData), edges: new vis.DataSet(edgeData)},
+    __OPTIONS__
+  );
+</script>
+</body>
+</html>
+"""
+_PARTS = re.split(r"__([A-Z_]+)__", _TEMPLATE)
+
+_segment_cache = LRUCache(SEGMENT_CACHE_SIZE)
+_html_cache = LRUCache(HTML_CACHE_SIZE)
+
+
+def _script_safe(text: str) -> str:
+    """Keep serialised data from closing the surrounding <script> element."""
+    return text.replace('</', '<\\/')
+
+
+def _json_values(values: List) -> str:
+    return _script_safe(json.dumps(values, ensure_ascii=False))
+
+
+def scale_values(values: np.ndarray, value_range: Tuple[float, float]) -> np.ndarray:
+    """Map values linearly onto `value_range`, with the largest value at the top."""
+    low, high = value_range
+    top = values.max() if len(values) and values.max() > 0 else 1.0
+    return np.clip(low + (high - low) * values / top, low, high)
+
+
+def edge_widths(weights: np.ndarray, width_range: Tuple[float, float]) -> np.ndarray:
+    """Line widths of edges: twice their weight, clipped to `width_range`."""
+    return np.clip(np.asarray(weights, dtype=float) * 2, width_range[0], width_range[1])
+
+
+def _nodes_segment(nodes: List[Dict], positions: np.ndarray, size_metric: str,
+                   size_range: Tuple[int, int]) -> str:
+    """Serialise node ids, positions, colours, sizes and tooltips in one pass."""
+    frame = pd.DataFrame(nodes)
+    if frame.empty:
+        return '[]'
+    types = frame['type'].fillna('default') if 'type' in frame else pd.Series('default', index=frame.index)
+    degree = frame['degree'].fillna(0) if 'degree' in frame else pd.Series(0, index=frame.index)
+    centrality = frame['centrality'].fillna(0.0) if 'centrality' in frame else pd.Series(0.0, index=frame.index)
+    metric = frame[size_metric].fillna(0.0).to_numpy(dtype=float) if size_metric in frame else np.zeros(len(frame))
+
+    records = pd.DataFrame({
+        'id': frame['id'].astype(str),
+        'x': positions[:, 0],
+        'y': positions[:, 1],
+        'color': types.map(NODE_COLORS).fillna(NODE_COLORS['default']),
+        'size': scale_values(metric, size_range),
+        'shape': 'dot',
+        'title': "Type: " + types.astype(str) + "<br>Degree: " + degree.astype(int).astype(str)
+                 + "<br>Centrality: " + centrality.map('{:.3f}'.format)
+    })
+    return records.to_json(orient='records', double_precision=4)
+
+
+def _edges_segment(edges: List[Dict], width_range: Tuple[int, int]) -> str:
+    """Serialise edge endpoints, colours, widths and tooltips in one pass."""
+    frame = pd.DataFrame(edges)
+    if frame.empty:
+        return '[]'
+    types = frame['type'].fillna('default') if 'type' in frame else pd.Series('default', index=frame.index)
+    weights = frame['weight'].fillna(1) if 'weight' in frame else pd.Series(1, index=frame.index)
+
+    records = pd.DataFrame({
+        'from': frame['source'].astype(str),
+        'to': frame['target'].astype(str),
+        'color': types.map(EDGE_COLORS).fillna(EDGE_COLORS['default']),
+        'width': edge_widths(weights.to_numpy(dtype=float), width_range),
+        'title': "Type: " + types.astype(str) + "<br>Weight: " + weights.astype(str)
+    })
+    return records.to_json(orient='records', double_precision=2)
+
+
+def _options(physics_enabled: bool, physics_options: Optional[Dict], smooth_edges: bool) -> str:
+    physics = dict(physics_options or {})
+    physics['enabled'] = physics_enabled
+    return json.dumps({
+        'physics': physics,
+        'interaction': {'hover': True, 'navigationButtons': True, 'keyboard': True},
+        'edges': {'smooth': {'type': 'continuous'} if smooth_edges else False}
+    })
+
+
+def render_network_html(nodes: List[Dict], edges: List[Dict], positions: np.ndarray, fingerprint: str,
+                        layout_key: str, size_metric: str = 'degree', size_range: Tuple[int, int] = (10, 30),
+                        width_range: Tuple[int, int] = (1, 3), show_labels: bool = True,
+                        show_edge_labels: bool = False, physics_enabled: bool = False,
+                        physics_options: Optional[Dict] = None, smooth_edges: bool = True,
+                        height: str = "600px") -> str:
+    """Return a self-contained vis-network page for an analysed graph.
+
+    The page is cached by graph fingerprint, node attributes and style. Node,
+    edge and label JSON are cached separately, each keyed only by the options
+    it depends on, so toggling labels or physics reuses every serialised segment.
+    """
+    size_range = tuple(size_range)
+    width_range = tuple(width_range)
+    physics_key = json.dumps(physics_options, sort_keys=True)
+    # The fingerprint covers structure only; sizes, tooltips and labels come from node attributes.
+    attributes = node_attributes_digest(nodes, ('type', 'label', 'degree', 'centrality', size_metric))
+    html_key = (fingerprint, attributes, layout_key, size_metric, size_range, width_range, show_labels,
+                show_edge_labels, physics_enabled, physics_key, smooth_edges, height)
+
+    def segment(key: Tuple, compute) -> str:
+        return _segment_cache.get_or_compute((fingerprint,) + key, compute)
+
+    def render() -> str:
+        values = {
+            'HEIGHT': height,
+            'NODES': segment(('nodes', attributes, layout_key, size_metric, size_range),
+                             lambda: _nodes_segment(nodes, positions, size_metric, size_range)),
+            'EDGES': segment(('edges', width_range), lambda: _edges_segment(edges, width_range)),
+            'SHOW_NODE_LABELS': 'true' if show_labels else 'false',
+            'NODE_LABELS': segment(('node_labels', attributes), lambda: _json_values(
+                [str(node.get('label', node.get('id', ''))) for node in nodes]
+            )) if show_labels else '[]',
+            'SHOW_EDGE_LABELS': 'true' if show_edge_labels else 'false',
+            'EDGE_LABELS': segment(('edge_labels',), lambda: _json_values(
+                [str(edge.get('type', '')) for edge in edges]
+            )) if show_edge_labels else '[]',
+            'OPTIONS': _options(physics_enabled, physics_options, smooth_edges)
+        }
+        return ''.join(values[part] if i % 2 else part for i, part in enumerate(_PARTS))
+
+    return _html_cache.get_or_compute(html_key, render)
@@ -0,0 +1,215 @@
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from analytics.cache import LRUCache
+from analytics.layout import node_attributes_digest
+from analytics.network_html import EDGE_COLORS, NODE_COLORS, edge_widths, scale_values
+
+# The WebGL renderer draws this many nodes (and level_of_detail.EDGES_PER_NODE
+# times as many edges) before level of detail kicks in.
+NODE_BUDGET = 20000
+MAX_LABELLED_NODES = 500
+FIGURE_CACHE_SIZE = 8
+# A line trace has a single width, so edge widths are rounded to this step and drawn one trace per width.
+WIDTH_STEP = 0.5
+
+_figure_cache = LRUCache(FIGURE_CACHE_SIZE)
+
+
+def edge_segments(sources: np.ndarray, targets: np.ndarray, positions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Line coordinates for edges as x0, x1, NaN triples, so one trace draws them all."""
+    segments = np.full((len(sources), 3, 2), np.nan)
+    segments[:, 0] = positions[sources]
+    segments[:, 1] = positions[targets]
+    segments = segments.reshape(-1, 2)
+    return segments[:, 0], segments[:, 1]
+
+
+def _edge_traces(nodes: List[Dict], edges: List[Dict], positions: np.ndarray,
+                 width_range: Tuple[int, int]) -> List[go.Scattergl]:
+    frame = pd.DataFrame(edges)
+    if frame.empty:
+        return []
+    index = pd.Series(np.arange(len(nodes)), index=[str(node.get('id', '')) for node in nodes])
+    index = index[~index.index.duplicated()]
+    sources = frame['source'].astype(str).map(index)
+    targets = frame['target'].astype(str).map(index)
+    valid = (sources.notna() & targets.notna()).to_numpy()
+    types = (frame['type'].fillna('default') if 'type' in frame else pd.Series('default', index=frame.index))
+    types = types.astype(str).to_numpy()[valid]
+    weights = frame['weight'].fillna(1) if 'weight' in frame else pd.Series(1, index=frame.index)
+    widths = np.round(edge_widths(weights.to_numpy(dtype=float)[valid], width_range) / WIDTH_STEP) * WIDTH_STEP
+    sources = sources.to_numpy()[valid].astype(np.int64)
+    targets = targets.to_numpy()[valid].astype(np.int64)
+
+    traces = []
+    for edge_type in pd.unique(types):
+        of_type = types == edge_type
+        # One legend entry per edge type; its width traces toggle together.
+        for i, width in enumerate(np.unique(widths[of_type])):
+            mask = of_type & (widths == width)
+            x, y = edge_segments(sources[mask], targets[mask], positions)
+            traces.append(go.Scattergl(
+                x=x, y=y,
+                mode='lines',
+                line=dict(width=float(width), color=EDGE_COLORS.get(edge_type, EDGE_COLORS['default'])),
+                opacity=0.6,
+                hoverinfo='skip',
+                name=f"{edge_type} ({int(of_type.sum()):,})",
+                legendgroup=f"edges:{edge_type}",
+                showlegend=i == 0
+            ))
+    return traces
+
+
+def _node_traces(nodes: List[Dict], positions: np.ndarray, size_metric: str, size_range: Tuple[int, int],
+                 show_labels: bool) -> List[go.Scattergl]:
+    frame = pd.DataFrame(nodes)
+    if frame.empty:
+        return []
+    types = frame['type'].fillna('default').astype(str) if 'type' in frame else pd.Series('default', index=frame.index)
+    labels = frame['label'].fillna(frame['id']).astype(str) if 'label' in frame else frame['id'].astype(str)
+    degree = frame['degree'].fillna(0) if 'degree' in frame else pd.Series(0, index=frame.index)
+    metric = frame[size_metric].fillna(0.0).to_numpy(dtype=float) if size_metric in frame else np.zeros(len(frame))
+    sizes = scale_values(metric, size_range)
+    hover = labels + "<br>Type: " + types + "<br>Degree: " + degree.astype(int).astype(str)
+    show_labels = show_labels and len(frame) <= MAX_LABELLED_NODES
+
+    traces = []
+    for node_type in pd.unique(types):
+        mask = (types == node_type).to_numpy()
+        traces.append(go.Scattergl(
+            x=positions[mask, 0], y=positions[mask, 1],
+            mode='markers+text' if show_labels else 'markers',
+            text=labels[mask].to_numpy() if show_labels else None,
+            textposition='top center',
+            hovertext=hover[mask].to_numpy(),
+            hoverinfo='text',
+            marker=dict(
+                size=sizes[mask],
+                color=NODE_COLORS.get(node_type, NODE_COLORS['default']),
+                line=dict(width=0.5, color='#ffffff')
+            ),
+            name=f"{node_type} ({int(mask.sum()):,})"
+        ))
+    return traces
+
+
+def render_network_figure(nodes: List[Dict], edges: List[Dict], positions: np.ndarray, fingerprint: str,
+                          layout_key: str, size_metric: str = 'degree', size_range: Tuple[int, int] = (10, 30),
+                          width_range: Tuple[int, int] = (1, 3), show_labels: bool = True,
+                          height: int = 600) -> go.Figure:
+    """Return a WebGL Plotly figure of an analysed graph, cached by fingerprint, node attributes and style.
+
+    Edges are drawn as one NaN-separated line trace per edge type and nodes
+    as one marker trace per node type, so the figure stays a handful of
+    traces however large the graph is. Labels are only drawn for graphs of
+    up to `MAX_LABELLED_NODES` nodes; larger ones show them on hover.
+    """
+    size_range = tuple(size_range)
+    width_range = tuple(width_range)
+    # The fingerprint covers structure only; sizes and hover text come from node attributes.
+    attributes = node_attributes_digest(nodes, ('type', 'label', 'degree', size_metric))
+    key = (fingerprint, attributes, layout_key, size_metric, size_range, width_range, show_labels, height)
+
+    def render() -> go.Figure:
+        positions_array = np.asarray(positions, dtype=float).reshape(-1, 2)
+        return go.Figure(
+            data=_edge_traces(nodes, edges, positions_array, width_range)
+            + _node_traces(nodes, positions_array, size_metric, size_range, show_labels),
+            layout=go.Layout(
+                showlegend=True,
+                hovermode='closest',
+                height=height,
+                margin=dict(b=20, l=5, r=5, t=20),
+                legend=dict(orientation='h', yanchor='bottom', y=1.0),
+                xaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
+                yaxis=dict(showgrid=False, zeroline=False, showticklabels=False, autorange='reversed'),
+                plot_bgcolor='#ffffff'
+            )
+        )
+
+    return _figure_cache.get_or_compute(key, render)
+
+
+class PlaybackFigure:
+    """The figure of a `temporal.Playback`, kept between frames and updated with each seek's delta.
+
+    Edge traces are views over the playback's segment buffer: a forward seek
+    extends them by the frame's new edges and a backward seek truncates
+    them, without rebuilding earlier edges. Node traces are redrawn only for
+    the node types an edge of the delta touches.
+    """
+
+    def __init__(self, playback, nodes: List[Dict], height: int = 500):
+        self.playback = playback
+        types = np.array([str(node.get('type', 'default')) for node in nodes], dtype=object)
+        self.labels = np.array([str(node.get('label', node.get('id', ''))) for node in nodes], dtype=object)
+        self.type_names = list(pd.unique(types))
+        codes = {node_type: code for code, node_type in enumerate(self.type_names)}
+        self.type_codes = np.array([codes[node_type] for node_type in types], dtype=np.int64)
+        self.members = [np.flatnonzero(types == node_type) for node_type in self.type_names]
+
+        traces = [
+            go.Scattergl(x=[], y=[], mode='lines', line=dict(width=1, color=EDGE_COLORS['default']),
+                         opacity=0.4, hoverinfo='skip'),
+            go.Scattergl(x=[], y=[], mode='lines', line=dict(width=2, color=EDGE_COLORS['mentions']),
+                         hoverinfo='skip')
+        ]
+        traces += [
+            go.Scattergl(x=[], y=[], mode='markers', hoverinfo='text',
+                         marker=dict(size=7, color=NODE_COLORS.get(node_type, NODE_COLORS['default'])))
+            for node_type in self.type_names
+        ]
+        self.figure = go.Figure(
+            data=traces,
+            layout=go.Layout(
+                showlegend=True,
+                hovermode='closest',
+                height=height,
+                margin=dict(b=20, l=5, r=5, t=20),
+                legend=dict(orientation='h', yanchor='bottom', y=1.0),
+                # Keep the full graph's extent so frames do not rescale while playing.
+                xaxis=dict(showgrid=False, zeroline=False, showticklabels=False,
+                           range=_padded_range(playback.positions[:, 0])),
+                yaxis=dict(showgrid=False, zeroline=False, showticklabels=False,
+                           range=_padded_range(playback.positions[:, 1])[::-1]),
+                plot_bgcolor='#ffffff'
+            )
+        )
+        self._update_nodes(range(len(self.type_names)))
+
+    def _update_nodes(self, type_codes):
+        positions = self.playback.positions
+        for code in type_codes:
+            members = self.members[code]
+            active = members[self.playback.degree[members] > 0]
+            self.figure.data[2 + code].update(
+                x=positions[active, 0], y=positions[active, 1], hovertext=self.labels[active],
+                name=f"{self.type_names[code]} ({len(active):,})"
+            )
+
+    def update(self, frame: Dict) -> go.Figure:
+        """Apply a frame returned by `Playback.seek`: earlier edges, this frame's new edges and active nodes."""
+        playback = self.playback
+        start = frame['deltaStart'] if frame['added'] > 0 else playback.cursor
+        old_x, old_y = playback.edge_coordinates(0, start)
+        new_x, new_y = playback.edge_coordinates(start, playback.cursor)
+        self.figure.data[0].update(x=old_x, y=old_y, name=f"Earlier edges ({start:,})")
+        self.figure.data[1].update(x=new_x, y=new_y, name=f"New this frame ({playback.cursor - start:,})")
+
+        lo, hi = frame['deltaStart'], frame['deltaEnd']
+        touched = np.concatenate([playback.sources[lo:hi], playback.targets[lo:hi]])
+        self._update_nodes(np.unique(self.type_codes[touched]))
+        return self.figure
+
+
+def _padded_range(values: np.ndarray) -> List[float]:
+    if not len(values):
+        return [0.0, 1.0]
+    low, high = float(values.min()), float(values.max())
+    pad = max(high - low, 1.0) * 0.05
+    return [low - pad, high + pad]
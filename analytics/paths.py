@@ -0,0 +1,209 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse import csgraph
+
+from analytics import graph_core, sync
+from analytics.cache import LRUCache
+
+N_LANDMARKS = 16
+MAX_WORKERS = 4
+INDEX_CACHE_SIZE = 8
+PATH_CACHE_SIZE = 4096
+_UNSEEN = -1
+
+
+def _bfs_distances(structure: sp.csr_matrix, source: int) -> np.ndarray:
+    """Hop distances from `source`, one sparse product per BFS level (inf when unreachable)."""
+    n = structure.shape[0]
+    distances = np.full(n, np.inf, dtype=np.float32)
+    distances[source] = 0
+    frontier = np.zeros(n, dtype=np.float32)
+    frontier[source] = 1
+    depth = 0
+    while True:
+        reached = (structure @ frontier > 0) & np.isinf(distances)
+        if not reached.any():
+            return distances
+        depth += 1
+        distances[reached] = depth
+        frontier = reached.astype(np.float32)
+
+
+class PathIndex:
+    """Shortest-path queries over one graph: bidirectional BFS plus an ALT landmark index.
+
+    Landmarks are picked farthest-first inside the largest component and
+    their hop distances to every node are precomputed, so distance bounds
+    for any pair come from a few array lookups:
+    max |d(l, s) - d(l, t)| <= d(s, t) <= min d(l, s) + d(l, t).
+    """
+
+    def __init__(self, adjacency: sp.spmatrix, labels: Sequence[str], n_landmarks: int = N_LANDMARKS):
+        self.adjacency = sp.csr_matrix(adjacency, dtype=np.float32)
+        self.structure = self.adjacency.astype(bool).astype(np.float32)
+        self.labels = list(labels)
+        self.label_index: Dict[str, int] = {}
+        for node, label in enumerate(self.labels):
+            self.label_index.setdefault(str(label), node)
+        self.n_components, self.components = csgraph.connected_components(self.structure, directed=False)
+        self.landmarks, self.landmark_distances = self._build_landmarks(n_landmarks)
+        self._cache = LRUCache(PATH_CACHE_SIZE)
+
+    @property
+    def n_nodes(self) -> int:
+        return self.adjacency.shape[0]
+
+    def _build_landmarks(self, n_landmarks: int) -> Tuple[np.ndarray, np.ndarray]:
+        if not self.n_nodes:
+            return np.zeros(0, dtype=np.int64), np.zeros((0, 0), dtype=np.float32)
+        giant = np.argmax(np.bincount(self.components))
+        in_giant = self.components == giant
+        degree = np.diff(self.structure.indptr)
+        landmarks = [int(np.argmax(np.where(in_giant, degree, -1)))]
+        rows = [_bfs_distances(self.structure, landmarks[0])]
+        nearest = rows[0].copy()
+        for _ in range(min(n_landmarks, int(in_giant.sum())) - 1):
+            candidate = int(np.argmax(np.where(in_giant, nearest, -1)))
+            if nearest[candidate] <= 0:
+                break
+            landmarks.append(candidate)
+            rows.append(_bfs_distances(self.structure, candidate))
+            nearest = np.minimum(nearest, rows[-1])
+        return np.array(landmarks), np.vstack(rows)
+
+    def resolve(self, node: str) -> Optional[int]:
+        """Return the node index for a label (e.g. 'alice', '#python', 'Post 42')."""
+        return self.label_index.get(str(node).strip())
+
+    def estimate(self, source: int, target: int) -> Tuple[float, float]:
+        """Landmark lower and upper bounds on the hop distance between two nodes."""
+        if source == target:
+            return 0.0, 0.0
+        if self.components[source] != self.components[target]:
+            return np.inf, np.inf
+        from_source = self.landmark_distances[:, source]
+        from_target = self.landmark_distances[:, target]
+        finite = np.isfinite(from_source) & np.isfinite(from_target)
+        if not finite.any():
+            return 1.0, np.inf
+        lower = float(np.max(np.abs(from_source[finite] - from_target[finite])))
+        upper = float(np.min(from_source[finite] + from_target[finite]))
+        return max(lower, 1.0), upper
+
+    def _expand(self, frontier: np.ndarray, parents: np.ndarray, depth: np.ndarray,
+                other_depth: np.ndarray) -> Tuple[np.ndarray, Optional[int]]:
+        """Advance one BFS level; return the new frontier and the best meeting node, if any."""
+        block = self.structure[frontier]
+        owners = np.repeat(frontier, np.diff(block.indptr))
+        neighbours = block.indices
+        unseen = depth[neighbours] == _UNSEEN
+        neighbours, owners = neighbours[unseen], owners[unseen]
+        neighbours, first = np.unique(neighbours, return_index=True)
+        parents[neighbours] = owners[first]
+        depth[neighbours] = depth[frontier[0]] + 1
+
+        met = neighbours[other_depth[neighbours] != _UNSEEN]
+        if len(met):
+            return neighbours, int(met[np.argmin(other_depth[met])])
+        return neighbours, None
+
+    def _bidirectional(self, source: int, target: int) -> Optional[List[int]]:
+        """Bidirectional BFS, always expanding the smaller frontier by a full level."""
+        if source == target:
+            return [source]
+        if self.components[source] != self.components[target]:
+            return None
+
+        n = self.n_nodes
+        parents = [np.full(n, _UNSEEN, dtype=np.int64), np.full(n, _UNSEEN, dtype=np.int64)]
+        depths = [np.full(n, _UNSEEN, dtype=np.int64), np.full(n, _UNSEEN, dtype=np.int64)]
+        frontiers = [np.array([source]), np.array([target])]
+        for side, node in ((0, source), (1, target)):
+            parents[side][node] = node
+            depths[side][node] = 0
+
+        meeting = None
+        while meeting is None and len(frontiers[0]) and len(frontiers[1]):
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            frontiers[side], meeting = self._expand(frontiers[side], parents[side], depths[side], depths[1 - side])
+        if meeting is None:
+            return None
+
+        forward = [meeting]
+        while forward[-1] != source:
+            forward.append(int(parents[0][forward[-1]]))
+        backward = []
+        node = meeting
+        while node != target:
+            node = int(parents[1][node])
+            backward.append(node)
+        return forward[::-1] + backward
+
+    def query(self, source: str, target: str) -> Dict:
+        """Shortest path between two node labels, with landmark distance bounds."""
+        source_node, target_node = self.resolve(source), self.resolve(target)
+        result = {'source': source, 'target': target, 'found': False, 'length': None,
+                  'nodes': [], 'weight': 0.0, 'lowerBound': None, 'upperBound': None}
+        if source_node is None or target_node is None:
+            result['error'] = f"Unknown node: {source if source_node is None else target}"
+            return result
+
+        def compute() -> Dict:
+            lower, upper = self.estimate(source_node, target_node)
+            path = self._bidirectional(source_node, target_node)
+            found = {**result, 'lowerBound': lower, 'upperBound': upper}
+            if path is None:
+                return found
+            return {
+                **found,
+                'found': True,
+                'length': len(path) - 1,
+                'nodes': [str(self.labels[node]) for node in path],
+                'weight': float(sum(self.adjacency[a, b] for a, b in zip(path, path[1:])))
+            }
+
+        return self._cache.get_or_compute((source_node, target_node), compute)
+
+    def query_many(self, pairs: Sequence[Tuple[str, str]], max_workers: int = MAX_WORKERS) -> List[Dict]:
+        """Answer many (source, target) queries across worker threads, in input order."""
+        if len(pairs) <= 1:
+            return [self.query(source, target) for source, target in pairs]
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(pairs))) as executor:
+            return list(executor.map(lambda pair: self.query(*pair), pairs))
+
+
+_index_cache = LRUCache(INDEX_CACHE_SIZE)
+
+
+def network_index(kind: str, min_weight: float = graph_core.DEFAULT_MIN_WEIGHT) -> Optional[PathIndex]:
+    """Path index of a user, hashtag or full network, rebuilt once per dataset version."""
+    def build() -> Optional[PathIndex]:
+        graph = graph_core.build_network(kind, min_weight)
+        if graph is None or not graph.n_nodes:
+            return None
+        return PathIndex(graph.adjacency, graph.labels)
+
+    return _index_cache.get_or_compute(('network', kind, min_weight, sync.dataset_version()), build)
+
+
+def payload_index(nodes: List[Dict], edges: List[Dict], fingerprint: str) -> PathIndex:
+    """Path index of an analysis payload's graph (e.g. a post network), cached by fingerprint."""
+    def build() -> PathIndex:
+        index = {node.get('id'): i for i, node in enumerate(nodes)}
+        pairs = [
+            (index[edge['source']], index[edge['target']], float(edge.get('weight', 1) or 1))
+            for edge in edges
+            if edge.get('source') in index and edge.get('target') in index
+        ]
+        n = len(nodes)
+        adjacency = sp.csr_matrix((n, n), dtype=np.float32)
+        if pairs:
+            rows, cols, weights = (np.array(column) for column in zip(*pairs))
+            adjacency = sp.csr_matrix((weights, (rows, cols)), shape=(n, n))
+            adjacency = adjacency.maximum(adjacency.T)
+        return PathIndex(adjacency, [node.get('label', node.get('id')) for node in nodes])
+
+    return _index_cache.get_or_compute(('payload', fingerprint), build)
@@ -0,0 +1,151 @@
+import bisect
+import re
+import threading
+from array import array
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from analytics import records, sync
+from analytics.cache import LRUCache
+
+DEFAULT_LIMIT = 20
+PREVIEW_CHARS = 50
+# A prefix matching more tokens than this only uses its most frequent ones.
+MAX_PREFIX_TOKENS = 64
+# Term and prefix row arrays kept between keystrokes, until the next sync.
+TERM_CACHE_SIZE = 256
+
+_token_pattern = re.compile(r"[\w']+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens, kept whole so '@names' and short words stay searchable."""
+    return _token_pattern.findall((text or '').lower())
+
+
+def preview(post: Dict) -> str:
+    """The picker label of a post: its author and the start of its content."""
+    content = post.get('content') or 'No content'
+    if len(content) > PREVIEW_CHARS:
+        content = content[:PREVIEW_CHARS] + "..."
+    return f"{post.get('author') or 'Unknown'} - {content}"
+
+
+class PostSearchIndex:
+    """Token and prefix index over post authors and content for the post picker.
+
+    Each token maps to the (increasing) rows of the posts containing it, and
+    a sorted token list answers prefix lookups with a binary search. A query
+    costs time proportional to the matching postings, not to the number of
+    posts, and returns the most recently synced matches first.
+    """
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.previews: List[str] = []
+        self.postings: Dict[str, array] = {}
+        self.authors = set()
+        self.hashtag_count = 0
+        self.comment_count = 0
+        self._sorted_tokens: List[str] = []
+        self._dirty = False
+        self._term_cache = LRUCache(TERM_CACHE_SIZE)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add_posts(self, posts: List[Dict]):
+        with self._lock:
+            batch = defaultdict(list)
+            for post in posts:
+                if not post.get('id'):
+                    continue
+                row = len(self.ids)
+                self.ids.append(post['id'])
+                self.previews.append(preview(post))
+                author = post.get('author') or ''
+                if author:
+                    self.authors.add(author)
+                self.hashtag_count += len(records.post_hashtags(post))
+                self.comment_count += int(post.get('commentCount') or 0)
+                for token in set(tokenize(f"{author} {post.get('content') or ''}")):
+                    batch[token].append(row)
+
+            for token, rows in batch.items():
+                postings = self.postings.get(token)
+                if postings is None:
+                    postings = self.postings[token] = array('q')
+                    self._dirty = True
+                postings.extend(rows)
+            if batch:
+                self._term_cache.clear()
+
+    def _term_rows(self, term: str, prefix: bool) -> np.ndarray:
+        """Rows containing `term` (or, with `prefix`, any token starting with it), cached until the next sync.
+
+        Postings are copied: a live view would stop `add_posts` from extending them.
+        """
+        return self._term_cache.get_or_compute((term, prefix), lambda: self._collect_rows(term, prefix))
+
+    def _collect_rows(self, term: str, prefix: bool) -> np.ndarray:
+        if not prefix:
+            postings = self.postings.get(term)
+            return np.array(postings, dtype=np.int64) if postings else np.zeros(0, dtype=np.int64)
+        lo = bisect.bisect_left(self._sorted_tokens, term)
+        hi = bisect.bisect_left(self._sorted_tokens, term + '\uffff')
+        tokens = self._sorted_tokens[lo:hi]
+        if len(tokens) > MAX_PREFIX_TOKENS:
+            tokens = sorted(tokens, key=lambda token: len(self.postings[token]), reverse=True)[:MAX_PREFIX_TOKENS]
+        if not tokens:
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(np.concatenate([np.array(self.postings[token], dtype=np.int64) for token in tokens]))
+
+    def search(self, query: str, limit: int = DEFAULT_LIMIT) -> List[Dict]:
+        """Top `limit` posts matching every query word; the last word may be a prefix.
+
+        An empty query returns the most recently synced posts.
+        """
+        terms = tokenize(query)
+        with self._lock:
+            if not terms:
+                rows = range(len(self.ids) - 1, max(-1, len(self.ids) - 1 - limit), -1)
+                return [{'id': self.ids[row], 'label': self.previews[row]} for row in rows]
+            if self._dirty:
+                self._sorted_tokens = sorted(self.postings)
+                self._dirty = False
+
+            # Rarest exact terms first keeps the intersections small.
+            exact = sorted((self._term_rows(term, False) for term in terms[:-1]), key=len)
+            rows: Optional[np.ndarray] = None
+            for term_rows in exact + [self._term_rows(terms[-1], True)]:
+                rows = term_rows if rows is None else np.intersect1d(rows, term_rows, assume_unique=True)
+                if not len(rows):
+                    return []
+            return [{'id': self.ids[row], 'label': self.previews[row]} for row in rows[::-1][:limit].tolist()]
+
+    def stats(self) -> Dict:
+        return {
+            'posts': len(self.ids),
+            'authors': len(self.authors),
+            'hashtags': self.hashtag_count,
+            'avgComments': self.comment_count / len(self.ids) if self.ids else 0.0
+        }
+
+
+_index: Optional[PostSearchIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_post_index() -> PostSearchIndex:
+    """Return the process-wide post search index."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = PostSearchIndex()
+        return _index
+
+
+sync.posts_log.register('post_index', lambda posts: get_post_index().add_posts(posts))
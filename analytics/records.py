@@ -0,0 +1,49 @@
+import re
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+_hashtag_separator = re.compile(r"[\s,;]+")
+_mention_pattern = re.compile(r"@(\w+)")
+
+
+def post_hashtags(post: Dict) -> List[str]:
+    """Return a post's hashtags as a list of lowercase tags without the leading '#'.
+
+    The backend DTO stores hashtags as one delimited string; mock data uses lists.
+    """
+    hashtags = post.get('hashtags') or []
+    if isinstance(hashtags, str):
+        hashtags = _hashtag_separator.split(hashtags)
+    return [tag.lstrip('#').lower() for tag in hashtags if tag and tag.lstrip('#')]
+
+
+def mentions(text: Optional[str]) -> List[str]:
+    """Return the @-mentioned user names in a piece of text."""
+    return _mention_pattern.findall(text or '')
+
+
+def post_text(post: Dict) -> str:
+    """Return the analysable text of a post: its content followed by its hashtags."""
+    return f"{post.get('content') or ''} {' '.join(post_hashtags(post))}".strip()
+
+
+def parse_timestamp(value) -> Optional[datetime]:
+    """Parse a backend timestamp (ISO string or epoch milliseconds) to a naive UTC datetime."""
+    if value is None or value == '':
+        return None
+
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value / 1000, tz=timezone.utc).replace(tzinfo=None)
+
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        text = str(value).strip().replace('Z', '+00:00')
+        try:
+            parsed = datetime.fromisoformat(text)
+        except ValueError:
+            return None
+
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
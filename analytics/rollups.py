@@ -0,0 +1,223 @@
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from analytics import records, store, sync
+
+STATE_NAME = "rollups/tables"
+HOUR = 3600
+DAY = 86400
+RESOLUTIONS = {'hour': HOUR, 'day': DAY}
+# Ranges up to this long are charted per hour, longer ones per day.
+MAX_HOURLY_RANGE = timedelta(days=7)
+
+SENTIMENTS = ('positive', 'neutral', 'negative')
+ENGAGEMENT = ('likeCount', 'commentCount', 'shareCount')
+METRICS = ('posts', 'comments') + SENTIMENTS + ENGAGEMENT
+_COLUMNS = {metric: i for i, metric in enumerate(METRICS)}
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _seconds(timestamp: datetime) -> int:
+    return int((timestamp - _EPOCH).total_seconds())
+
+
+def _metric_row(record: Dict, kind: str) -> List[int]:
+    """One record's contribution to every metric: its count, sentiment and (for posts) engagement."""
+    row = [0] * len(METRICS)
+    row[_COLUMNS[kind]] = 1
+    sentiment = str(record.get('sentiment') or '').lower()
+    if sentiment in SENTIMENTS:
+        row[_COLUMNS[sentiment]] = 1
+    if kind == 'posts':
+        for field in ENGAGEMENT:
+            try:
+                row[_COLUMNS[field]] = int(record.get(field) or 0)
+            except (TypeError, ValueError):
+                pass
+    return row
+
+
+class RollupTable:
+    """Metric sums per fixed-width time bucket, as sorted bucket keys and a value matrix.
+
+    Updates build new arrays and swap them in together, so a concurrent
+    reader always sees a consistent table.
+    """
+
+    def __init__(self, seconds: int):
+        self.seconds = seconds
+        self.buckets = (np.zeros(0, dtype=np.int64), np.zeros((0, len(METRICS)), dtype=np.int64))
+
+    def __len__(self):
+        return len(self.buckets[0])
+
+    @property
+    def keys(self) -> np.ndarray:
+        return self.buckets[0]
+
+    def add(self, seconds: np.ndarray, rows: np.ndarray):
+        """Add metric rows into the buckets of their timestamps (epoch seconds)."""
+        keys, inverse = np.unique(seconds // self.seconds, return_inverse=True)
+        sums = np.zeros((len(keys), len(METRICS)), dtype=np.int64)
+        np.add.at(sums, inverse, rows)
+
+        old_keys, values = self.buckets
+        positions = np.searchsorted(old_keys, keys)
+        existing = positions < len(old_keys)
+        existing[existing] = old_keys[positions[existing]] == keys[existing]
+        values = values.copy()
+        values[positions[existing]] += sums[existing]
+        new = ~existing
+        self.buckets = (np.insert(old_keys, positions[new], keys[new]),
+                        np.insert(values, positions[new], sums[new], axis=0))
+
+    def slice(self, start: int, end: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Keys and values of the buckets [start, end)."""
+        keys, values = self.buckets
+        lo, hi = np.searchsorted(keys, [start, end])
+        return keys[lo:hi], values[lo:hi]
+
+
+class TimeRollups:
+    """Hourly and daily rollups of post and comment counts, sentiment mix and engagement sums.
+
+    Each synced record is reduced to one metric row and added into its hour
+    and day buckets, so a batch costs only its own size. A date range is
+    answered by merging buckets: whole days come from the daily table and
+    the partial days at either end from the hourly one. Times are UTC.
+    """
+
+    def __init__(self):
+        self.tables = {name: RollupTable(seconds) for name, seconds in RESOLUTIONS.items()}
+        self.version = 0
+
+    def _add(self, items: List[Dict], kind: str) -> int:
+        seconds, rows = [], []
+        for item in items:
+            timestamp = records.parse_timestamp(item.get('timestamp'))
+            if timestamp is not None:
+                seconds.append(_seconds(timestamp))
+                rows.append(_metric_row(item, kind))
+        if not seconds:
+            return 0
+
+        seconds, rows = np.array(seconds, dtype=np.int64), np.array(rows, dtype=np.int64)
+        for table in self.tables.values():
+            table.add(seconds, rows)
+        self.version += 1
+        return len(seconds)
+
+    def add_posts(self, posts: List[Dict]) -> int:
+        """Roll up newly synced posts and return how many had a timestamp."""
+        return self._add(posts, 'posts')
+
+    def add_comments(self, comments: List[Dict]) -> int:
+        """Roll up newly synced comments and return how many had a timestamp."""
+        return self._add(comments, 'comments')
+
+    def time_range(self) -> Optional[Tuple[datetime, datetime]]:
+        """Start of the first and end of the last hour holding any record."""
+        hours = self.tables['hour'].keys
+        if not len(hours):
+            return None
+        return (_EPOCH + timedelta(seconds=int(hours[0]) * HOUR),
+                _EPOCH + timedelta(seconds=(int(hours[-1]) + 1) * HOUR))
+
+    def totals(self, start: datetime, end: datetime) -> Dict[str, int]:
+        """Metric sums over every hour overlapping [start, end)."""
+        first_hour = _seconds(start) // HOUR
+        end_hour = -(-_seconds(end) // HOUR)
+        hours_per_day = DAY // HOUR
+        first_day = -(-first_hour // hours_per_day)
+        end_day = end_hour // hours_per_day
+
+        hours, days = self.tables['hour'], self.tables['day']
+        if first_day < end_day:
+            parts = [hours.slice(first_hour, first_day * hours_per_day)[1],
+                     days.slice(first_day, end_day)[1],
+                     hours.slice(end_day * hours_per_day, end_hour)[1]]
+        else:
+            parts = [hours.slice(first_hour, end_hour)[1]]
+        sums = sum(part.sum(axis=0) for part in parts)
+        return {metric: int(sums[i]) for i, metric in enumerate(METRICS)}
+
+    def series(self, start: datetime, end: datetime, resolution: Optional[str] = None) -> Dict[str, np.ndarray]:
+        """Per-bucket metrics over [start, end), trimmed to the synced data, with empty buckets as zeros.
+
+        Returns the bucket start times under 'date' and one array per metric.
+        The resolution defaults to hourly for ranges up to MAX_HOURLY_RANGE.
+        """
+        resolution = resolution or ('hour' if end - start <= MAX_HOURLY_RANGE else 'day')
+        table = self.tables[resolution]
+        keys, values = table.slice(_seconds(start) // table.seconds, -(-_seconds(end) // table.seconds))
+        if not len(keys):
+            dense_keys = keys
+            dense = np.zeros((0, len(METRICS)), dtype=np.int64)
+        else:
+            dense_keys = np.arange(keys[0], keys[-1] + 1)
+            dense = np.zeros((len(dense_keys), len(METRICS)), dtype=np.int64)
+            dense[keys - keys[0]] = values
+
+        result = {'date': (dense_keys * table.seconds).astype('datetime64[s]')}
+        result.update({metric: dense[:, i] for i, metric in enumerate(METRICS)})
+        return result
+
+    def over_time(self, start: datetime, end: datetime, resolution: Optional[str] = None) -> Dict[str, List[Dict]]:
+        """postsOverTime, commentsOverTime and sentimentOverTime in the shape of the backend statistics."""
+        series = self.series(start, end, resolution)
+        dates = series['date'].astype(datetime)
+        return {
+            'postsOverTime': [{'date': date, 'count': int(count)} for date, count in zip(dates, series['posts'])],
+            'commentsOverTime': [
+                {'date': date, 'count': int(count)} for date, count in zip(dates, series['comments'])
+            ],
+            'sentimentOverTime': [
+                {'date': date, **{sentiment: int(series[sentiment][i]) for sentiment in SENTIMENTS}}
+                for i, date in enumerate(dates)
+            ]
+        }
+
+
+class _RollupStage:
+    """Sync stage wrapping the process-wide rollups with durable de-duplication."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.seen = {'posts': store.SeenIds("rollups/posts"), 'comments': store.SeenIds("rollups/comments")}
+        rollups = store.load_state(STATE_NAME)
+        self.rollups = rollups if isinstance(rollups, TimeRollups) else TimeRollups()
+
+    def update(self, items: List[Dict], kind: str):
+        with self.lock:
+            seen = self.seen[kind]
+            items = seen.filter_new(items)
+            if not items:
+                return
+            if self.rollups._add(items, kind):
+                store.save_state(STATE_NAME, self.rollups)
+            seen.mark(item['id'] for item in items)
+
+
+_stage: Optional[_RollupStage] = None
+_stage_lock = threading.Lock()
+
+
+def _get_stage() -> _RollupStage:
+    global _stage
+    with _stage_lock:
+        if _stage is None:
+            _stage = _RollupStage()
+        return _stage
+
+
+def get_rollups() -> TimeRollups:
+    """Return the process-wide time rollups."""
+    return _get_stage().rollups
+
+
+sync.posts_log.register('rollups_posts', lambda posts: _get_stage().update(posts, 'posts'))
+sync.comments_log.register('rollups_comments', lambda comments: _get_stage().update(comments, 'comments'))
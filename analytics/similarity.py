@@ -0,0 +1,299 @@
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import HashingVectorizer
+
+from analytics import records, store, sync
+
+STATE_DIR = "similarity"
+N_FEATURES = 2 ** 18
+SCORE_CHUNK_ROWS = 262144
+QUERY_BATCH = 32
+DEFAULT_TOP_K = 20
+
+_vectorizer = HashingVectorizer(
+    n_features=N_FEATURES,
+    alternate_sign=False,
+    stop_words='english',
+    norm=None
+)
+
+# Files appended per sync; `indptr` is written last and defines the row count.
+_FILES = {
+    'data': np.float32,
+    'indices': np.int32,
+    'id_hash': np.uint64,
+    'id_offsets': np.int64,
+    'indptr': np.int64,
+}
+# Document frequency per feature, updated in place; the extra last slot counts the rows included.
+DF_FILE = 'df'
+
+
+def _path(name: str) -> str:
+    return store.data_path(f"{STATE_DIR}/{name}.bin")
+
+
+def _map(name: str) -> np.ndarray:
+    """Memory-map an append-only array file, or return an empty array."""
+    path = _path(name)
+    dtype = _FILES.get(name, np.uint8)
+    if not os.path.exists(path) or os.path.getsize(path) < np.dtype(dtype).itemsize:
+        return np.empty(0, dtype=dtype)
+    # A torn trailing element is ignored here and cut off by `_repair`
+    return np.memmap(path, dtype=dtype, mode='r', shape=(os.path.getsize(path) // np.dtype(dtype).itemsize,))
+
+
+def _append(name: str, values: np.ndarray):
+    with open(_path(name), 'ab') as f:
+        np.ascontiguousarray(values, dtype=_FILES.get(name, np.uint8)).tofile(f)
+
+
+def _truncate(name: str, length: int):
+    """Cut an array file down to `length` elements."""
+    path = _path(name)
+    size = length * np.dtype(_FILES.get(name, np.uint8)).itemsize
+    if os.path.exists(path) and os.path.getsize(path) > size:
+        os.truncate(path, size)
+
+
+def _repair() -> int:
+    """Cut every array file to the rows `indptr` fully describes and return the row count.
+
+    An append interrupted before `indptr` leaves its data, index and id bytes
+    behind; without this they would shift every later row.
+    """
+    for name, initial in (('indptr', [0]), ('id_offsets', [0])):
+        if not len(_map(name)):
+            _truncate(name, 0)
+            _append(name, np.array(initial))
+    indptr, id_offsets = _map('indptr'), _map('id_offsets')
+    n_rows = min(len(indptr) - 1, len(id_offsets) - 1, len(_map('id_hash')))
+    # Rows whose data or id bytes are missing cannot be kept either
+    n_rows = min(n_rows,
+                 int(np.searchsorted(indptr[:n_rows + 1], min(len(_map('data')), len(_map('indices'))), 'right')) - 1,
+                 int(np.searchsorted(id_offsets[:n_rows + 1], len(_map('ids')), 'right')) - 1)
+    nnz, id_bytes = int(indptr[n_rows]), int(id_offsets[n_rows])
+    del indptr, id_offsets
+    for name, length in (('indptr', n_rows + 1), ('id_offsets', n_rows + 1), ('id_hash', n_rows),
+                         ('data', nnz), ('indices', nnz), ('ids', id_bytes)):
+        _truncate(name, length)
+    return n_rows
+
+
+class SimilarityIndex:
+    """Persisted TF-IDF index answering cosine top-k "more like this" queries.
+
+    Rows are L2-normalised TF-IDF vectors weighted with the IDF known when the
+    row was appended, stored as a CSR matrix split across raw binary files and
+    memory-mapped on load. Appending new posts writes only their rows and the
+    document frequencies of their terms, and merges their id hashes into the
+    sorted lookup.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        with self._lock:
+            _repair()
+            self._load()
+            self._load_df()
+            self._hash_order = np.argsort(self.id_hash, kind='stable')
+            self._sorted_hashes = self.id_hash[self._hash_order]
+
+    def _load(self):
+        """(Re)map the on-disk arrays."""
+        self.indptr = _map('indptr')
+        self.n_rows = max(len(self.indptr) - 1, 0)
+        nnz = int(self.indptr[-1]) if self.n_rows else 0
+        self.data = _map('data')[:nnz]
+        self.indices = _map('indices')[:nnz]
+        self.id_hash = _map('id_hash')[:self.n_rows]
+        self.id_offsets = _map('id_offsets')[:self.n_rows + 1]
+        self.id_bytes = _map('ids')
+
+    def _load_df(self):
+        """Map the document frequencies, counting any rows appended after their last update.
+
+        Every row stores each of its terms once, so the frequencies of the
+        missing rows are a bincount of their indices.
+        """
+        path = _path(DF_FILE)
+        fresh = not os.path.exists(path) or os.path.getsize(path) != (N_FEATURES + 1) * 8
+        self._df_file = np.memmap(path, dtype=np.int64, mode='w+' if fresh else 'r+', shape=(N_FEATURES + 1,))
+        counted = int(self._df_file[N_FEATURES])
+        if counted > self.n_rows:
+            self._df_file[:] = 0
+            counted = 0
+        if counted < self.n_rows:
+            start = int(self.indptr[counted])
+            self._df_file[:N_FEATURES] += np.bincount(self.indices[start:], minlength=N_FEATURES)
+            self._df_file[N_FEATURES] = self.n_rows
+            self._df_file.flush()
+        self.df = self._df_file[:N_FEATURES]
+
+    @property
+    def n_docs(self) -> int:
+        return int(self._df_file[N_FEATURES])
+
+    def __len__(self):
+        return self.n_rows
+
+    def _row_block(self, start: int, end: int) -> sp.csr_matrix:
+        """Return rows [start, end) as a CSR view over the mapped arrays, without copying."""
+        indptr = np.asarray(self.indptr[start:end + 1])
+        return sp.csr_matrix(
+            (self.data[indptr[0]:indptr[-1]], self.indices[indptr[0]:indptr[-1]], indptr - indptr[0]),
+            shape=(end - start, N_FEATURES),
+            copy=False
+        )
+
+    def _idf(self) -> np.ndarray:
+        return np.log((1 + self.n_docs) / (1 + self.df)) + 1.0
+
+    def _weight(self, counts: sp.csr_matrix) -> sp.csr_matrix:
+        """Apply sublinear TF, the current IDF and L2 normalisation."""
+        weighted = counts.astype(np.float32)
+        weighted.data = 1.0 + np.log(weighted.data)
+        weighted = weighted.multiply(self._idf().astype(np.float32)).tocsr()
+        norms = np.sqrt(np.asarray(weighted.multiply(weighted).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        return sp.csr_matrix(sp.diags(1.0 / norms) @ weighted, dtype=np.float32)
+
+    def rows_of(self, post_ids: List[str]) -> np.ndarray:
+        """Return the row of each post id, or -1 for posts not in the index."""
+        hashes = np.array([store.id_hash(post_id) for post_id in post_ids], dtype=np.uint64)
+        if not self.n_rows:
+            return np.full(len(hashes), -1, dtype=np.int64)
+        positions = np.searchsorted(self._sorted_hashes, hashes)
+        positions[positions == self.n_rows] = 0
+        found = self._sorted_hashes[positions] == hashes
+        return np.where(found, self._hash_order[positions], -1)
+
+    def post_id(self, row: int) -> str:
+        """Return the post id stored at a row."""
+        start, end = self.id_offsets[row], self.id_offsets[row + 1]
+        return bytes(self.id_bytes[start:end]).decode('utf-8')
+
+    def append(self, posts: List[Dict]) -> int:
+        """Append rows for posts not indexed yet and return how many were added."""
+        with self._lock:
+            posts = [post for post in posts if post.get('id') and records.post_text(post)]
+            if not posts:
+                return 0
+            rows = self.rows_of([post['id'] for post in posts])
+            unique = {}
+            for post, row in zip(posts, rows):
+                if row < 0:
+                    unique.setdefault(post['id'], post)
+            posts = list(unique.values())
+            if not posts:
+                return 0
+
+            # Drop anything a crashed append left behind before writing after it
+            if _repair() != self.n_rows:
+                self._load()
+            counts = _vectorizer.transform([records.post_text(post) for post in posts]).tocsr()
+            features, document_counts = np.unique(counts.indices, return_counts=True)
+            self.df[features] += document_counts
+            self._df_file[N_FEATURES] += len(posts)
+            weighted = self._weight(counts)
+
+            encoded = [post['id'].encode('utf-8') for post in posts]
+            id_lengths = np.array([len(value) for value in encoded], dtype=np.int64)
+            hashes = np.array([store.id_hash(post['id']) for post in posts], dtype=np.uint64)
+            base_nnz = int(self.indptr[-1]) if len(self.indptr) else 0
+            base_id_bytes = int(self.id_offsets[-1]) if len(self.id_offsets) else 0
+            base_rows = self.n_rows
+
+            _append('data', weighted.data)
+            _append('indices', weighted.indices)
+            _append('ids', np.frombuffer(b''.join(encoded), dtype=np.uint8))
+            _append('id_offsets', base_id_bytes + np.cumsum(id_lengths))
+            _append('id_hash', hashes)
+            _append('indptr', base_nnz + weighted.indptr[1:])
+            # Only the touched pages are written back
+            self._df_file.flush()
+            self._load()
+
+            order = np.argsort(hashes, kind='stable')
+            positions = np.searchsorted(self._sorted_hashes, hashes[order], side='right')
+            self._sorted_hashes = np.insert(self._sorted_hashes, positions, hashes[order])
+            self._hash_order = np.insert(self._hash_order, positions, base_rows + order)
+            return len(posts)
+
+    def _top_k(self, queries: sp.csr_matrix, k: int, exclude_rows: np.ndarray) -> List[List[Tuple[int, float]]]:
+        """Score a batch of query rows against every indexed row in chunks."""
+        n_queries = queries.shape[0]
+        best_rows = np.empty((n_queries, 0), dtype=np.int64)
+        best_scores = np.empty((n_queries, 0), dtype=np.float32)
+        Q = queries.T.toarray().astype(np.float32)
+
+        for start in range(0, self.n_rows, SCORE_CHUNK_ROWS):
+            end = min(start + SCORE_CHUNK_ROWS, self.n_rows)
+            scores = np.asarray(self._row_block(start, end) @ Q).T
+            for i, row in enumerate(exclude_rows):
+                if start <= row < end:
+                    scores[i, row - start] = -np.inf
+
+            take = min(k, end - start)
+            top = np.argpartition(-scores, take - 1, axis=1)[:, :take]
+            best_rows = np.hstack([best_rows, top + start])
+            best_scores = np.hstack([best_scores, np.take_along_axis(scores, top, axis=1)])
+
+            if best_rows.shape[1] > k:
+                keep = np.argpartition(-best_scores, k - 1, axis=1)[:, :k]
+                best_rows = np.take_along_axis(best_rows, keep, axis=1)
+                best_scores = np.take_along_axis(best_scores, keep, axis=1)
+
+        results = []
+        for rows, scores in zip(best_rows, best_scores):
+            order = np.argsort(-scores)
+            results.append([
+                (int(rows[i]), float(scores[i])) for i in order if np.isfinite(scores[i]) and scores[i] > 0
+            ])
+        return results
+
+    def similar_posts(self, post_ids: List[str], k: int = DEFAULT_TOP_K) -> Dict[str, List[Dict]]:
+        """Return the top-k most similar indexed posts for each post id."""
+        with self._lock:
+            rows = self.rows_of(post_ids)
+            results = {post_id: [] for post_id in post_ids}
+            known = [(post_id, row) for post_id, row in zip(post_ids, rows) if row >= 0]
+
+            for start in range(0, len(known), QUERY_BATCH):
+                batch = known[start:start + QUERY_BATCH]
+                batch_rows = np.array([row for _, row in batch])
+                queries = sp.vstack([self._row_block(row, row + 1) for row in batch_rows], format='csr')
+                for (post_id, _), matches in zip(batch, self._top_k(queries, k, batch_rows)):
+                    results[post_id] = [
+                        {'id': self.post_id(row), 'score': score} for row, score in matches
+                    ]
+            return results
+
+    def similar_to_text(self, text: str, k: int = DEFAULT_TOP_K) -> List[Dict]:
+        """Return the top-k indexed posts most similar to free text."""
+        with self._lock:
+            if not self.n_rows:
+                return []
+            query = self._weight(_vectorizer.transform([text]).tocsr())
+            matches = self._top_k(query, k, np.array([-1]))[0]
+            return [{'id': self.post_id(row), 'score': score} for row, score in matches]
+
+
+_index: Optional[SimilarityIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_similarity_index() -> SimilarityIndex:
+    """Return the process-wide similarity index, memory-mapping it on first use."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SimilarityIndex()
+        return _index
+
+
+sync.posts_log.register('similarity', lambda posts: get_similarity_index().append(posts))
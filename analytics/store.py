@@ -0,0 +1,147 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+
+DATA_DIR_ENV = "FBREAPER_DATA_DIR"
+DEFAULT_DATA_DIR = ".fbreaper_data"
+
+
+def get_data_dir() -> str:
+    """Return the directory holding persisted analytics state, creating it if needed."""
+    path = os.environ.get(DATA_DIR_ENV, DEFAULT_DATA_DIR)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def data_path(name: str) -> str:
+    """Return the absolute path of a file inside the data directory."""
+    path = os.path.join(get_data_dir(), name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+def _atomic_write(path: str, write_fn, mode: str = 'wb'):
+    """Write a file through a temporary sibling and rename it into place."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, mode) as f:
+            write_fn(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def load_state(name: str, default: Any = None) -> Any:
+    """Load a pickled state object, returning `default` when missing or unreadable."""
+    try:
+        with open(data_path(f"{name}.pkl"), 'rb') as f:
+            return pickle.load(f)
+    except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+        return default
+
+
+def save_state(name: str, obj: Any):
+    """Atomically persist a state object."""
+    _atomic_write(
+        data_path(f"{name}.pkl"),
+        lambda f: pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+    )
+
+
+def save_array(name: str, values: np.ndarray):
+    """Atomically persist a numpy array as a .npy file."""
+    _atomic_write(data_path(f"{name}.npy"), lambda f: np.save(f, values))
+
+
+def load_array(name: str) -> np.ndarray:
+    """Memory-map a persisted numpy array read-only."""
+    return np.load(data_path(f"{name}.npy"), mmap_mode='r')
+
+
+def append_lines(name: str, lines: Iterable[str]):
+    """Append lines to an append-only text log."""
+    with open(data_path(name), 'a', encoding='utf-8') as f:
+        for line in lines:
+            f.write(line)
+            f.write('\n')
+
+
+def read_lines(name: str) -> List[str]:
+    """Read every line of an append-only text log."""
+    try:
+        with open(data_path(name), 'r', encoding='utf-8') as f:
+            return [line.rstrip('\n') for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def remove(name: str):
+    """Delete a persisted file if it exists."""
+    try:
+        os.unlink(data_path(name))
+    except FileNotFoundError:
+        pass
+
+
+def id_hash(record_id: str) -> int:
+    """Return a stable 64-bit hash of a record id."""
+    return int.from_bytes(hashlib.blake2b(str(record_id).encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class SeenIds:
+    """Durable set of processed record ids, kept as sorted 64-bit hashes.
+
+    New hashes are appended to a binary log, so marking a batch costs only the
+    batch; membership tests are a vectorised binary search.
+    """
+
+    def __init__(self, name: str):
+        self.path = data_path(f"{name}.ids")
+        self._lock = threading.Lock()
+        try:
+            hashes = np.fromfile(self.path, dtype=np.uint64)
+        except FileNotFoundError:
+            hashes = np.empty(0, dtype=np.uint64)
+        self._hashes = np.unique(hashes)
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def _contains(self, hashes: np.ndarray) -> np.ndarray:
+        if not len(self._hashes):
+            return np.zeros(len(hashes), dtype=bool)
+        positions = np.searchsorted(self._hashes, hashes)
+        positions[positions == len(self._hashes)] = 0
+        return self._hashes[positions] == hashes
+
+    def filter_new(self, records: List[Dict], key: str = 'id') -> List[Dict]:
+        """Return the records whose ids have not been marked, first occurrence only."""
+        records = [record for record in records if record.get(key)]
+        if not records:
+            return []
+
+        hashes = np.array([id_hash(record[key]) for record in records], dtype=np.uint64)
+        _, first = np.unique(hashes, return_index=True)
+        keep = np.zeros(len(records), dtype=bool)
+        keep[first] = True
+        with self._lock:
+            keep &= ~self._contains(hashes)
+        return [record for record, kept in zip(records, keep) if kept]
+
+    def mark(self, record_ids: Iterable[str]):
+        """Durably mark record ids as processed."""
+        hashes = np.array([id_hash(record_id) for record_id in record_ids], dtype=np.uint64)
+        if not len(hashes):
+            return
+
+        with self._lock:
+            with open(self.path, 'ab') as f:
+                hashes.tofile(f)
+            self._hashes = np.union1d(self._hashes, hashes)
@@ -0,0 +1,145 @@
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+# Pages syncing on every rerun (the dashboard) fetch from the backend at most this often per process
+MIN_SYNC_SECONDS = 30
+
+
+class SyncLog:
+    """Append-only, process-wide log of synced records with a cursor per consumer.
+
+    Records are ingested once per process. Every registered consumer is fed only
+    the records appended since its cursor, so a consumer registered late still
+    catches up on everything synced so far.
+    """
+
+    def __init__(self, key: str = 'id'):
+        self.key = key
+        self.version = 0
+        self._records: List[Dict] = []
+        self._ids = set()
+        self._consumers: Dict[str, Callable[[List[Dict]], None]] = {}
+        self._cursors: Dict[str, int] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._records)
+
+    def register(self, name: str, consumer: Callable[[List[Dict]], None]):
+        """Register a consumer called with each batch of newly synced records.
+
+        A consumer registered after records were synced (for example by a
+        lazily imported module) catches up on them immediately.
+        """
+        with self._lock:
+            if name not in self._consumers:
+                self._consumers[name] = consumer
+                self._cursors[name] = len(self._records)
+                if self._records:
+                    consumer(list(self._records))
+
+    def ingest(self, records: List[Dict]) -> int:
+        """Append records not seen before and return how many were new."""
+        with self._lock:
+            new_records = []
+            for record in records:
+                record_id = record.get(self.key)
+                if record_id and record_id not in self._ids:
+                    self._ids.add(record_id)
+                    new_records.append(record)
+
+            if new_records:
+                self._records.extend(new_records)
+                self.version += 1
+            return len(new_records)
+
+    def pump(self):
+        """Feed every consumer the records appended since its cursor."""
+        with self._lock:
+            end = len(self._records)
+            for name, consumer in self._consumers.items():
+                start = self._cursors[name]
+                if start < end:
+                    consumer(self._records[start:end])
+                    self._cursors[name] = end
+
+    def records(self) -> List[Dict]:
+        """Return a snapshot of every record synced so far."""
+        with self._lock:
+            return list(self._records)
+
+
+posts_log = SyncLog()
+comments_log = SyncLog()
+
+# Monotonic start time of the last fetch of each kind, by any page
+_last_sync: Dict[str, float] = {}
+_sync_flight = threading.Lock()
+
+
+def _as_list(data) -> List[Dict]:
+    """Normalise a backend payload to a list of records."""
+    if isinstance(data, list):
+        return data
+    return [data]
+
+
+def sync_posts(api_client) -> Optional[List[Dict]]:
+    """Fetch posts from the backend and feed the new ones to every registered stage."""
+    _last_sync['posts'] = time.monotonic()
+    posts_data = api_client.get_posts()
+    if not posts_data:
+        return posts_data
+
+    posts_data = _as_list(posts_data)
+    posts_log.ingest(posts_data)
+    posts_log.pump()
+    return posts_data
+
+
+def sync_comments(api_client) -> Optional[List[Dict]]:
+    """Fetch comments from the backend and feed the new ones to every registered stage."""
+    _last_sync['comments'] = time.monotonic()
+    comments_data = api_client.get_comments()
+    if not comments_data:
+        return comments_data
+
+    comments_data = _as_list(comments_data)
+    comments_log.ingest(comments_data)
+    comments_log.pump()
+    return comments_data
+
+
+def _stale(kind: str, min_interval: float) -> bool:
+    last = _last_sync.get(kind)
+    return last is None or time.monotonic() - last >= min_interval
+
+
+def sync_if_stale(api_client, min_interval: float = MIN_SYNC_SECONDS) -> bool:
+    """Sync posts and comments unless they were fetched within `min_interval` seconds.
+
+    Process-wide single flight: while one session syncs, the others return
+    at once and see the new records on their next run. Returns whether this
+    call synced.
+    """
+    if not (_stale('posts', min_interval) or _stale('comments', min_interval)):
+        return False
+    if not _sync_flight.acquire(blocking=False):
+        return False
+    try:
+        synced = False
+        if _stale('posts', min_interval):
+            sync_posts(api_client)
+            synced = True
+        if _stale('comments', min_interval):
+            sync_comments(api_client)
+            synced = True
+        return synced
+    finally:
+        _sync_flight.release()
+
+
+def dataset_version() -> tuple:
+    """Return a token that changes whenever new posts or comments are synced."""
+    return (posts_log.version, len(posts_log), comments_log.version, len(comments_log))
@@ -0,0 +1,192 @@
+import threading
+from array import array
+from datetime import datetime, timedelta
+from itertools import combinations
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from analytics import graph_core, records, sync
+
+EDGE_TYPES = ('author', 'replies', 'interacts', 'contains', 'co-occurs')
+_EDGE_CODES = {edge_type: code for code, edge_type in enumerate(EDGE_TYPES)}
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _seconds(timestamp: datetime) -> float:
+    return (timestamp - _EPOCH).total_seconds()
+
+
+def to_datetime(seconds: float) -> datetime:
+    return _EPOCH + timedelta(seconds=float(seconds))
+
+
+def node_key(node_type: str, label: str) -> str:
+    """Key shared with graph labels: user names, 'Post <id>' and '#tag'."""
+    return f"{node_type}:{label}"
+
+
+class TemporalEdgeStore:
+    """Conversation edges stamped with the time they appeared, kept sorted by time.
+
+    Synced records are appended to pending columns; reading merges them into
+    the time-sorted arrays with one linear merge, so the graph at time T is
+    the prefix found by a binary search and the change between two times is
+    a contiguous slice.
+    """
+
+    def __init__(self):
+        self.nodes = graph_core.Vocabulary()
+        self.node_types: List[str] = []
+        self.post_authors: Dict[str, int] = {}
+        self._pending = (array('d'), array('q'), array('q'), array('b'))
+        self.times = np.zeros(0)
+        self.sources = np.zeros(0, dtype=np.int64)
+        self.targets = np.zeros(0, dtype=np.int64)
+        self.types = np.zeros(0, dtype=np.int8)
+        self.version = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.times) + len(self._pending[0])
+
+    def _node(self, node_type: str, label: str) -> int:
+        node = self.nodes.intern(node_key(node_type, label))
+        if node == len(self.node_types):
+            self.node_types.append(node_type)
+        return node
+
+    def _append(self, seconds: float, source: int, target: int, edge_type: str):
+        times, sources, targets, types = self._pending
+        times.append(seconds)
+        sources.append(source)
+        targets.append(target)
+        types.append(_EDGE_CODES[edge_type])
+
+    def add_posts(self, posts: List[Dict]):
+        with self._lock:
+            for post in posts:
+                timestamp = records.parse_timestamp(post.get('timestamp'))
+                if timestamp is None or not post.get('id'):
+                    continue
+                seconds = _seconds(timestamp)
+                post_node = self._node('post', f"Post {post['id']}")
+                if post.get('author'):
+                    author = self._node('user', post['author'])
+                    self.post_authors[post['id']] = author
+                    self._append(seconds, author, post_node, 'author')
+                tags = [self._node('hashtag', f"#{tag}") for tag in dict.fromkeys(records.post_hashtags(post))]
+                for tag in tags:
+                    self._append(seconds, post_node, tag, 'contains')
+                for a, b in combinations(tags, 2):
+                    self._append(seconds, a, b, 'co-occurs')
+
+    def add_comments(self, comments: List[Dict]):
+        with self._lock:
+            for comment in comments:
+                timestamp = records.parse_timestamp(comment.get('timestamp'))
+                if timestamp is None or not comment.get('postId') or not comment.get('author'):
+                    continue
+                seconds = _seconds(timestamp)
+                commenter = self._node('user', comment['author'])
+                self._append(seconds, commenter, self._node('post', f"Post {comment['postId']}"), 'replies')
+                author = self.post_authors.get(comment['postId'])
+                if author is not None and author != commenter:
+                    self._append(seconds, commenter, author, 'interacts')
+
+    def _merge_pending(self):
+        """Merge pending edges into the sorted arrays (caller holds the lock)."""
+        times, sources, targets, types = (np.frombuffer(column, dtype=dtype) if len(column) else None
+                                          for column, dtype in zip(self._pending, ('f8', 'i8', 'i8', 'i1')))
+        if times is None:
+            return
+        order = np.argsort(times, kind='stable')
+        times, sources, targets, types = times[order], sources[order], targets[order], types[order]
+        # Later arrivals with equal times go after existing edges, keeping the merge stable.
+        positions = np.searchsorted(self.times, times, side='right')
+        self.times = np.insert(self.times, positions, times)
+        self.sources = np.insert(self.sources, positions, sources)
+        self.targets = np.insert(self.targets, positions, targets)
+        self.types = np.insert(self.types, positions, types)
+        self._pending = (array('d'), array('q'), array('q'), array('b'))
+        self.version += 1
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Time-sorted (times, sources, targets, types), merging anything newly synced."""
+        with self._lock:
+            self._merge_pending()
+            return self.times, self.sources, self.targets, self.types
+
+    def time_range(self) -> Optional[Tuple[datetime, datetime]]:
+        times = self.arrays()[0]
+        if not len(times):
+            return None
+        return to_datetime(times[0]), to_datetime(times[-1])
+
+
+temporal_store = TemporalEdgeStore()
+sync.posts_log.register('temporal_posts', temporal_store.add_posts)
+sync.comments_log.register('temporal_comments', temporal_store.add_comments)
+
+
+class Playback:
+    """Frame-by-frame growth of a drawn graph, restricted to its nodes.
+
+    Moving between frames applies (or reverts) only the edges added in
+    between: degree counts and NaN-separated edge coordinates are updated for
+    that slice, so a frame costs time proportional to its delta.
+    """
+
+    def __init__(self, store: TemporalEdgeStore, keys: List[str], positions: np.ndarray):
+        times, sources, targets, types = store.arrays()
+        # Edges only reference nodes interned before them, so this covers every endpoint.
+        with store._lock:
+            view_index = np.full(len(store.nodes), -1, dtype=np.int64)
+            for i, key in enumerate(keys):
+                node = store.nodes.index.get(key)
+                if node is not None:
+                    view_index[node] = i
+        sources = view_index[sources]
+        targets = view_index[targets]
+        inside = (sources >= 0) & (targets >= 0) & (sources != targets)
+
+        self.store_version = store.version
+        self.times = times[inside]
+        self.sources = sources[inside]
+        self.targets = targets[inside]
+        self.types = types[inside]
+        self.positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        self.degree = np.zeros(len(self.positions), dtype=np.int64)
+        self.segments = np.full((len(self.times), 3, 2), np.nan)
+        self.cursor = 0
+
+    def __len__(self):
+        return len(self.times)
+
+    def frame_times(self, n_frames: int) -> List[datetime]:
+        """Evenly spaced frame times over the span of the restricted edges."""
+        if not len(self.times):
+            return []
+        return [to_datetime(seconds) for seconds in np.linspace(self.times[0], self.times[-1], n_frames)]
+
+    def seek(self, timestamp: datetime) -> Dict:
+        """Move to `timestamp`, applying only the edges added or removed since the last frame."""
+        end = int(np.searchsorted(self.times, _seconds(timestamp), side='right'))
+        lo, hi = sorted((self.cursor, end))
+        sign = 1 if end >= self.cursor else -1
+        np.add.at(self.degree, self.sources[lo:hi], sign)
+        np.add.at(self.degree, self.targets[lo:hi], sign)
+        if sign > 0:
+            self.segments[lo:hi, 0] = self.positions[self.sources[lo:hi]]
+            self.segments[lo:hi, 1] = self.positions[self.targets[lo:hi]]
+        previous, self.cursor = self.cursor, end
+        return {'edges': end, 'added': end - previous, 'deltaStart': lo, 'deltaEnd': hi}
+
+    def edge_coordinates(self, start: int = 0, end: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """x and y line coordinates of edges [start, end) of the current frame."""
+        end = self.cursor if end is None else end
+        segments = self.segments[start:end].reshape(-1, 2)
+        return segments[:, 0], segments[:, 1]
+
+    def active_nodes(self) -> np.ndarray:
+        return np.flatnonzero(self.degree > 0)
@@ -0,0 +1,216 @@
+import hashlib
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.feature_extraction.text import HashingVectorizer
+
+from analytics import jobs, records, store, sync
+
+STATE_NAME = "topics/model"
+LABELS_LOG = "topics/labels.tsv"
+DEFAULT_N_TOPICS = 8
+N_FEATURES = 2 ** 16
+BATCH_SIZE = 1024
+TERMS_PER_TOPIC = 200
+
+# Stateless: hashes tokens straight to columns, so no vocabulary is kept in memory.
+_vectorizer = HashingVectorizer(
+    n_features=N_FEATURES,
+    alternate_sign=False,
+    stop_words='english',
+    norm='l2'
+)
+_analyzer = _vectorizer.build_analyzer()
+
+
+class TopicModel:
+    """Streaming topic clusters over post text.
+
+    Centroids are updated with `MiniBatchKMeans.partial_fit` on each batch of
+    newly synced posts; labels are assigned once per post and appended to a log,
+    so a refresh only costs the new posts.
+    """
+
+    def __init__(self, n_topics: int = DEFAULT_N_TOPICS):
+        self.n_topics = n_topics
+        self.kmeans = MiniBatchKMeans(
+            n_clusters=n_topics,
+            batch_size=BATCH_SIZE,
+            n_init=3,
+            random_state=42
+        )
+        self.fitted = False
+        self.pending: List[tuple] = []
+        self.term_counts = [Counter() for _ in range(n_topics)]
+        self.labels: Dict[str, int] = {}
+
+    def __getstate__(self):
+        # Labels live in the append-only log, not in the pickled model.
+        state = self.__dict__.copy()
+        state['labels'] = {}
+        return state
+
+    def fit(self, posts: List[Dict]) -> Dict[str, int]:
+        """Cluster the posts not labelled yet and return their new labels, without persisting anything."""
+        for post in posts:
+            post_id = post.get('id')
+            text = records.post_text(post)
+            if post_id and text and post_id not in self.labels:
+                self.pending.append((post_id, text))
+
+        if not self.pending or (not self.fitted and len(self.pending) < self.n_topics):
+            return {}
+
+        batch, self.pending = self.pending, []
+        new_labels = {}
+        for start in range(0, len(batch), BATCH_SIZE):
+            chunk = batch[start:start + BATCH_SIZE]
+            X = _vectorizer.transform([text for _, text in chunk])
+            if X.shape[0] >= self.n_topics or self.fitted:
+                self.kmeans.partial_fit(X)
+                self.fitted = True
+            for (post_id, text), label in zip(chunk, self.kmeans.predict(X)):
+                label = int(label)
+                self.labels[post_id] = label
+                self.term_counts[label].update(_analyzer(text))
+                new_labels[post_id] = label
+
+        for counts in self.term_counts:
+            if len(counts) > 2 * TERMS_PER_TOPIC:
+                kept = counts.most_common(TERMS_PER_TOPIC)
+                counts.clear()
+                counts.update(dict(kept))
+
+        return new_labels
+
+    def save(self, new_labels: Dict[str, int]):
+        """Append new labels to the log and persist the model."""
+        store.append_lines(LABELS_LOG, [f"{post_id}\t{label}" for post_id, label in new_labels.items()])
+        store.save_state(STATE_NAME, self)
+
+    def update(self, posts: List[Dict]) -> int:
+        """Cluster the posts not labelled yet, persist the result and return how many were labelled."""
+        new_labels = self.fit(posts)
+        if new_labels:
+            self.save(new_labels)
+        return len(new_labels)
+
+    def topic_name(self, topic: int, n_terms: int = 3) -> str:
+        """Return a short human-readable name built from a topic's top terms."""
+        terms = [term for term, _ in self.term_counts[topic].most_common(n_terms)]
+        return ", ".join(terms) if terms else f"Topic {topic + 1}"
+
+    def topic_of(self, post_id: str) -> Optional[int]:
+        """Return the topic label of a post, if it has been clustered."""
+        return self.labels.get(post_id)
+
+    def summary(self) -> List[Dict]:
+        """Return per-topic post counts and names, largest topic first."""
+        sizes = Counter(self.labels.values())
+        return [
+            {'topic': topic, 'name': self.topic_name(topic), 'count': count}
+            for topic, count in sizes.most_common()
+        ]
+
+
+def cluster_batch(model: TopicModel, posts: List[Dict]) -> Tuple[TopicModel, Dict[str, int]]:
+    """Job body: cluster a batch of posts in a worker and return the model with the new labels.
+
+    Labels are not pickled with the model, so the new ones travel separately.
+    Nothing is written here; the page process persists what it adopts.
+    """
+    return model, model.fit(posts)
+
+
+class _TopicStage:
+    """Sync stage running topic batches on the job queue, one at a time, so syncs never wait on clustering.
+
+    Posts synced while a batch runs wait for the next one. A finished batch
+    is adopted the next time the model is read or posts are synced; a failed
+    or lost one is clustered inline instead.
+    """
+
+    def __init__(self, model: TopicModel):
+        self.model = model
+        self.waiting: List[Dict] = []
+        self.running: List[Dict] = []
+        self.job_id: Optional[str] = None
+        self.lock = threading.Lock()
+
+    def add(self, posts: List[Dict]):
+        with self.lock:
+            self.waiting.extend(post for post in posts if post.get('id') and post['id'] not in self.model.labels)
+            self._advance()
+
+    def _advance(self):
+        """Adopt a finished batch and start the next one (caller holds the lock)."""
+        queue = jobs.get_job_queue()
+        if self.job_id is not None:
+            status = queue.status(self.job_id)
+            if status is not None and status['status'] in jobs.ACTIVE_STATES:
+                return
+            result = queue.result(self.job_id) if status is not None else None
+            if result is not None:
+                model, labels = result
+                model.labels = self.model.labels
+                model.labels.update(labels)
+                if labels:
+                    model.save(labels)
+                self.model = model
+            else:
+                self.model.update(self.running)
+            self.job_id, self.running = None, []
+
+        if self.waiting:
+            self.running, self.waiting = self.waiting, []
+            digest = hashlib.blake2b('\n'.join(post['id'] for post in self.running).encode('utf-8'), digest_size=8)
+            self.job_id = queue.submit(
+                cluster_batch, (self.model, self.running), key=('topics', digest.hexdigest()),
+                group='topics', label=f"Topic clustering ({len(self.running)} posts)"
+            )
+
+    def current(self) -> TopicModel:
+        with self.lock:
+            self._advance()
+            return self.model
+
+    def backlog(self) -> int:
+        """Posts synced but not clustered yet."""
+        with self.lock:
+            return len(self.waiting) + len(self.running)
+
+
+_stage: Optional[_TopicStage] = None
+_stage_lock = threading.Lock()
+
+
+def _get_stage() -> _TopicStage:
+    global _stage
+    with _stage_lock:
+        if _stage is None:
+            model = store.load_state(STATE_NAME)
+            if not isinstance(model, TopicModel):
+                model = TopicModel()
+            for line in store.read_lines(LABELS_LOG):
+                post_id, _, label = line.rpartition('\t')
+                model.labels[post_id] = int(label)
+            _stage = _TopicStage(model)
+        return _stage
+
+
+def get_topic_model() -> TopicModel:
+    """Return the process-wide topic model, restoring it from disk on first use.
+
+    Adopts the result of a finished clustering job first.
+    """
+    return _get_stage().current()
+
+
+def clustering_backlog() -> int:
+    """How many synced posts are still waiting to be clustered."""
+    return _get_stage().backlog()
+
+
+sync.posts_log.register('topics', lambda posts: _get_stage().add(posts))
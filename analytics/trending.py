@@ -0,0 +1,252 @@
+import hashlib
+import heapq
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from analytics import records, store, sync
+
+STATE_NAME = "trending/detector"
+BUCKET_SECONDS = 3600
+WINDOW_BUCKETS = 168
+MAX_EXACT_TAGS = 5000
+SKETCH_DEPTH = 4
+SKETCH_WIDTH = 4096
+MAX_SKETCH_CANDIDATES = 10000
+TOP_N = 100
+MIN_CURRENT_COUNT = 2
+MIN_BASELINE_STD = 1.0
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _bucket_of(timestamp: datetime) -> int:
+    return int((timestamp - _EPOCH).total_seconds() // BUCKET_SECONDS)
+
+
+def _bucket_start(bucket: int) -> datetime:
+    return _EPOCH + timedelta(seconds=bucket * BUCKET_SECONDS)
+
+
+class CountMinSketchRing:
+    """Ring of count-min sketches, one per time bucket, for long-tail hashtags."""
+
+    def __init__(self, n_slots: int, depth: int = SKETCH_DEPTH, width: int = SKETCH_WIDTH):
+        self.depth = depth
+        self.width = width
+        self.table = np.zeros((n_slots, depth, width), dtype=np.int32)
+        self._rows = np.arange(depth)
+
+    def _columns(self, key: str) -> np.ndarray:
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=8 * self.depth).digest()
+        return np.frombuffer(digest, dtype=np.uint64) % np.uint64(self.width)
+
+    def add(self, key: str, slot: int, count: int = 1):
+        self.table[slot, self._rows, self._columns(key)] += count
+
+    def estimate(self, key: str) -> np.ndarray:
+        """Return the estimated count of `key` in every slot."""
+        return self.table[:, self._rows, self._columns(key)].min(axis=1)
+
+    def clear(self, slots: np.ndarray):
+        self.table[slots] = 0
+
+
+class BurstDetector:
+    """Streaming hashtag burst detection over a sliding window of hourly buckets.
+
+    Each hashtag has a ring buffer of per-bucket counts. The first
+    `MAX_EXACT_TAGS` hashtags get exact rows; beyond that, new hashtags are
+    counted in a count-min sketch ring. A hashtag's score is the z-score of its
+    latest bucket against the mean and spread of its own earlier buckets.
+    Scores are refreshed as posts sync, so `top_rising` is a slice of a
+    precomputed list.
+    """
+
+    def __init__(self, n_slots: int = WINDOW_BUCKETS):
+        self.n_slots = n_slots
+        self.head: Optional[int] = None
+        self.tag_ids: Dict[str, int] = {}
+        self.counts = np.zeros((64, n_slots), dtype=np.int32)
+        self.sketch: Optional[CountMinSketchRing] = None
+        self.sketch_candidates: OrderedDict = OrderedDict()
+        self.scores: Dict[str, Tuple[float, int, float]] = {}
+        self.top: List[Dict] = []
+
+    def _chronological_slots(self) -> np.ndarray:
+        """Return ring slots ordered oldest to newest, ending at the head bucket."""
+        return (self.head - self.n_slots + 1 + np.arange(self.n_slots)) % self.n_slots
+
+    def _advance(self, bucket: int):
+        """Move the window head forward, clearing the slots it rolls over."""
+        if self.head is None:
+            self.head = bucket
+            return
+        if bucket <= self.head:
+            return
+
+        if bucket - self.head >= self.n_slots:
+            slots = np.arange(self.n_slots)
+        else:
+            slots = np.arange(self.head + 1, bucket + 1) % self.n_slots
+        self.counts[:, slots] = 0
+        if self.sketch is not None:
+            self.sketch.clear(slots)
+        self.head = bucket
+
+    def _add(self, tag: str, bucket: int):
+        slot = bucket % self.n_slots
+        tag_id = self.tag_ids.get(tag)
+        if tag_id is None and len(self.tag_ids) < MAX_EXACT_TAGS:
+            tag_id = len(self.tag_ids)
+            self.tag_ids[tag] = tag_id
+            if tag_id >= len(self.counts):
+                grown = np.zeros((len(self.counts) * 2, self.n_slots), dtype=np.int32)
+                grown[:len(self.counts)] = self.counts
+                self.counts = grown
+
+        if tag_id is not None:
+            self.counts[tag_id, slot] += 1
+            return
+
+        if self.sketch is None:
+            self.sketch = CountMinSketchRing(self.n_slots)
+        self.sketch.add(tag, slot)
+        self.sketch_candidates[tag] = bucket
+        self.sketch_candidates.move_to_end(tag)
+        while len(self.sketch_candidates) > MAX_SKETCH_CANDIDATES:
+            self.sketch_candidates.popitem(last=False)
+
+    def series(self, tag: str) -> np.ndarray:
+        """Return a hashtag's counts per bucket, oldest first."""
+        if self.head is None:
+            return np.zeros(self.n_slots, dtype=np.int32)
+        tag_id = self.tag_ids.get(tag)
+        if tag_id is not None:
+            row = self.counts[tag_id]
+        elif self.sketch is not None:
+            row = self.sketch.estimate(tag)
+        else:
+            row = np.zeros(self.n_slots, dtype=np.int32)
+        return row[self._chronological_slots()]
+
+    @staticmethod
+    def _z_scores(series: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Score the last column of a (tags x buckets) matrix against the earlier ones."""
+        current = series[:, -1].astype(np.float64)
+        baseline = series[:, :-1].astype(np.float64)
+        mean = baseline.mean(axis=1)
+        std = np.maximum(baseline.std(axis=1), MIN_BASELINE_STD)
+        return (current - mean) / std, current, mean
+
+    def _rescore(self, tags: Optional[List[str]] = None):
+        """Recompute scores for `tags`, or for every tracked hashtag when None."""
+        if self.head is None:
+            return
+
+        if tags is None:
+            self.scores = {}
+            exact_tags = list(self.tag_ids)
+            sketch_tags = list(self.sketch_candidates)
+        else:
+            exact_tags = [tag for tag in tags if tag in self.tag_ids]
+            sketch_tags = [tag for tag in tags if tag not in self.tag_ids]
+
+        batches = []
+        if exact_tags:
+            rows = np.array([self.tag_ids[tag] for tag in exact_tags])
+            batches.append((exact_tags, self.counts[rows][:, self._chronological_slots()]))
+        if sketch_tags:
+            batches.append((sketch_tags, np.vstack([self.series(tag) for tag in sketch_tags])))
+
+        for batch_tags, series in batches:
+            z, current, mean = self._z_scores(series)
+            for tag, tag_z, tag_current, tag_mean in zip(batch_tags, z, current, mean):
+                if tag_current >= MIN_CURRENT_COUNT and tag_z > 0:
+                    self.scores[tag] = (float(tag_z), int(tag_current), float(tag_mean))
+                else:
+                    self.scores.pop(tag, None)
+
+        best = heapq.nlargest(TOP_N, self.scores.items(), key=lambda item: item[1][0])
+        self.top = [
+            {'hashtag': f"#{tag}", 'zScore': z, 'count': current, 'baseline': mean}
+            for tag, (z, current, mean) in best
+        ]
+
+    def update(self, posts: List[Dict]) -> int:
+        """Count the hashtags of newly synced posts and refresh affected scores."""
+        events = []
+        for post in posts:
+            timestamp = records.parse_timestamp(post.get('timestamp'))
+            hashtags = records.post_hashtags(post)
+            if timestamp is not None and hashtags:
+                events.append((_bucket_of(timestamp), set(hashtags)))
+        if not events:
+            return 0
+
+        previous_head = self.head
+        self._advance(max(bucket for bucket, _ in events))
+
+        touched = set()
+        for bucket, hashtags in events:
+            if bucket <= self.head - self.n_slots:
+                continue
+            for tag in hashtags:
+                self._add(tag, bucket)
+                touched.add(tag)
+
+        if previous_head != self.head:
+            self._rescore()
+        else:
+            self._rescore(list(touched))
+        return len(touched)
+
+    def top_rising(self, k: int = 10) -> List[Dict]:
+        """Return the k hashtags rising fastest in the latest bucket."""
+        return self.top[:k]
+
+    def current_bucket_start(self) -> Optional[datetime]:
+        """Return the start time of the latest bucket in the window."""
+        return None if self.head is None else _bucket_start(self.head)
+
+
+class _TrendingStage:
+    """Sync stage wrapping the process-wide detector with durable de-duplication."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.seen = store.SeenIds("trending/posts")
+        detector = store.load_state(STATE_NAME)
+        self.detector = detector if isinstance(detector, BurstDetector) else BurstDetector()
+
+    def update(self, posts: List[Dict]):
+        with self.lock:
+            posts = self.seen.filter_new(posts)
+            if not posts:
+                return
+            if self.detector.update(posts):
+                store.save_state(STATE_NAME, self.detector)
+            self.seen.mark(post['id'] for post in posts)
+
+
+_stage: Optional[_TrendingStage] = None
+_stage_lock = threading.Lock()
+
+
+def _get_stage() -> _TrendingStage:
+    global _stage
+    with _stage_lock:
+        if _stage is None:
+            _stage = _TrendingStage()
+        return _stage
+
+
+def get_burst_detector() -> BurstDetector:
+    """Return the process-wide hashtag burst detector."""
+    return _get_stage().detector
+
+
+sync.posts_log.register('trending', lambda posts: _get_stage().update(posts))
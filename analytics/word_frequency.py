@@ -0,0 +1,222 @@
+import hashlib
+import io
+import os
+import re
+import threading
+from collections import Counter
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+
+from analytics import records, store, sync
+from analytics.cache import LRUCache
+
+STATE_DIR = "word_frequency"
+ALL_KEYWORDS = "*"
+CLOUD_MAX_WORDS = 200
+MERGE_CACHE_SIZE = 64
+IMAGE_CACHE_SIZE = 32
+
+_token_pattern = re.compile(r"[a-z][a-z0-9']{2,}")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase tokens, dropping stop words."""
+    return [token for token in _token_pattern.findall(text.lower()) if token not in ENGLISH_STOP_WORDS]
+
+
+def matches_keyword(post: Dict, keyword: str) -> bool:
+    """Whether a post belongs to a scrape keyword.
+
+    Posts carry no keyword field, so this mirrors the backend's keyword
+    search: the content contains the keyword, ignoring case.
+    """
+    return keyword.lower() in (post.get('content') or '').lower()
+
+
+def _slug(keyword: str) -> str:
+    """Return a filesystem-safe directory name for a keyword."""
+    if keyword == ALL_KEYWORDS:
+        return "_all"
+    return hashlib.sha1(keyword.encode('utf-8')).hexdigest()[:16]
+
+
+class WordFrequencyTables:
+    """Token frequency tables per (keyword, day) bucket.
+
+    Keywords are the ones scrapes were started for (see `track_keyword`); a
+    post counts towards every keyword its content contains. New posts only
+    touch the buckets of their own day, and only touched buckets are written
+    back. A date range is answered by merging its day buckets.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self._buckets: Dict[Tuple[str, date], Counter] = {}
+        self._keywords = store.load_state(f"{STATE_DIR}/keywords", set())
+        # Keywords tracked before their already-processed posts were seen again this process
+        self._pending = store.load_state(f"{STATE_DIR}/pending_keywords", set())
+        self._seen = store.SeenIds(f"{STATE_DIR}/posts")
+        self._merged = LRUCache(MERGE_CACHE_SIZE)
+        self._lock = threading.RLock()
+
+    def keywords(self) -> List[str]:
+        """Return the scrape keywords that have frequency tables."""
+        return sorted(self._keywords)
+
+    def _bucket_name(self, keyword: str, day: date) -> str:
+        return f"{STATE_DIR}/{_slug(keyword)}/{day.isoformat()}"
+
+    def _bucket(self, keyword: str, day: date) -> Counter:
+        """Return a bucket, loading it from disk on first access."""
+        key = (keyword, day)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = store.load_state(self._bucket_name(keyword, day), Counter())
+            self._buckets[key] = bucket
+        return bucket
+
+    def _count(self, posts: List[Dict], keywords, dirty: set):
+        """Add the tokens of posts to the day buckets of every matching keyword (caller holds the lock)."""
+        for post in posts:
+            timestamp = records.parse_timestamp(post.get('timestamp'))
+            tokens = tokenize(records.post_text(post))
+            if timestamp is None or not tokens:
+                continue
+
+            counts = Counter(tokens)
+            for keyword in keywords:
+                if keyword == ALL_KEYWORDS or matches_keyword(post, keyword):
+                    self._bucket(keyword, timestamp.date()).update(counts)
+                    dirty.add((keyword, timestamp.date()))
+
+    def _save(self, dirty: set):
+        for keyword, day in dirty:
+            store.save_state(self._bucket_name(keyword, day), self._buckets[(keyword, day)])
+        if dirty:
+            self.version += 1
+
+    def _backfill(self, posts: List[Dict], keywords, dirty: set):
+        """Count already-processed posts for newly tracked keywords (caller holds the lock)."""
+        ids = [post['id'] for post in posts if post.get('id')]
+        seen_ids = set(ids) - set(post['id'] for post in self._seen.filter_new(posts))
+        self._count([post for post in posts if post.get('id') in seen_ids], keywords, dirty)
+
+    def track_keyword(self, keyword: str):
+        """Start a word cloud for a scrape keyword, counting the posts synced so far."""
+        keyword = keyword.strip()
+        with self._lock:
+            if not keyword or keyword in self._keywords:
+                return
+            self._keywords.add(keyword)
+            store.save_state(f"{STATE_DIR}/keywords", self._keywords)
+
+            synced = sync.posts_log.records()
+            if synced:
+                dirty = set()
+                self._backfill(synced, [keyword], dirty)
+                self._save(dirty)
+            else:
+                # Nothing synced yet this process; the first sync brings every post back.
+                self._pending.add(keyword)
+                store.save_state(f"{STATE_DIR}/pending_keywords", self._pending)
+
+    def update(self, posts: List[Dict]) -> int:
+        """Add the tokens of newly synced posts to their day buckets."""
+        dirty = set()
+        with self._lock:
+            if self._pending:
+                self._backfill(posts, sorted(self._pending), dirty)
+                self._pending = set()
+                store.save_state(f"{STATE_DIR}/pending_keywords", self._pending)
+
+            posts = self._seen.filter_new(posts)
+            self._count(posts, [ALL_KEYWORDS] + sorted(self._keywords), dirty)
+            self._save(dirty)
+            self._seen.mark(post['id'] for post in posts)
+            return len(dirty)
+
+    def _days_on_disk(self, keyword: str, start: date, end: date) -> List[date]:
+        """List the days in range that have a bucket for `keyword`."""
+        directory = os.path.join(store.get_data_dir(), STATE_DIR, _slug(keyword))
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:
+            names = []
+
+        days = set(day for kw, day in self._buckets if kw == keyword and start <= day <= end)
+        for name in names:
+            if name.endswith('.pkl'):
+                day = date.fromisoformat(name[:-4])
+                if start <= day <= end:
+                    days.add(day)
+        return sorted(days)
+
+    def merged(self, keyword: str, start: date, end: date) -> Counter:
+        """Return token frequencies for `keyword` over the inclusive date range."""
+        keyword = keyword or ALL_KEYWORDS
+
+        def merge():
+            with self._lock:
+                total = Counter()
+                for day in self._days_on_disk(keyword, start, end):
+                    total.update(self._bucket(keyword, day))
+                return total
+
+        return self._merged.get_or_compute((keyword, start, end, self.version), merge)
+
+
+def frequency_digest(frequencies: Counter, max_words: int = CLOUD_MAX_WORDS) -> str:
+    """Return a digest of the words a cloud would actually draw."""
+    top = sorted(frequencies.most_common(max_words))
+    return hashlib.sha1(repr(top).encode('utf-8')).hexdigest()
+
+
+_image_cache = LRUCache(IMAGE_CACHE_SIZE)
+
+
+def render_word_cloud(frequencies: Counter, width: int = 800, height: int = 400) -> Optional[bytes]:
+    """Render a word cloud PNG, reusing the cached image for identical frequencies."""
+    if not frequencies:
+        return None
+
+    def render():
+        from wordcloud import WordCloud
+
+        cloud = WordCloud(
+            width=width,
+            height=height,
+            background_color='white',
+            colormap='viridis',
+            max_words=CLOUD_MAX_WORDS
+        ).generate_from_frequencies(dict(frequencies.most_common(CLOUD_MAX_WORDS)))
+
+        buffer = io.BytesIO()
+        cloud.to_image().save(buffer, format='PNG')
+        return buffer.getvalue()
+
+    key = (frequency_digest(frequencies), width, height)
+    return _image_cache.get_or_compute(key, render)
+
+
+def default_range(days: int = 30) -> Tuple[date, date]:
+    """Return the inclusive date range ending today used by the Dashboard."""
+    end = date.today()
+    return end - timedelta(days=days - 1), end
+
+
+_tables: Optional[WordFrequencyTables] = None
+_tables_lock = threading.Lock()
+
+
+def get_word_frequency_tables() -> WordFrequencyTables:
+    """Return the process-wide word frequency tables."""
+    global _tables
+    with _tables_lock:
+        if _tables is None:
+            _tables = WordFrequencyTables()
+        return _tables
+
+
+sync.posts_log.register('word_frequency', lambda posts: get_word_frequency_tables().update(posts))
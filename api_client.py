@@ -7,8 +7,11 @@ import streamlit as st
 class APIClient:
     """Client for communicating with the Java Spring Boot backend API."""
     
-    def __init__(self, base_url: str = "http://localhost:8080"):
+    def __init__(self, base_url: str = "http://localhost:8080", report_errors: bool = True):
         self.base_url = base_url.rstrip('/')
+        # Background callers have no page to show errors on; they read last_error instead
+        self.report_errors = report_errors
+        self.last_error: Optional[str] = None
         self.session = requests.Session()
         self.session.headers.update({
             'Content-Type': 'application/json',
@@ -19,6 +22,7 @@ class APIClient:
                      params: Optional[Dict] = None) -> Optional[Dict]:
         """Make HTTP request with error handling."""
         url = f"{self.base_url}{endpoint}"
+        self.last_error = None
         
         try:
             if method.upper() == 'GET':
@@ -39,21 +43,27 @@ class APIClient:
             return None
             
         except requests.exceptions.ConnectionError:
-            st.error(f"❌ Cannot connect to backend at {self.base_url}. Please ensure the Java Spring Boot server is running.")
+            self._report_error(f"❌ Cannot connect to backend at {self.base_url}. Please ensure the Java Spring Boot server is running.")
             return None
         except requests.exceptions.Timeout:
-            st.error("⏰ Request timed out. Please try again.")
+            self._report_error("⏰ Request timed out. Please try again.")
             return None
         except requests.exceptions.HTTPError as e:
-            st.error(f"❌ HTTP Error {e.response.status_code}: {e.response.text}")
+            self._report_error(f"❌ HTTP Error {e.response.status_code}: {e.response.text}")
             return None
         except json.JSONDecodeError:
-            st.error("❌ Invalid JSON response from server.")
+            self._report_error("❌ Invalid JSON response from server.")
             return None
         except Exception as e:
-            st.error(f"❌ Unexpected error: {str(e)}")
+            self._report_error(f"❌ Unexpected error: {str(e)}")
             return None
     
+    def _report_error(self, message: str):
+        """Remember a request error and show it on the page unless reporting is off."""
+        self.last_error = message
+        if self.report_errors:
+            st.error(message)
+    
     def start_scraper(self, keyword: str) -> Optional[Dict]:
         """Start the scraper with a keyword."""
         data = {"keyword": keyword}
@@ -73,6 +83,10 @@ class APIClient:
         # Note: Backend doesn't have direct post->comments endpoint, we'll get all comments and filter
         return self._make_request('GET', '/api/data/comments')
     
+    def get_comments(self) -> Optional[Dict]:
+        """Get all comments."""
+        return self._make_request('GET', '/api/data/comments')
+    
     def get_network_graph(self) -> Optional[Dict]:
         """Get network graph data."""
         # Note: Backend doesn't have network graph endpoint, we'll use link analysis
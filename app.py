@@ -1,11 +1,19 @@
 import streamlit as st
 from streamlit_option_menu import option_menu
-import time
 from api_client import APIClient
-from pages import dashboard, scraper_control, post_search, network_graph
+import lazy_loader
+import refresh
 import json
 from datetime import datetime
 
+# Page modules and their render functions, imported only when first opened
+PAGE_RENDERERS = {
+    "Dashboard": ("pages.dashboard", "render_dashboard"),
+    "Scraper Control": ("pages.scraper_control", "render_scraper_control"),
+    "Post Search": ("pages.post_search", "render_post_search"),
+    "Network Graph": ("pages.network_graph", "render_network_graph"),
+}
+
 # Page configuration
 st.set_page_config(
     page_title="FBReaperV1 - Social Media Analytics Dashboard",
@@ -140,34 +148,23 @@ def initialize_session_state():
         st.session_state.last_refresh = datetime.now()
 
 def get_system_status(api_client):
-    """Get comprehensive system status."""
+    """Get comprehensive system status from the shared backend snapshot."""
+    snapshot = refresh.snapshot(api_client)
     status = {
         'backend': False,
         'database': False,
         'scraper': False,
         'kafka': False,
-        'last_check': datetime.now()
+        'last_check': datetime.now(),
+        'snapshot': snapshot
     }
     
-    # Check backend connection
-    try:
-        status['backend'] = api_client.test_connection()
-    except:
-        status['backend'] = False
-    
-    # Check database (via stats endpoint)
-    try:
-        stats = api_client.get_statistics()
-        status['database'] = stats is not None
-    except:
-        status['database'] = False
-    
-    # Check scraper status
-    try:
-        scraper_status = api_client.get_scraper_status()
-        status['scraper'] = scraper_status is not None
-    except:
-        status['scraper'] = False
+    if snapshot is not None:
+        status['backend'] = snapshot.online
+        # Database health is inferred from the stats endpoint
+        status['database'] = snapshot.statistics is not None
+        status['scraper'] = snapshot.scraper_status is not None
+        status['last_check'] = snapshot.polled_at
     
     # Note: Kafka status would require additional endpoints
     status['kafka'] = status['backend']  # Assume Kafka is working if backend is up
@@ -204,7 +201,7 @@ def render_system_status(status):
         else:
             st.markdown('<div class="status-disconnected">🔴 Kafka</div>', unsafe_allow_html=True)
     
-    st.caption(f"Last checked: {status['last_check'].strftime('%H:%M:%S')}")
+    st.caption(f"Last checked: {refresh.format_age(status['snapshot'])}")
 
 def main():
     """Main application function."""
@@ -241,6 +238,7 @@ def main():
         
         if st.button("🔄 Refresh All Data"):
             st.session_state.last_refresh = datetime.now()
+            refresh.invalidate(st.session_state.api_client)
             st.rerun()
         
         if st.button("📊 View Statistics"):
@@ -268,9 +266,8 @@ def main():
             st.rerun()
         
         if st.session_state.auto_refresh:
-            st.info("Auto-refresh enabled (every 30 seconds)")
-            time.sleep(30)
-            st.rerun()
+            st.info(f"Auto-refresh enabled (every {refresh.AUTO_REFRESH_SECONDS} seconds)")
+            refresh.schedule_rerun("sidebar_auto_refresh")
         
         # Dark mode toggle
         dark_mode = st.checkbox("🌙 Dark Mode", value=st.session_state.dark_mode)
@@ -301,17 +298,10 @@ def main():
     
     # Main content area with enhanced error handling
     try:
-        if selected == "Dashboard":
-            dashboard.render_dashboard(st.session_state.api_client)
-        
-        elif selected == "Scraper Control":
-            scraper_control.render_scraper_control(st.session_state.api_client)
-        
-        elif selected == "Post Search":
-            post_search.render_post_search(st.session_state.api_client)
-        
-        elif selected == "Network Graph":
-            network_graph.render_network_graph(st.session_state.api_client)
+        if selected in PAGE_RENDERERS:
+            module_name, render_name = PAGE_RENDERERS[selected]
+            page = lazy_loader.load_module(module_name)
+            getattr(page, render_name)(st.session_state.api_client)
         
         elif selected == "Settings":
             render_settings_page(st.session_state.api_client)
@@ -382,17 +372,31 @@ def render_settings_page(api_client):
     
     with col1:
         st.markdown("### Backend Information")
-        if api_client.test_connection():
+        snapshot = refresh.snapshot(api_client)
+        if snapshot is not None and snapshot.online:
             st.success("🟢 Backend is running")
-            try:
-                stats = api_client.get_statistics()
-                if stats:
-                    st.write(f"**Total Posts:** {stats.get('totalPosts', 'N/A')}")
-                    st.write(f"**Total Comments:** {stats.get('totalComments', 'N/A')}")
-            except:
+            stats = snapshot.statistics
+            if stats:
+                st.write(f"**Total Posts:** {stats.get('totalPosts', 'N/A')}")
+                st.write(f"**Total Comments:** {stats.get('totalComments', 'N/A')}")
+            else:
                 st.warning("⚠️ Could not retrieve statistics")
         else:
             st.error("🔴 Backend is not accessible")
+            if snapshot is not None and snapshot.error:
+                st.caption(snapshot.error)
+        st.write(f"**Snapshot:** {refresh.format_age(snapshot)}")
+        
+        poller = refresh.get_poller(api_client)
+        poll_seconds = st.number_input(
+            "Backend Poll Interval (seconds)",
+            min_value=refresh.MIN_POLL_SECONDS,
+            max_value=600,
+            value=int(poller.interval),
+            help="How often one background thread refreshes stats, scraper status and health for every session"
+        )
+        if poll_seconds != int(poller.interval):
+            poller.set_interval(poll_seconds)
     
     with col2:
         st.markdown("### Application Information")
@@ -401,6 +405,32 @@ def render_settings_page(api_client):
         st.write(f"**Streamlit:** 1.28.1")
         st.write(f"**Last Updated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     
+    # Import-time report
+    st.markdown("---")
+    st.subheader("📦 Module Load Report")
+    
+    import_report = lazy_loader.import_report()
+    if import_report:
+        st.caption("Modules imported on demand in this process. Times are cumulative and include dependencies pulled in by the import.")
+        st.dataframe(
+            [
+                {
+                    'Module': entry['module'],
+                    'Import Time (ms)': round(entry['seconds'] * 1000, 1),
+                    'Modules Loaded': entry['modulesLoaded'],
+                    'Loaded At': entry['loadedAt'].strftime('%H:%M:%S')
+                }
+                for entry in import_report
+            ],
+            use_container_width=True,
+            hide_index=True
+        )
+        # Nested loads are already inside their parent's time
+        total_seconds = sum(entry['seconds'] for entry in import_report if not entry['nested'])
+        st.write(f"**Total lazy import time:** {total_seconds * 1000:.0f} ms")
+    else:
+        st.info("No modules have been loaded on demand yet.")
+    
     # Maintenance actions
     st.markdown("---")
     st.subheader("🔧 Maintenance Actions")
@@ -0,0 +1,84 @@
+import importlib
+import sys
+import threading
+import time
+import types
+from datetime import datetime
+from typing import Dict, List
+
+_load_times: Dict[str, Dict] = {}
+_lock = threading.RLock()
+# How many lazy loads are in progress on this thread; loads started inside another are nested
+_active = threading.local()
+
+
+def load_module(name: str) -> types.ModuleType:
+    """Import a module on first use, recording how long the import took."""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+
+    with _lock:
+        module = sys.modules.get(name)
+        if module is not None:
+            return module
+
+        depth = getattr(_active, 'depth', 0)
+        modules_before = len(sys.modules)
+        start = time.perf_counter()
+        _active.depth = depth + 1
+        try:
+            module = importlib.import_module(name)
+        finally:
+            _active.depth = depth
+        _load_times[name] = {
+            'module': name,
+            'seconds': time.perf_counter() - start,
+            'modulesLoaded': len(sys.modules) - modules_before,
+            'nested': depth > 0,
+            'loadedAt': datetime.now()
+        }
+        return module
+
+
+class LazyModule(types.ModuleType):
+    """Module placeholder that imports the real module on first attribute access."""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__['_module'] = None
+
+    def _load(self) -> types.ModuleType:
+        module = self.__dict__['_module']
+        if module is None:
+            module = load_module(self.__name__)
+            self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+
+def lazy_module(name: str) -> LazyModule:
+    """Return a placeholder for `name` that is imported only when first used."""
+    return LazyModule(name)
+
+
+def is_loaded(name: str) -> bool:
+    """Return whether a module has been imported in this process."""
+    return name in sys.modules
+
+
+def import_report() -> List[Dict]:
+    """Return lazily loaded modules with their cumulative import time, slowest first.
+
+    Times are cumulative: a module's entry includes every dependency it pulled in
+    that was not already imported, including nested lazy loads, which are
+    flagged 'nested' so totals can count only the top-level ones.
+    """
+    with _lock:
+        report = [dict(entry) for entry in _load_times.values()]
+    return sorted(report, key=lambda entry: entry['seconds'], reverse=True)
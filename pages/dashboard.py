@@ -2,9 +2,32 @@ import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
-from datetime import datetime, timedelta
-import time
-import numpy as np
+from datetime import timedelta
+from lazy_loader import lazy_module
+import refresh
+from analytics import downsample, rollups, sync, trending
+
+# scipy and sklearn load when their sections are first drawn, not before the page paints
+communities = lazy_module("analytics.communities")
+cooccurrence = lazy_module("analytics.cooccurrence")
+graph_core = lazy_module("analytics.graph_core")
+topics = lazy_module("analytics.topics")
+word_frequency = lazy_module("analytics.word_frequency")
+
+TIME_RANGES = {
+    "Last 24 hours": timedelta(days=1),
+    "Last 7 days": timedelta(days=7),
+    "Last 30 days": timedelta(days=30),
+    "Last 90 days": timedelta(days=90),
+    "All time": None
+}
+CHART_RESOLUTIONS = {"Auto": None, "Hourly": 'hour', "Daily": 'day'}
+# Charts sit in half-width columns; each trace is capped to what that width can show
+CHART_WIDTH_PX = 600
+CHART_POINTS = downsample.points_for_width(CHART_WIDTH_PX)
+POPULAR_PAIRS = 10
+# Hashtags offered in the related-hashtags picker
+RELATED_CHOICES = 50
 
 def render_dashboard(api_client):
     """Render the dashboard page with statistics and charts."""
@@ -16,19 +39,20 @@ def render_dashboard(api_client):
     col1, col2, col3 = st.columns([1, 2, 1])
     with col1:
         if st.button("🔄 Refresh Data"):
+            refresh.invalidate(api_client)
             st.rerun()
     
     with col2:
-        st.caption(f"Last updated: {datetime.now().strftime('%H:%M:%S')}")
+        # Every session reads the same snapshot, polled by one background thread
+        with st.spinner("Loading dashboard statistics..."):
+            snapshot = refresh.snapshot(api_client)
+        st.caption(f"Last updated: {refresh.format_age(snapshot)}")
     
     with col3:
-        if st.checkbox("🔄 Auto-refresh (30s)"):
-            time.sleep(30)
-            st.rerun()
+        if st.checkbox(f"🔄 Auto-refresh ({refresh.AUTO_REFRESH_SECONDS}s)"):
+            refresh.schedule_rerun("dashboard_auto_refresh")
     
-    # Get statistics with loading spinner
-    with st.spinner("Loading dashboard statistics..."):
-        stats_data = api_client.get_statistics()
+    stats_data = snapshot.statistics if snapshot is not None else None
     
     if not stats_data:
         st.warning("⚠️ Unable to load statistics. Please check your backend connection.")
@@ -93,73 +117,81 @@ def render_dashboard(api_client):
     # Advanced analytics section
     st.subheader("📈 Advanced Analytics")
     
+    # New records feed the local rollups (and the keyword and hashtag charts below);
+    # reruns and other sessions within MIN_SYNC_SECONDS reuse the last sync
+    with st.spinner("Syncing new posts and comments..."):
+        sync.sync_if_stale(api_client)
+    
+    time_rollups = rollups.get_rollups()
+    data_range = time_rollups.time_range()
+    range_col, resolution_col = st.columns(2)
+    with range_col:
+        range_label = st.selectbox("📅 Time Range", list(TIME_RANGES), index=2)
+    with resolution_col:
+        resolution_label = st.selectbox(
+            "⏱️ Resolution",
+            list(CHART_RESOLUTIONS),
+            help="Auto charts ranges up to a week per hour and longer ones per day"
+        )
+    if data_range is not None:
+        # Ranges end at the latest synced record, so older scrapes still chart
+        range_end = data_range[1]
+        span = TIME_RANGES[range_label]
+        range_start = data_range[0] if span is None else max(data_range[0], range_end - span)
+        time_series = time_rollups.over_time(range_start, range_end, CHART_RESOLUTIONS[resolution_label])
+        totals = time_rollups.totals(range_start, range_end)
+        st.caption(
+            f"{range_start.strftime('%Y-%m-%d %H:%M')} – {range_end.strftime('%Y-%m-%d %H:%M')} UTC: "
+            f"{totals['posts']} posts, {totals['comments']} comments, {totals['likeCount']} likes, "
+            f"{totals['shareCount']} shares"
+        )
+    else:
+        range_start = range_end = None
+        time_series = {'postsOverTime': [], 'commentsOverTime': [], 'sentimentOverTime': []}
+    
     # Charts section with enhanced layout
     col1, col2 = st.columns(2)
     
     with col1:
         st.markdown("### 📊 Posts Over Time")
-        if 'postsOverTime' in stats_data and stats_data['postsOverTime']:
-            df_posts = pd.DataFrame(stats_data['postsOverTime'])
-            if not df_posts.empty:
-                fig_posts = px.line(
-                    df_posts, 
-                    x='date', 
-                    y='count',
-                    title="Posts Collected Over Time",
-                    color_discrete_sequence=['#667eea']
-                )
-                fig_posts.update_layout(
-                    height=400,
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    font=dict(color='#333')
-                )
-                st.plotly_chart(fig_posts, use_container_width=True)
-            else:
-                st.info("No posts data available for charting.")
-        else:
-            # Show mock data
-            mock_posts_data = generate_mock_time_series_data('posts')
-            df_posts = pd.DataFrame(mock_posts_data)
+        posts_over_time = time_series['postsOverTime'] or stats_data.get('postsOverTime')
+        if posts_over_time:
+            df_posts = downsample.downsample_frame(pd.DataFrame(posts_over_time), 'date', 'count', CHART_POINTS)
             fig_posts = px.line(
                 df_posts, 
                 x='date', 
                 y='count',
-                title="Posts Collected Over Time (Demo)",
+                title="Posts Collected Over Time",
                 color_discrete_sequence=['#667eea']
             )
-            fig_posts.update_layout(height=400)
+            fig_posts.update_layout(
+                height=400,
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)',
+                font=dict(color='#333')
+            )
             st.plotly_chart(fig_posts, use_container_width=True)
+        else:
+            st.info("No posts data available for charting.")
     
     with col2:
         st.markdown("### 💬 Comments Over Time")
-        if 'commentsOverTime' in stats_data and stats_data['commentsOverTime']:
-            df_comments = pd.DataFrame(stats_data['commentsOverTime'])
-            if not df_comments.empty:
-                fig_comments = px.line(
-                    df_comments, 
-                    x='date', 
-                    y='count',
-                    title="Comments Collected Over Time",
-                    color_discrete_sequence=['#764ba2']
-                )
-                fig_comments.update_layout(height=400)
-                st.plotly_chart(fig_comments, use_container_width=True)
-            else:
-                st.info("No comments data available for charting.")
-        else:
-            # Show mock data
-            mock_comments_data = generate_mock_time_series_data('comments')
-            df_comments = pd.DataFrame(mock_comments_data)
+        comments_over_time = time_series['commentsOverTime'] or stats_data.get('commentsOverTime')
+        if comments_over_time:
+            df_comments = downsample.downsample_frame(
+                pd.DataFrame(comments_over_time), 'date', 'count', CHART_POINTS
+            )
             fig_comments = px.line(
                 df_comments, 
                 x='date', 
                 y='count',
-                title="Comments Collected Over Time (Demo)",
+                title="Comments Collected Over Time",
                 color_discrete_sequence=['#764ba2']
             )
             fig_comments.update_layout(height=400)
             st.plotly_chart(fig_comments, use_container_width=True)
+        else:
+            st.info("No comments data available for charting.")
     
     # Sentiment analysis section
     st.markdown("---")
@@ -191,14 +223,17 @@ def render_dashboard(api_client):
     
     with col2:
         # Sentiment over time
-        sentiment_time_data = stats_data.get('sentimentOverTime', generate_mock_sentiment_data())
+        sentiment_time_data = time_series['sentimentOverTime'] or stats_data.get('sentimentOverTime') or []
         df_sentiment = pd.DataFrame(sentiment_time_data)
         
         if not df_sentiment.empty:
+            # Each sentiment keeps its own peaks, so the traces are plotted in long format
+            df_sentiment = downsample.downsample_traces(df_sentiment, 'date', rollups.SENTIMENTS, CHART_POINTS)
             fig_sentiment_time = px.line(
                 df_sentiment,
                 x='date',
-                y=['positive', 'neutral', 'negative'],
+                y='value',
+                color='variable',
                 title="Sentiment Trends Over Time",
                 color_discrete_map={
                     'positive': '#28a745',
@@ -213,6 +248,7 @@ def render_dashboard(api_client):
     
     # Top keywords and hashtags
     st.markdown("---")
+    
     col1, col2 = st.columns(2)
     
     with col1:
@@ -253,7 +289,8 @@ def render_dashboard(api_client):
     
     with col2:
         st.subheader("🏷️ Top Hashtags")
-        hashtag_data = stats_data.get('topHashtags', [
+        # Counted locally from the co-occurrence matrix of synced posts
+        hashtag_data = cooccurrence.get_cooccurrence().top_hashtags(10) or stats_data.get('topHashtags', [
             {'hashtag': '#python', 'count': 200},
             {'hashtag': '#datascience', 'count': 180},
             {'hashtag': '#machinelearning', 'count': 160},
@@ -272,6 +309,149 @@ def render_dashboard(api_client):
         fig_hashtags.update_layout(height=400)
         st.plotly_chart(fig_hashtags, use_container_width=True)
     
+    # Hashtag pairs in the selected time range, and the tags used with a chosen one
+    hashtag_index = cooccurrence.get_cooccurrence()
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.markdown("### 🔗 Top Hashtag Pairs")
+        top_pairs = hashtag_index.top_pairs(POPULAR_PAIRS, start=range_start, end=range_end)
+        if top_pairs:
+            st.dataframe(
+                pd.DataFrame(top_pairs).rename(columns={'source': 'Hashtag', 'target': 'With', 'count': 'Posts'}),
+                use_container_width=True,
+                hide_index=True
+            )
+            st.caption("Posts using both hashtags in the selected time range, counted per day")
+        else:
+            st.info("No hashtag pairs in this time range yet.")
+    
+    with col2:
+        st.markdown("### 🧭 Related Hashtags")
+        hashtag_choices = [entry['hashtag'] for entry in hashtag_index.top_hashtags(RELATED_CHOICES)]
+        if hashtag_choices:
+            chosen_hashtag = st.selectbox("Hashtag:", hashtag_choices)
+            related_hashtags = hashtag_index.related(chosen_hashtag, POPULAR_PAIRS)
+            if related_hashtags:
+                df_related = pd.DataFrame(related_hashtags)
+                df_related['share'] = (df_related['share'] * 100).round(1)
+                st.dataframe(
+                    df_related.rename(columns={'hashtag': 'Hashtag', 'count': 'Posts', 'share': f'% of {chosen_hashtag}'}),
+                    use_container_width=True,
+                    hide_index=True
+                )
+            else:
+                st.info(f"{chosen_hashtag} is not used with other hashtags yet.")
+        else:
+            st.info("No hashtags synced yet.")
+    
+    # Topic clusters
+    st.markdown("---")
+    st.subheader("🧩 Topics")
+    
+    topic_summary = topics.get_topic_model().summary()
+    topic_backlog = topics.clustering_backlog()
+    if topic_backlog:
+        st.caption(f"⏳ Clustering {topic_backlog:,} new posts in the background; rerun to see them.")
+    if topic_summary:
+        df_topics = pd.DataFrame(topic_summary)
+        fig_topics = px.bar(
+            df_topics,
+            x='count',
+            y='name',
+            orientation='h',
+            title="Posts per Topic",
+            labels={'count': 'Posts', 'name': 'Topic'},
+            color_discrete_sequence=['#667eea']
+        )
+        fig_topics.update_layout(height=400, yaxis={'categoryorder': 'total ascending'})
+        st.plotly_chart(fig_topics, use_container_width=True)
+    else:
+        st.info("No topic clusters yet. Topics appear once posts have been synced from the backend.")
+    
+    # Hashtags rising against their own baseline
+    st.markdown("---")
+    st.subheader("🔥 Trending Hashtags")
+    
+    burst_detector = trending.get_burst_detector()
+    rising_hashtags = burst_detector.top_rising(10)
+    if rising_hashtags:
+        df_rising = pd.DataFrame(rising_hashtags)
+        fig_rising = px.bar(
+            df_rising,
+            x='hashtag',
+            y='zScore',
+            hover_data=['count', 'baseline'],
+            title="Rising Hashtags (z-score vs. hourly baseline)",
+            color_discrete_sequence=['#f5576c']
+        )
+        fig_rising.update_layout(height=400)
+        st.plotly_chart(fig_rising, use_container_width=True)
+        st.caption(f"Latest hour: {burst_detector.current_bucket_start().strftime('%Y-%m-%d %H:%M')}")
+    else:
+        st.info("No hashtags are rising above their baseline right now.")
+    
+    # Word cloud per keyword and time range
+    st.markdown("---")
+    st.subheader("☁️ Word Cloud")
+    
+    frequency_tables = word_frequency.get_word_frequency_tables()
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        cloud_keyword = st.selectbox(
+            "Keyword:",
+            ["All keywords"] + frequency_tables.keywords(),
+            help="Keywords scrapes were started for; a post counts when its content contains the keyword"
+        )
+    
+    with col2:
+        cloud_range = st.date_input(
+            "Date range:",
+            value=word_frequency.default_range(),
+            help="Inclusive range of days to merge"
+        )
+    
+    if isinstance(cloud_range, (list, tuple)) and len(cloud_range) == 2:
+        start_date, end_date = cloud_range
+        keyword = word_frequency.ALL_KEYWORDS if cloud_keyword == "All keywords" else cloud_keyword
+        frequencies = frequency_tables.merged(keyword, start_date, end_date)
+        cloud_image = word_frequency.render_word_cloud(frequencies)
+        
+        if cloud_image:
+            st.image(cloud_image, use_column_width=True)
+        else:
+            st.info("No words found for this keyword and date range.")
+    else:
+        st.info("Select a start and end date to build the word cloud.")
+    
+    # Communities persisted by the network page's user network analysis
+    st.markdown("---")
+    st.subheader("🕸️ User Communities")
+    
+    partition = communities.load_partition(graph_core.USER_NETWORK)
+    if partition is not None and partition.metrics:
+        df_communities = pd.DataFrame(partition.summary(10))
+        df_communities['community'] = df_communities['community'] + 1
+        df_communities['topMembers'] = df_communities['topMembers'].apply(', '.join)
+        st.dataframe(
+            df_communities[['community', 'size', 'density', 'modularity', 'topMembers']].rename(columns={
+                'community': 'Community',
+                'size': 'Members',
+                'density': 'Density',
+                'modularity': 'Modularity',
+                'topMembers': 'Top Members'
+            }),
+            use_container_width=True,
+            hide_index=True
+        )
+        st.caption(
+            f"{len(partition.metrics):,} communities, modularity {partition.modularity:.3f}, "
+            f"updated {partition.computed_at.strftime('%Y-%m-%d %H:%M')}"
+        )
+    else:
+        st.info("No communities yet. Analyze the User Network on the Network Graph page to detect them.")
+    
     # User engagement metrics
     st.markdown("---")
     st.subheader("👥 User Engagement Metrics")
@@ -374,37 +554,3 @@ def get_mock_statistics():
             'engagementRate': 3.2
         }
     }
-
-def generate_mock_time_series_data(data_type):
-    """Generate mock time series data."""
-    dates = pd.date_range(start=datetime.now() - timedelta(days=30), end=datetime.now(), freq='D')
-    np.random.seed(42)
-    
-    if data_type == 'posts':
-        base_count = 40
-        noise = np.random.normal(0, 5, len(dates))
-        trend = np.linspace(0, 10, len(dates))
-        counts = [max(0, int(base_count + noise[i] + trend[i])) for i in range(len(dates))]
-    else:  # comments
-        base_count = 100
-        noise = np.random.normal(0, 15, len(dates))
-        trend = np.linspace(0, 20, len(dates))
-        counts = [max(0, int(base_count + noise[i] + trend[i])) for i in range(len(dates))]
-    
-    return [{'date': date.strftime('%Y-%m-%d'), 'count': count} for date, count in zip(dates, counts)]
-
-def generate_mock_sentiment_data():
-    """Generate mock sentiment time series data."""
-    dates = pd.date_range(start=datetime.now() - timedelta(days=30), end=datetime.now(), freq='D')
-    np.random.seed(42)
-    
-    data = []
-    for date in dates:
-        data.append({
-            'date': date.strftime('%Y-%m-%d'),
-            'positive': int(40 + np.random.normal(0, 5)),
-            'neutral': int(35 + np.random.normal(0, 5)),
-            'negative': int(20 + np.random.normal(0, 3))
-        })
-    
-    return data
\ No newline at end of file
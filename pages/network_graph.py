@@ -1,15 +1,40 @@
 import streamlit as st
-import plotly.graph_objects as go
-import plotly.express as px
 import pandas as pd
-import networkx as nx
-from pyvis.network import Network
 import streamlit.components.v1 as components
-import tempfile
-import os
 import numpy as np
+import re
 from datetime import datetime
-import json
+from lazy_loader import lazy_module
+import refresh
+from analytics import defaults, sync
+
+# Only needed once a graph is actually drawn
+px = lazy_module("plotly.express")
+graph_metrics = lazy_module("analytics.graph_metrics")
+graph_core = lazy_module("analytics.graph_core")
+ego = lazy_module("analytics.ego")
+centrality = lazy_module("analytics.centrality")
+layout = lazy_module("analytics.layout")
+network_html = lazy_module("analytics.network_html")
+network_webgl = lazy_module("analytics.network_webgl")
+graph_export = lazy_module("analytics.graph_export")
+level_of_detail = lazy_module("analytics.level_of_detail")
+temporal = lazy_module("analytics.temporal")
+post_index = lazy_module("analytics.post_index")
+batch_analysis = lazy_module("analytics.batch_analysis")
+paths = lazy_module("analytics.paths")
+jobs = lazy_module("analytics.jobs")
+
+MAX_LISTED_COMMUNITIES = 20
+MAX_PATH_QUERIES = 100
+VIS_RENDERER = "Interactive (vis-network)"
+WEBGL_RENDERER = "WebGL (Plotly)"
+PLAYBACK_FRAMES = 60
+POST_PICKER_RESULTS = 50
+SINGLE_POST_MODE = "Single post"
+BATCH_MODE = "Batch comparison"
+JOB_POLL_SECONDS = 2
+JOB_POLL_KEY = "network_job_poll"
 
 def render_network_graph(api_client):
     """Render the network graph visualization page."""
@@ -41,74 +66,178 @@ def render_network_graph(api_client):
             help="Choose the metric to determine node size"
         )
     
-    # Get posts for selection
-    with st.spinner("Loading posts for analysis..."):
-        posts_data = api_client.get_posts()
+    # Bring the local indexes up to date; reruns within MIN_SYNC_SECONDS reuse the last sync,
+    # and job-status polls only redraw the progress without reaching the backend
+    if not refresh.is_scheduled_rerun(JOB_POLL_KEY):
+        with st.spinner("Syncing new posts and comments..."):
+            sync.sync_if_stale(api_client)
     
-    if not posts_data:
+    # The picker and graphs read the synced records; demo posts only stand in until the first sync
+    posts_data = None
+    if not len(sync.posts_log):
         st.warning("⚠️ Unable to load posts. Please check your backend connection.")
         
         # Show mock data for demonstration
         st.info("📊 Showing demo data for demonstration purposes")
         posts_data = get_mock_posts_data()
     
-    # Convert to DataFrame
-    if isinstance(posts_data, list):
-        df = pd.DataFrame(posts_data)
-    else:
-        df = pd.DataFrame([posts_data])
-    
-    if df.empty:
-        st.info("📭 No posts found for network analysis.")
-        return
-    
-    # Post selection with enhanced interface
-    st.subheader("📊 Select Post for Network Analysis")
-    
-    # Create a selection interface
-    if 'selected_post_id' not in st.session_state:
-        st.session_state.selected_post_id = None
+    with st.expander("⚙️ Analysis Settings"):
+        approx_threshold = st.number_input(
+            "Approximate path metrics above (nodes):",
+            min_value=10,
+            max_value=1000000,
+            value=defaults.DEFAULT_APPROX_THRESHOLD,
+            step=100,
+            help="Diameter, path length and efficiency switch to sampled estimates on larger graphs"
+        )
+        centrality_accuracy = st.select_slider(
+            "Centrality accuracy:",
+            options=list(defaults.ACCURACY_LEVELS.keys()),
+            value=defaults.DEFAULT_ACCURACY,
+            help="Betweenness and closeness are estimated from this many sampled BFS sources: Fast 64, Balanced 256, Accurate 1024, Exact all"
+        )
+        render_budget = st.number_input(
+            "Render budget (nodes):",
+            min_value=50,
+            max_value=2000,
+            value=defaults.RENDER_NODE_BUDGET,
+            step=50,
+            help="Larger graphs are drawn with communities collapsed into supernodes and weak edges pruned"
+        )
+        if analysis_type == "Post Network":
+            neighbourhood_hops = st.slider(
+                "Neighbourhood hops:",
+                min_value=0,
+                max_value=defaults.MAX_HOPS,
+                value=defaults.DEFAULT_HOPS,
+                help="Expand the post into commenters, their other posts and shared hashtags; 0 shows only the post's own interactions"
+            )
+            fan_out = st.number_input(
+                "Neighbours per node:",
+                min_value=1,
+                max_value=500,
+                value=defaults.DEFAULT_FAN_OUT,
+                help="Each node adds only its most heavily linked neighbours at the next hop"
+            )
+            neighbourhood_budget = st.number_input(
+                "Neighbourhood node budget:",
+                min_value=10,
+                max_value=20000,
+                value=defaults.NEIGHBOURHOOD_NODE_BUDGET,
+                step=50,
+                help="Stop expanding once this many nodes are collected"
+            )
+        else:
+            min_edge_weight = st.number_input(
+                "Minimum edge weight:",
+                min_value=1,
+                max_value=1000,
+                value=defaults.DEFAULT_MIN_WEIGHT,
+                help="Drop links seen fewer times than this (shared hashtags, co-occurrences, comments)"
+            )
+            max_view_nodes = st.number_input(
+                "Maximum nodes to analyze and draw:",
+                min_value=50,
+                max_value=20000,
+                value=defaults.DEFAULT_MAX_VIEW_NODES,
+                step=50,
+                help="Larger networks are reduced to their most connected nodes"
+            )
     
-    # Display posts in a selectbox with better formatting
-    post_options = {}
-    for post in posts_data:
-        if post.get('id'):
-            content_preview = post.get('content', 'No content')[:50] + "..." if len(post.get('content', '')) > 50 else post.get('content', 'No content')
-            display_text = f"{post.get('author', 'Unknown')} - {content_preview}"
-            post_options[display_text] = post.get('id')
+    analysis_data = None
     
-    if post_options:
-        selected_post_display = st.selectbox(
-            "Choose a post for network analysis:",
-            options=list(post_options.keys()),
-            index=0 if not st.session_state.selected_post_id else None
+    if analysis_type == "Post Network":
+        # Post selection with enhanced interface
+        st.subheader("📊 Select Post for Network Analysis")
+        
+        analysis_mode = st.radio(
+            "Mode:",
+            [SINGLE_POST_MODE, BATCH_MODE],
+            horizontal=True,
+            help="Batch comparison analyses several posts at once and merges their networks"
         )
         
-        selected_post_id = post_options[selected_post_display]
+        # Create a selection interface
+        if 'selected_post_id' not in st.session_state:
+            st.session_state.selected_post_id = None
         
-        col1, col2 = st.columns([1, 1])
-        with col1:
-            if st.button("🔍 Analyze Network"):
-                st.session_state.selected_post_id = selected_post_id
+        # Search the post index instead of listing every post
+        picker = get_post_picker(posts_data)
         
-        with col2:
-            if st.button("🔄 Reset Selection"):
-                st.session_state.selected_post_id = None
-                st.rerun()
+        post_query = st.text_input(
+            "🔎 Search posts by author or content:",
+            placeholder="Type an author name or words from the post",
+            help=f"Shows the {POST_PICKER_RESULTS} most recent posts containing every word; the last word may be partial"
+        )
+        post_options = {match['id']: match['label'] for match in picker.search(post_query, POST_PICKER_RESULTS)}
+        
+        if analysis_mode == BATCH_MODE:
+            analysis_title, analysis_data = render_batch_analysis(
+                api_client, post_options, int(approx_threshold), centrality_accuracy
+            )
+        elif not post_options:
+            st.info("📭 No posts match this search.")
+        else:
+            selected_post_id = st.selectbox(
+                "Choose a post for network analysis:",
+                options=list(post_options.keys()),
+                format_func=post_options.get
+            )
+            
+            col1, col2 = st.columns([1, 1])
+            with col1:
+                if st.button("🔍 Analyze Network"):
+                    st.session_state.selected_post_id = selected_post_id
+            
+            with col2:
+                if st.button("🔄 Reset Selection"):
+                    st.session_state.selected_post_id = None
+                    st.rerun()
+        
+        if analysis_mode == SINGLE_POST_MODE and st.session_state.selected_post_id:
+            analysis_title = f"🕸️ Network Analysis for Post: {st.session_state.selected_post_id}"
+            if neighbourhood_hops > 0:
+                analysis_title += f" ({neighbourhood_hops}-hop neighbourhood)"
+            
+            with st.spinner("Performing network analysis..."):
+                if neighbourhood_hops > 0:
+                    analysis_data = graph_metrics.analyze_post_neighbourhood(
+                        st.session_state.selected_post_id, int(neighbourhood_hops), int(fan_out),
+                        int(neighbourhood_budget), int(approx_threshold), centrality_accuracy
+                    )
+                else:
+                    analysis_data = graph_metrics.analyze_post(
+                        st.session_state.selected_post_id, int(approx_threshold), centrality_accuracy
+                    )
+                
+                if analysis_data is None:
+                    try:
+                        analysis_data = api_client.get_link_analysis(st.session_state.selected_post_id)
+                        if not analysis_data:
+                            analysis_data = generate_mock_network_data()
+                    except Exception as e:
+                        st.error(f"❌ Error performing network analysis: {str(e)}")
+                        analysis_data = generate_mock_network_data()
+    else:
+        analysis_title = f"🕸️ {analysis_type} Analysis"
+        analysis_data = run_network_job(
+            analysis_type, int(min_edge_weight), int(max_view_nodes), int(approx_threshold), centrality_accuracy
+        )
     
     # Network analysis section
-    if st.session_state.selected_post_id:
+    if analysis_data is not None:
         st.markdown("---")
-        st.subheader(f"🕸️ Network Analysis for Post: {st.session_state.selected_post_id}")
+        st.subheader(analysis_title)
         
-        with st.spinner("Performing network analysis..."):
-            try:
-                analysis_data = api_client.get_link_analysis(st.session_state.selected_post_id)
-                if not analysis_data:
-                    analysis_data = generate_mock_network_data()
-            except Exception as e:
-                st.error(f"❌ Error performing network analysis: {str(e)}")
-                analysis_data = generate_mock_network_data()
+        total_nodes = analysis_data.get('metrics', {}).get('totalNodes')
+        if total_nodes and total_nodes > len(analysis_data.get('nodes', [])):
+            st.caption(
+                f"ℹ️ Showing the {len(analysis_data['nodes']):,} most connected of {total_nodes:,} nodes "
+                f"({analysis_data['metrics']['totalEdges']:,} edges in the full network)."
+            )
+        
+        if analysis_data.get('metrics', {}).get('approximate'):
+            st.caption("ℹ️ Path-based metrics and centralities are sampled estimates for this graph size.")
         
         # Display analysis results with enhanced metrics
         col1, col2, col3, col4 = st.columns(4)
@@ -154,6 +283,13 @@ def render_network_graph(api_client):
         st.subheader("🕸️ Network Graph")
         
         # Visualization options
+        renderer = st.radio(
+            "🖼️ Renderer:",
+            [VIS_RENDERER, WEBGL_RENDERER],
+            horizontal=True,
+            help="WebGL draws tens of thousands of nodes and up to 100k edges; vis-network supports physics and dragging"
+        )
+        
         col1, col2, col3 = st.columns(3)
         
         with col1:
@@ -165,86 +301,47 @@ def render_network_graph(api_client):
             edge_width_range = st.slider("Edge width range", 1, 10, (1, 3))
         
         with col3:
-            physics_enabled = st.checkbox("Enable physics", value=True)
+            physics_enabled = st.checkbox(
+                "Enable physics",
+                value=False,
+                help="Node positions are computed on the server; physics lets the browser keep relaxing them"
+            )
             smooth_edges = st.checkbox("Smooth edges", value=True)
         
-        # Create PyVis network with enhanced configuration
-        net = Network(
-            height="600px", 
-            width="100%", 
-            bgcolor="#ffffff", 
-            font_color="#000000",
-            directed=False
-        )
-        
-        # Add nodes with enhanced styling
         nodes = analysis_data.get('nodes', [])
-        for node in nodes:
-            node_id = node.get('id', '')
-            label = node.get('label', node_id)
-            node_type = node.get('type', 'default')
-            
-            # Color nodes by type
-            color_map = {
-                'post': '#ff7675',
-                'user': '#74b9ff',
-                'hashtag': '#55a3ff',
-                'comment': '#a29bfe',
-                'default': '#636e72'
-            }
-            
-            # Size nodes by metric
-            size = node.get('size', 20)
-            if node_size_metric == "Degree":
-                size = node.get('degree', 20)
-            elif node_size_metric == "Betweenness":
-                size = node.get('betweenness', 20) * 100
-            elif node_size_metric == "Closeness":
-                size = node.get('closeness', 20) * 100
-            elif node_size_metric == "Eigenvector":
-                size = node.get('eigenvector', 20) * 100
-            elif node_size_metric == "PageRank":
-                size = node.get('pagerank', 20) * 100
-            
-            # Clamp size to range
-            size = max(node_size_range[0], min(node_size_range[1], size))
-            
-            net.add_node(
-                node_id, 
-                label=label if show_labels else "",
-                color=color_map.get(node_type, color_map['default']),
-                size=size,
-                title=f"Type: {node_type}<br>Degree: {node.get('degree', 0)}<br>Centrality: {node.get('centrality', 0):.3f}"
+        edges = analysis_data.get('edges', [])
+        fingerprint = layout.graph_fingerprint(nodes, edges)
+        node_budget = int(render_budget)
+        if renderer == WEBGL_RENDERER:
+            node_budget = max(node_budget, network_webgl.NODE_BUDGET)
+        
+        # Level of detail: keep the drawn graph within the render budget
+        expanded_communities = []
+        if level_of_detail.over_budget(nodes, edges, node_budget):
+            community_sizes = get_community_sizes(analysis_data)
+            community_options = list(range(len(community_sizes))) + [level_of_detail.OTHER_COMMUNITY]
+            expanded_communities = st.multiselect(
+                "🔍 Expand communities:",
+                options=community_options,
+                format_func=lambda c: "Other communities" if c == level_of_detail.OTHER_COMMUNITY
+                else f"Community {c + 1} ({community_sizes[c]} members)",
+                help="Show the members of these community supernodes individually"
             )
         
-        # Add edges with enhanced styling
-        edges = analysis_data.get('edges', [])
-        for edge in edges:
-            source = edge.get('source', '')
-            target = edge.get('target', '')
-            edge_type = edge.get('type', 'default')
-            weight = edge.get('weight', 1)
-            
-            # Color edges by type
-            edge_color_map = {
-                'mentions': '#e17055',
-                'replies': '#00b894',
-                'shares': '#fdcb6e',
-                'likes': '#6c5ce7',
-                'default': '#636e72'
-            }
-            
-            # Calculate edge width based on weight
-            width = max(edge_width_range[0], min(edge_width_range[1], weight * 2))
-            
-            net.add_edge(
-                source, 
-                target,
-                color=edge_color_map.get(edge_type, edge_color_map['default']),
-                width=width,
-                title=f"Type: {edge_type}<br>Weight: {weight}",
-                smooth=smooth_edges
+        view = level_of_detail.level_of_detail(
+            nodes, edges, fingerprint, node_size_metric.lower(), node_budget, tuple(expanded_communities)
+        )
+        if view['hiddenNodes'] or view['prunedEdges']:
+            st.caption(
+                f"🔭 Level of detail: {view['hiddenNodes']:,} nodes collapsed into {len(view['supernodes'])} "
+                f"community supernodes, {view['prunedEdges']:,} weakest edges hidden."
             )
+            nodes = view['nodes']
+            edges = view['edges']
+            fingerprint = layout.graph_fingerprint(nodes, edges)
+        
+        with st.spinner("Computing layout..."):
+            positions = layout.compute_layout(nodes, edges, layout_algorithm, fingerprint)
         
         # Set physics options based on layout algorithm
         if layout_algorithm == "Force Atlas":
@@ -273,64 +370,123 @@ def render_network_graph(api_client):
                 "solver": "forceAtlas2Based"
             }
         
-        if physics_enabled:
-            net.set_options(f"""
-            var options = {{
-              "physics": {json.dumps(physics_options)},
-              "interaction": {{
-                "hover": true,
-                "navigationButtons": true,
-                "keyboard": true
-              }},
-              "edges": {{
-                "smooth": {{
-                  "type": "continuous"
-                }}
-              }}
-            }}
-            """)
+        if renderer == WEBGL_RENDERER:
+            render_webgl_network(nodes, edges, positions, fingerprint, layout_algorithm,
+                                 node_size_metric, node_size_range, edge_width_range, show_labels)
         else:
-            net.set_options("""
-            var options = {{
-              "physics": {{
-                "enabled": false
-              }},
-              "interaction": {{
-                "hover": true,
-                "navigationButtons": true,
-                "keyboard": true
-              }}
-            }}
-            """)
-        
-        # Save and display the network
-        try:
-            # Create a temporary HTML file
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.html', mode='w') as tmp_file:
-                net.save_graph(tmp_file.name)
+            # Build and display the network page in memory
+            try:
+                html_content = network_html.render_network_html(
+                    nodes,
+                    edges,
+                    positions,
+                    fingerprint,
+                    layout_algorithm,
+                    size_metric=node_size_metric.lower(),
+                    size_range=node_size_range,
+                    width_range=edge_width_range,
+                    show_labels=show_labels,
+                    show_edge_labels=show_edge_labels,
+                    physics_enabled=physics_enabled,
+                    physics_options=physics_options,
+                    smooth_edges=smooth_edges
+                )
+                components.html(html_content, height=620)
                 
-                # Read the HTML content
-                with open(tmp_file.name, 'r', encoding='utf-8') as f:
-                    html_content = f.read()
+            except Exception as e:
+                st.error(f"Error creating network visualization: {str(e)}")
                 
-                # Clean up the temporary file
-                os.unlink(tmp_file.name)
-            
-            # Display the network
-            components.html(html_content, height=600)
-            
-        except Exception as e:
-            st.error(f"Error creating network visualization: {str(e)}")
-            
-            # Fallback: Create a simple plotly network
-            st.info("Creating fallback visualization...")
-            create_fallback_visualization(nodes, edges)
-        
+                # Fallback: draw the same graph with the WebGL renderer
+                st.info("Creating fallback visualization...")
+                render_webgl_network(nodes, edges, positions, fingerprint, layout_algorithm,
+                                     node_size_metric, node_size_range, edge_width_range, show_labels)
+
+        # Replay how the drawn graph grew, one frame per slider step
+        time_span = temporal.temporal_store.time_range()
+        if time_span is not None:
+            with st.expander("⏱️ Network Growth"):
+                playback_key = (fingerprint, layout_algorithm, temporal.temporal_store.version)
+                if st.session_state.get('network_playback_key') != playback_key:
+                    st.session_state.network_playback = temporal.Playback(
+                        temporal.temporal_store,
+                        [temporal.node_key(node.get('type', 'default'), node.get('label', node.get('id', '')))
+                         for node in nodes],
+                        positions
+                    )
+                    st.session_state.network_playback_figure = network_webgl.PlaybackFigure(
+                        st.session_state.network_playback, nodes
+                    )
+                    st.session_state.network_playback_key = playback_key
+                playback = st.session_state.network_playback
+                
+                if not len(playback):
+                    st.info("📭 No timestamped interactions between the drawn nodes.")
+                else:
+                    frames = playback.frame_times(PLAYBACK_FRAMES)
+                    frame_time = st.select_slider(
+                        "Show the network as of:",
+                        options=frames,
+                        value=frames[-1],
+                        format_func=lambda t: t.strftime('%Y-%m-%d %H:%M')
+                    )
+                    frame = playback.seek(frame_time)
+                    change = f"+{frame['added']:,}" if frame['added'] >= 0 else f"{frame['added']:,}"
+                    st.caption(
+                        f"{frame['edges']:,} of {len(playback):,} interactions, {change} since the previous frame; "
+                        f"{len(playback.active_nodes()):,} active nodes."
+                    )
+                    st.plotly_chart(
+                        st.session_state.network_playback_figure.update(frame), use_container_width=True
+                    )
+
+        # Export the analysed network for Gephi and other tools
+        with st.expander("💾 Export Network"):
+            col1, col2 = st.columns(2)
+            with col1:
+                export_format = st.selectbox("Format:", list(graph_export.FORMATS.keys()))
+            with col2:
+                include_centralities = st.checkbox(
+                    "Include centralities",
+                    value=analysis_type == "Post Network",
+                    help="Aggregate networks compute betweenness, closeness, eigenvector and PageRank "
+                         "over the whole graph at the selected accuracy"
+                )
+            if analysis_type == "Post Network":
+                st.caption("Exports the analysed post network with the node metrics computed for it.")
+            else:
+                st.caption(f"Exports the whole {analysis_type.lower()}, not just the nodes drawn above.")
+
+            if st.button("📦 Prepare Export"):
+                with st.spinner("Writing export..."):
+                    if analysis_type == "Post Network":
+                        export_file = graph_export.export_payload(
+                            analysis_data.get('nodes', []), analysis_data.get('edges', []), export_format,
+                            include_centralities
+                        )
+                    else:
+                        export_file = graph_export.export_network(
+                            analysis_type, int(min_edge_weight), export_format,
+                            centrality_accuracy if include_centralities else None
+                        )
+                if export_file is None:
+                    st.warning("⚠️ Nothing to export yet.")
+                else:
+                    extension, mime = graph_export.FORMATS[export_format]
+                    slug = analysis_type.lower().replace(' ', '_')
+                    with export_file:
+                        st.download_button(
+                            label=f"Download {export_format}",
+                            data=export_file.read(),
+                            file_name=f"{slug}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}",
+                            mime=mime
+                        )
+
         # Community detection results with enhanced display
         if 'communities' in analysis_data:
             st.markdown("---")
             st.subheader("👥 Detected Communities")
             communities = analysis_data['communities']
+            sizes = get_community_sizes(analysis_data)
             
             col1, col2 = st.columns(2)
             
@@ -340,7 +496,6 @@ def render_network_graph(api_client):
                 st.metric("Number of Communities", len(communities))
                 
                 if communities:
-                    sizes = [len(community) for community in communities]
                     st.metric("Largest Community", max(sizes))
                     st.metric("Average Community Size", f"{np.mean(sizes):.1f}")
                     st.metric("Smallest Community", min(sizes))
@@ -348,17 +503,18 @@ def render_network_graph(api_client):
             with col2:
                 # Community distribution chart
                 if communities:
-                    community_sizes = [len(community) for community in communities]
                     fig_communities = px.histogram(
-                        x=community_sizes,
+                        x=sizes,
                         title="Community Size Distribution",
                         labels={'x': 'Community Size', 'y': 'Number of Communities'}
                     )
                     st.plotly_chart(fig_communities, use_container_width=True)
             
-            # Display communities
-            for i, community in enumerate(communities):
-                with st.expander(f"Community {i+1} ({len(community)} members)"):
+            # Display communities, largest first
+            if len(communities) > MAX_LISTED_COMMUNITIES:
+                st.caption(f"Showing the {MAX_LISTED_COMMUNITIES} largest of {len(communities):,} communities.")
+            for i, community in enumerate(communities[:MAX_LISTED_COMMUNITIES]):
+                with st.expander(f"Community {i+1} ({sizes[i]} members)"):
                     col1, col2 = st.columns(2)
                     
                     with col1:
@@ -366,15 +522,19 @@ def render_network_graph(api_client):
                         for member in community[:10]:  # Show first 10 members
                             st.write(f"• {member}")
                         
-                        if len(community) > 10:
-                            st.write(f"... and {len(community) - 10} more members")
+                        if sizes[i] > 10:
+                            st.write(f"... and {sizes[i] - 10} more members")
                     
                     with col2:
                         # Community metrics
-                        st.write("**Community Metrics:**")
-                        st.write(f"• Density: {np.random.random():.3f}")
-                        st.write(f"• Modularity: {np.random.random():.3f}")
-                        st.write(f"• Centrality: {np.random.random():.3f}")
+                        community_metrics = analysis_data.get('communityMetrics', [])
+                        if i < len(community_metrics):
+                            st.write("**Community Metrics:**")
+                            st.write(f"• Density: {community_metrics[i]['density']:.3f}")
+                            st.write(f"• Modularity: {community_metrics[i]['modularity']:.3f}")
+                            st.write(f"• Centrality: {community_metrics[i]['centrality']:.3f}")
+                        else:
+                            st.write("**Community Metrics:** not available")
         
         # Shortest path analysis with enhanced features
         if 'shortestPaths' in analysis_data:
@@ -410,96 +570,219 @@ def render_network_graph(api_client):
                     
                     if 'description' in path:
                         st.write(f"**Description:** {path['description']}")
-    
+
+            # Many-pair queries answered locally from the path index
+            st.write("**🔎 Path Queries**")
+            path_queries = st.text_area(
+                "One pair per line, e.g. `alice -> #python`:",
+                help="Nodes are matched by label (user name, #hashtag or 'Post <id>'). "
+                     f"Up to {MAX_PATH_QUERIES} pairs are answered at once."
+            )
+            if st.button("🛤️ Find Paths") and path_queries.strip():
+                pairs = parse_path_queries(path_queries)[:MAX_PATH_QUERIES]
+                with st.spinner(f"Finding {len(pairs)} paths..."):
+                    if analysis_type == "Post Network":
+                        path_index = paths.payload_index(
+                            analysis_data['nodes'], analysis_data['edges'],
+                            layout.graph_fingerprint(analysis_data['nodes'], analysis_data['edges'])
+                        )
+                    else:
+                        path_index = paths.network_index(analysis_type, int(min_edge_weight))
+                    results = path_index.query_many(pairs) if path_index is not None and pairs else []
+
+                if results:
+                    st.dataframe(pd.DataFrame([
+                        {
+                            'Source': result['source'],
+                            'Target': result['target'],
+                            'Length': result['length'],
+                            'Estimate': format_path_estimate(result),
+                            'Weight': result['weight'] if result['found'] else None,
+                            'Path': " → ".join(result['nodes']) if result['found']
+                                    else result.get('error', 'No path')
+                        }
+                        for result in results
+                    ]), use_container_width=True, hide_index=True)
+                else:
+                    st.warning("⚠️ No valid pairs. Use `source -> target`, one pair per line.")
+
     else:
-        st.info("👆 Please select a post above to perform network analysis.")
+        if analysis_type == "Post Network":
+            st.info("👆 Please select a post above to perform network analysis.")
+        else:
+            st.info(f"📭 No synced data to build the {analysis_type.lower()} yet.")
         
         # Show sample network statistics
         st.markdown("---")
         st.subheader("📊 Sample Network Statistics")
         
         col1, col2, col3, col4 = st.columns(4)
+        post_stats = get_post_picker(posts_data).stats()
         
         with col1:
-            st.metric("Total Posts", len(df))
+            st.metric("Total Posts", post_stats['posts'])
         
         with col2:
-            unique_authors = df['author'].nunique() if 'author' in df.columns else 0
-            st.metric("Unique Authors", unique_authors)
+            st.metric("Unique Authors", post_stats['authors'])
         
         with col3:
-            total_hashtags = sum(len(post.get('hashtags', [])) for post in posts_data)
-            st.metric("Total Hashtags", total_hashtags)
+            st.metric("Total Hashtags", post_stats['hashtags'])
         
         with col4:
-            avg_comments = df['commentCount'].mean() if 'commentCount' in df.columns else 0
-            st.metric("Avg Comments", f"{avg_comments:.1f}")
+            st.metric("Avg Comments", f"{post_stats['avgComments']:.1f}")
+
+def run_network_job(analysis_type, min_edge_weight, max_view_nodes, approx_threshold, centrality_accuracy):
+    """Analyse an aggregate network on the job queue instead of blocking the rerun.
+
+    While the job runs, shows its progress with a cancel button and returns
+    the previous analysis of the same network (or None) to draw meanwhile.
+    """
+    job_queue = jobs.get_job_queue()
+    job_id = graph_metrics.submit_network_analysis(
+        analysis_type, min_edge_weight, max_view_nodes, approx_threshold, centrality_accuracy
+    )
+    if job_id is None:
+        return None
+    
+    job = job_queue.status(job_id)
+    if job['status'] == jobs.DONE:
+        return job_queue.result(job_id)
+    
+    col1, col2 = st.columns([4, 1])
+    if job['status'] in jobs.ACTIVE_STATES:
+        with col1:
+            st.progress(job['progress'], text=f"⏳ {job['message'] or 'Waiting for a worker...'} ({job['elapsed']:.0f}s)")
+            partial = job_queue.partial(job_id)
+            if partial:
+                totals = partial['totals']
+                summary = f"{totals['nodes']:,} nodes, {totals['edges']:,} edges"
+                if 'communities' in partial:
+                    summary += f", {partial['communities']:,} communities (modularity {partial['modularity']:.3f})"
+                st.caption(f"Whole network: {summary}")
+        with col2:
+            if st.button("⏹️ Cancel"):
+                job_queue.cancel(job_id)
+                st.rerun()
+        refresh.schedule_rerun(JOB_POLL_KEY, JOB_POLL_SECONDS)
+    else:
+        with col1:
+            if job['status'] == jobs.FAILED:
+                st.error(f"❌ Network analysis failed: {job['error']}")
+            else:
+                st.info("⏹️ Network analysis cancelled.")
+        with col2:
+            if st.button("▶️ Run Again"):
+                graph_metrics.submit_network_analysis(
+                    analysis_type, min_edge_weight, max_view_nodes, approx_threshold, centrality_accuracy, retry=True
+                )
+                st.rerun()
+    
+    previous = job_queue.previous(job_id)
+    if previous is not None:
+        running = job['status'] in jobs.ACTIVE_STATES
+        st.caption("Showing the last completed analysis" + (" until the new one finishes." if running else "."))
+    return previous
 
-def create_fallback_visualization(nodes, edges):
-    """Create a fallback plotly network visualization."""
-    # Create NetworkX graph
-    G = nx.Graph()
+def render_batch_analysis(api_client, post_options, approx_threshold, centrality_accuracy):
+    """Pick several posts, analyse them concurrently and compare them.
+
+    Returns the title and analysis of the merged network, or (None, None)
+    before a batch has run.
+    """
+    if 'batch_post_ids' not in st.session_state:
+        st.session_state.batch_post_ids = []
+        st.session_state.batch_post_labels = {}
     
-    # Add nodes and edges
-    for node in nodes:
-        G.add_node(node.get('id', ''))
+    # Keep earlier picks selectable while the search changes
+    labels = {**st.session_state.batch_post_labels, **post_options}
+    batch_post_ids = st.multiselect(
+        "Posts to compare:",
+        options=list(dict.fromkeys(st.session_state.batch_post_ids + list(post_options))),
+        default=st.session_state.batch_post_ids,
+        format_func=lambda post_id: labels.get(post_id, post_id),
+        max_selections=batch_analysis.MAX_BATCH_POSTS
+    )
+    st.session_state.batch_post_ids = batch_post_ids
+    st.session_state.batch_post_labels = {post_id: labels.get(post_id, post_id) for post_id in batch_post_ids}
     
-    for edge in edges:
-        G.add_edge(edge.get('source', ''), edge.get('target', ''))
+    if st.button("🚀 Run Batch Analysis", disabled=not batch_post_ids):
+        progress_bar = st.progress(0.0, text=f"Analysing {len(batch_post_ids)} posts...")
+        st.session_state.batch_results = batch_analysis.analyze_posts(
+            batch_post_ids, api_client, approx_threshold, centrality_accuracy,
+            progress=lambda done, total, post_id: progress_bar.progress(
+                done / total, text=f"Analysed {done} of {total} posts"
+            )
+        )
+        progress_bar.empty()
     
-    # Create plotly network
-    pos = nx.spring_layout(G)
+    results = st.session_state.get('batch_results')
+    if not results:
+        return None, None
     
-    edge_x = []
-    edge_y = []
-    for edge in G.edges():
-        x0, y0 = pos[edge[0]]
-        x1, y1 = pos[edge[1]]
-        edge_x.extend([x0, x1, None])
-        edge_y.extend([y0, y1, None])
+    st.markdown("### 📋 Post Comparison")
+    comparison = pd.DataFrame(batch_analysis.comparison_table(results))
+    comparison.insert(1, 'preview', comparison['post'].map(lambda post_id: labels.get(post_id, post_id)))
+    st.dataframe(comparison, use_container_width=True, hide_index=True)
+    
+    with st.spinner("Merging post networks..."):
+        merged = batch_analysis.merge_analyses(results, approx_threshold, centrality_accuracy)
+    if merged is None:
+        st.warning("⚠️ None of the selected posts could be analysed.")
+        return None, None
+    analysed = sum(1 for analysis in results.values() if analysis)
+    return f"🕸️ Merged Network of {analysed} Posts", merged
+
+def get_post_picker(posts_data=None):
+    """The synced post search index, or a throwaway index of the demo posts before the first sync."""
+    picker = post_index.get_post_index()
+    if not len(picker) and posts_data:
+        picker = post_index.PostSearchIndex()
+        picker.add_posts(posts_data)
+    return picker
 
-    edge_trace = go.Scatter(
-        x=edge_x, y=edge_y,
-        line=dict(width=0.5, color='#888'),
-        hoverinfo='none',
-        mode='lines')
+def get_community_sizes(analysis_data):
+    """Community sizes, preferring reported sizes over the (possibly truncated) member lists."""
+    communities = analysis_data.get('communities', [])
+    community_metrics = analysis_data.get('communityMetrics', [])
+    return [
+        community_metrics[i].get('size', len(community)) if i < len(community_metrics) else len(community)
+        for i, community in enumerate(communities)
+    ]
 
-    node_x = []
-    node_y = []
-    node_text = []
-    for node in G.nodes():
-        x, y = pos[node]
-        node_x.append(x)
-        node_y.append(y)
-        node_text.append(str(node))
+def parse_path_queries(text):
+    """Parse `source -> target` (or `source, target`) lines into node label pairs."""
+    pairs = []
+    for line in text.splitlines():
+        parts = [part.strip() for part in re.split(r"->|,|\t", line, maxsplit=1)]
+        if len(parts) == 2 and all(parts):
+            pairs.append((parts[0], parts[1]))
+    return pairs
 
-    node_trace = go.Scatter(
-        x=node_x, y=node_y,
-        mode='markers',
-        hoverinfo='text',
-        text=node_text,
-        marker=dict(
-            showscale=True,
-            colorscale='YlGnBu',
-            size=10,
-            colorbar=dict(
-                thickness=15,
-                title='Node Connections',
-                xanchor='left',
-                titleside='right'
-            )
-        ))
+def format_path_estimate(result):
+    """Landmark distance bounds of a path query as text."""
+    lower, upper = result.get('lowerBound'), result.get('upperBound')
+    if lower is None:
+        return ""
+    if not np.isfinite(lower):
+        return "unreachable"
+    if lower == upper:
+        return f"{lower:.0f}"
+    return f"{lower:.0f}–{upper:.0f}" if np.isfinite(upper) else f"≥ {lower:.0f}"
 
-    fig = go.Figure(data=[edge_trace, node_trace],
-                  layout=go.Layout(
-                      title='Network Graph (Fallback)',
-                      showlegend=False,
-                      hovermode='closest',
-                      margin=dict(b=20,l=5,r=5,t=40),
-                      xaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
-                      yaxis=dict(showgrid=False, zeroline=False, showticklabels=False))
-                  )
-    
+def render_webgl_network(nodes, edges, positions, fingerprint, layout_algorithm,
+                         node_size_metric, node_size_range, edge_width_range, show_labels):
+    """Draw the network with the WebGL Plotly renderer."""
+    fig = network_webgl.render_network_figure(
+        nodes,
+        edges,
+        positions,
+        fingerprint,
+        layout_algorithm,
+        size_metric=node_size_metric.lower(),
+        size_range=node_size_range,
+        width_range=edge_width_range,
+        show_labels=show_labels
+    )
     st.plotly_chart(fig, use_container_width=True)
 
 def get_mock_posts_data():
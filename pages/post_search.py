@@ -3,6 +3,11 @@ import pandas as pd
 from datetime import datetime, timedelta
 import plotly.express as px
 import plotly.graph_objects as go
+from analytics import cooccurrence, downsample, sync, topics
+from lazy_loader import lazy_module
+
+# The similarity index maps its files only when "More like this" is first used
+similarity = lazy_module("analytics.similarity")
 
 def render_post_search(api_client):
     """Render the post search page."""
@@ -86,10 +91,26 @@ def render_post_search(api_client):
                 placeholder="Filter by hashtag...",
                 help="Filter posts containing specific hashtag"
             )
+            
+            related_tags = cooccurrence.get_cooccurrence().suggest(hashtag_filter.replace(',', ' ').split(), 5)
+            if related_tags:
+                st.caption(f"🏷️ Often used with: {' '.join(related_tags)}")
+        
+        topic_model = topics.get_topic_model()
+        topic_options = {"All": None}
+        for topic in topic_model.summary():
+            topic_options[f"{topic['name']} ({topic['count']})"] = topic['topic']
+        
+        topic_filter = st.selectbox(
+            "🧩 Topic:",
+            list(topic_options.keys()),
+            help="Filter posts by detected topic cluster"
+        )
     
-    # Load posts with spinner
+    # Load posts with spinner; reruns within MIN_SYNC_SECONDS reuse the last sync
     with st.spinner("Loading posts..."):
-        posts_data = api_client.get_posts()
+        sync.sync_if_stale(api_client)
+        posts_data = sync.posts_log.records()
     
     if not posts_data:
         st.warning("⚠️ Unable to load posts. Please check your backend connection.")
@@ -133,6 +154,10 @@ def render_post_search(api_client):
     if hashtag_filter:
         df = df[df['hashtags'].astype(str).str.contains(hashtag_filter, case=False, na=False)]
     
+    # Apply topic filter
+    if topic_options[topic_filter] is not None:
+        df = df[df['id'].map(topic_model.labels) == topic_options[topic_filter]]
+    
     # Apply date range filter
     if date_range != "All Time":
         now = datetime.now()
@@ -261,10 +286,47 @@ def render_post_search(api_client):
                 st.write(f"**Type:** {post.get('postType', 'Unknown')}")
                 st.write(f"**Platform:** {post.get('platform', 'Facebook')}")
                 
+                post_topic = topic_model.topic_of(post.get('id'))
+                if post_topic is not None:
+                    st.write(f"**Topic:** {topic_model.topic_name(post_topic)}")
+                
                 # Button to view comments
                 if st.button(f"💬 View Comments", key=f"comments_{post.get('id')}"):
                     st.session_state.selected_post_id = post.get('id')
                     st.session_state.show_comments = True
+                
+                if st.button("🔎 More like this", key=f"similar_{post.get('id')}"):
+                    st.session_state.similar_post_id = post.get('id')
+    
+    # Similar posts section
+    if st.session_state.get('similar_post_id'):
+        st.markdown("---")
+        st.subheader(f"🔎 Posts similar to {st.session_state.similar_post_id}")
+        
+        with st.spinner("Searching similar posts..."):
+            similar_posts = similarity.get_similarity_index().similar_posts(
+                [st.session_state.similar_post_id]
+            )[st.session_state.similar_post_id]
+        
+        if similar_posts:
+            posts_by_id = {post.get('id'): post for post in posts_data if post.get('id')}
+            rows = []
+            for match in similar_posts:
+                post = posts_by_id.get(match['id'], {})
+                content = post.get('content', '')
+                rows.append({
+                    'Similarity': round(match['score'], 3),
+                    'ID': match['id'],
+                    'Author': post.get('author', 'Unknown'),
+                    'Content': content[:100] + "..." if len(content) > 100 else content
+                })
+            st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+        else:
+            st.info("No similar posts found. The post may not be indexed yet.")
+        
+        if st.button("❌ Close Similar Posts"):
+            st.session_state.similar_post_id = None
+            st.rerun()
     
     # Comments section with enhanced display
     if st.session_state.get('show_comments', False) and st.session_state.get('selected_post_id'):
@@ -356,10 +418,13 @@ def render_post_search(api_client):
             if 'timestamp' in df.columns:
                 df['date'] = pd.to_datetime(df['timestamp']).dt.date
                 daily_posts = df['date'].value_counts().sort_index()
+                daily_posts = downsample.downsample_frame(
+                    daily_posts.rename('count').rename_axis('date').reset_index(), 'date', 'count'
+                )
                 
                 fig_timeline = px.line(
-                    x=daily_posts.index,
-                    y=daily_posts.values,
+                    x=daily_posts['date'],
+                    y=daily_posts['count'],
                     title="Posts Over Time",
                     labels={'x': 'Date', 'y': 'Number of Posts'}
                 )
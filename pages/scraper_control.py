@@ -3,6 +3,14 @@ import time
 from datetime import datetime, timedelta
 import json
 import pandas as pd
+import refresh
+from lazy_loader import lazy_module
+
+# Word frequency tables (and scikit-learn) load only when a scrape is started
+word_frequency = lazy_module("analytics.word_frequency")
+
+# Scraper status is read (and auto-refreshed) more often than the other shared values
+SCRAPER_REFRESH_SECONDS = 10
 
 def render_scraper_control(api_client):
     """Render the scraper control page."""
@@ -12,18 +20,20 @@ def render_scraper_control(api_client):
     
     # Connection status with enhanced display
     col1, col2, col3 = st.columns([1, 2, 1])
+    snapshot = refresh.snapshot(api_client, SCRAPER_REFRESH_SECONDS)
     with col1:
-        if api_client.test_connection():
+        if snapshot is not None and snapshot.online:
             st.markdown('<div class="status-connected">🟢 Connected</div>', unsafe_allow_html=True)
         else:
             st.markdown('<div class="status-disconnected">🔴 Disconnected</div>', unsafe_allow_html=True)
     
     with col2:
         st.caption(f"Backend: {api_client.base_url}")
-        st.caption(f"Last check: {datetime.now().strftime('%H:%M:%S')}")
+        st.caption(f"Last check: {refresh.format_age(snapshot)}")
     
     with col3:
         if st.button("🔄 Refresh Status"):
+            refresh.invalidate(api_client)
             st.rerun()
     
     st.markdown("---")
@@ -33,7 +43,7 @@ def render_scraper_control(api_client):
     
     # Get scraper status with enhanced error handling
     try:
-        status_data = api_client.get_scraper_status()
+        status_data = snapshot.scraper_status if snapshot is not None else None
         if not status_data:
             status_data = get_mock_scraper_status()
     except Exception as e:
@@ -200,12 +210,14 @@ def render_scraper_control(api_client):
                             
                             if result:
                                 st.success(f"✅ Scraper started successfully for keyword: '{keyword}'")
+                                word_frequency.get_word_frequency_tables().track_keyword(keyword)
                                 st.info(f"Session ID: {result.get('sessionId', 'N/A')}")
                                 
                                 # Show session details
                                 with st.expander("📋 Session Details"):
                                     st.json(result)
                                 
+                                refresh.invalidate(api_client)
                                 time.sleep(2)
                                 st.rerun()
                             else:
@@ -226,6 +238,7 @@ def render_scraper_control(api_client):
                     st.success("✅ Scraper stopped successfully!")
                 else:
                     st.warning("⚠️ Stop command sent (no confirmation available)")
+                refresh.invalidate(api_client)
                 time.sleep(1)
                 st.rerun()
             except Exception as e:
@@ -332,11 +345,10 @@ def render_scraper_control(api_client):
     col1, col2 = st.columns(2)
     
     with col1:
-        auto_refresh = st.checkbox("Enable auto-refresh (every 10 seconds)")
+        auto_refresh = st.checkbox(f"Enable auto-refresh (every {SCRAPER_REFRESH_SECONDS} seconds)")
         if auto_refresh:
             st.info("🔄 Auto-refresh enabled. The status will update automatically.")
-            time.sleep(10)
-            st.rerun()
+            refresh.schedule_rerun("scraper_auto_refresh", SCRAPER_REFRESH_SECONDS)
     
     with col2:
         if st.button("📊 Export Session Data"):
@@ -0,0 +1,197 @@
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, NamedTuple, Optional
+
+import streamlit as st
+from lazy_loader import lazy_module
+
+# The browser-side timer component is only loaded once auto-refresh is switched on
+autorefresh = lazy_module("streamlit_autorefresh")
+
+AUTO_REFRESH_SECONDS = 30
+POLL_SECONDS_ENV = "FBREAPER_POLL_SECONDS"
+MIN_POLL_SECONDS = 5
+# How long a page waits for the first poll of a backend, or for a requested refresh
+FIRST_POLL_TIMEOUT = 15
+# Pollers nobody has read from for this long stop; the next read restarts them
+IDLE_STOP_SECONDS = 600
+
+
+def default_poll_seconds() -> float:
+    """Poll interval from FBREAPER_POLL_SECONDS, defaulting to the auto-refresh interval."""
+    try:
+        return max(MIN_POLL_SECONDS, float(os.environ.get(POLL_SECONDS_ENV, AUTO_REFRESH_SECONDS)))
+    except ValueError:
+        return AUTO_REFRESH_SECONDS
+
+
+class BackendSnapshot(NamedTuple):
+    """One poll of the backend, shared read-only by every page and session."""
+    statistics: Optional[Dict]
+    scraper_status: Optional[Dict]
+    online: bool
+    error: Optional[str]
+    polled_at: datetime
+    generation: int
+    monotonic: float
+
+    @property
+    def age(self) -> float:
+        """Seconds since the poll finished."""
+        return time.monotonic() - self.monotonic
+
+
+class BackendPoller:
+    """Daemon thread polling one backend's statistics, scraper status and health.
+
+    Each poll builds a new immutable snapshot and swaps it in, so readers
+    never block on the backend or see a half-updated state. Readers can ask
+    for an early poll when the snapshot is older than they need; the thread
+    still makes at most one poll at a time.
+    """
+
+    def __init__(self, base_url: str, interval: float):
+        from api_client import APIClient
+
+        self.base_url = base_url
+        self.interval = interval
+        self.snapshot: Optional[BackendSnapshot] = None
+        self.last_read = time.monotonic()
+        # Number of polls started so far; each snapshot carries the number of the poll that built it
+        self._started = 0
+        self._client = APIClient(base_url, report_errors=False)
+        self._wake = threading.Event()
+        self._polled = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name=f"backend-poller {base_url}", daemon=True)
+        self._thread.start()
+
+    @property
+    def alive(self) -> bool:
+        return self._thread.is_alive()
+
+    def _publish(self, generation: int, statistics: Optional[Dict], scraper_status: Optional[Dict],
+                 online: bool, error: Optional[str]):
+        with self._polled:
+            self.snapshot = BackendSnapshot(
+                statistics, scraper_status, online, error, datetime.now(), generation, time.monotonic()
+            )
+            self._polled.notify_all()
+
+    def _poll(self, generation: int):
+        online = self._client.test_connection()
+        statistics = self._client.get_statistics()
+        error = self._client.last_error
+        scraper_status = self._client.get_scraper_status()
+        self._publish(generation, statistics, scraper_status, online, error or self._client.last_error)
+
+    def _run(self):
+        while time.monotonic() - self.last_read < IDLE_STOP_SECONDS:
+            # Cleared before polling, so a wake arriving during the poll triggers the next one
+            self._wake.clear()
+            with self._polled:
+                self._started += 1
+                generation = self._started
+            try:
+                self._poll(generation)
+            except Exception as e:
+                self._publish(generation, None, None, False, f"❌ Unexpected error: {str(e)}")
+            self._wake.wait(self.interval)
+
+    def read(self, max_age: Optional[float] = None) -> Optional[BackendSnapshot]:
+        """The latest snapshot, waiting for the first poll; asks for an early poll when older than `max_age`."""
+        self.last_read = time.monotonic()
+        with self._polled:
+            self._polled.wait_for(lambda: self.snapshot is not None, FIRST_POLL_TIMEOUT)
+            current = self.snapshot
+        if current is not None and max_age is not None and current.age > max_age:
+            self._wake.set()
+        return current
+
+    def refresh_now(self, timeout: float = FIRST_POLL_TIMEOUT) -> Optional[BackendSnapshot]:
+        """Poll immediately and wait (up to `timeout`) for the new snapshot.
+
+        A poll already in progress may predate the request, so this waits for
+        the snapshot of a poll started after it.
+        """
+        with self._polled:
+            requested = self._started + 1
+            self._wake.set()
+            self._polled.wait_for(
+                lambda: self.snapshot is not None and self.snapshot.generation >= requested, timeout
+            )
+            return self.snapshot
+
+    def set_interval(self, seconds: float):
+        self.interval = max(MIN_POLL_SECONDS, float(seconds))
+        self._wake.set()
+
+
+_pollers: Dict[str, BackendPoller] = {}
+_pollers_lock = threading.Lock()
+
+
+def get_poller(api_client) -> BackendPoller:
+    """Return the process-wide poller of a session's backend, starting it if needed."""
+    with _pollers_lock:
+        poller = _pollers.get(api_client.base_url)
+        if poller is None or not poller.alive:
+            interval = poller.interval if poller is not None else default_poll_seconds()
+            poller = _pollers[api_client.base_url] = BackendPoller(api_client.base_url, interval)
+        return poller
+
+
+def snapshot(api_client, max_age: Optional[float] = None) -> Optional[BackendSnapshot]:
+    """The shared backend snapshot for a session; see `BackendPoller.read`."""
+    return get_poller(api_client).read(max_age)
+
+
+def statistics(api_client, max_age: Optional[float] = None) -> Optional[Dict]:
+    current = snapshot(api_client, max_age)
+    return current.statistics if current is not None else None
+
+
+def scraper_status(api_client, max_age: Optional[float] = None) -> Optional[Dict]:
+    current = snapshot(api_client, max_age)
+    return current.scraper_status if current is not None else None
+
+
+def backend_online(api_client, max_age: Optional[float] = None) -> bool:
+    current = snapshot(api_client, max_age)
+    return current is not None and current.online
+
+
+def invalidate(api_client):
+    """Poll the backend now, e.g. for a manual refresh, waiting for the new snapshot."""
+    get_poller(api_client).refresh_now()
+
+
+def format_age(current: Optional[BackendSnapshot]) -> str:
+    """'HH:MM:SS (Ns ago)' for a snapshot, so pages can show how stale it is."""
+    if current is None:
+        return "never"
+    return f"{current.polled_at.strftime('%H:%M:%S')} ({current.age:.0f}s ago)"
+
+
+def schedule_rerun(key: str, seconds: float = AUTO_REFRESH_SECONDS):
+    """Rerun this session after `seconds` from a browser-side timer.
+
+    Unlike sleeping in the script, the run finishes immediately and widgets
+    stay responsive; the rerun reads the shared snapshot, so it never
+    reaches the backend itself.
+    """
+    autorefresh.st_autorefresh(interval=int(seconds * 1000), key=key)
+
+
+def is_scheduled_rerun(key: str) -> bool:
+    """Whether this run was started by the `schedule_rerun` timer `key` rather than by the user.
+
+    The timer's tick count is kept in session state under its key, so a run
+    in which it advanced is a timer tick.
+    """
+    count = st.session_state.get(key)
+    seen_key = f"{key}_seen"
+    ticked = count is not None and count != st.session_state.get(seen_key)
+    st.session_state[seen_key] = count
+    return ticked
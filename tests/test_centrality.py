@@ -0,0 +1,61 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from analytics import centrality
+
+
+def _graphs():
+    # Two components plus an isolated node, and more nodes than one source batch.
+    split = nx.disjoint_union(nx.gnp_random_graph(120, 0.05, seed=1), nx.gnp_random_graph(30, 0.1, seed=2))
+    split.add_node(len(split))
+    return [nx.karate_club_graph(), split]
+
+
+def _adjacency(graph):
+    return nx.to_scipy_sparse_array(graph, nodelist=range(len(graph)), weight=None, format='csr')
+
+
+def _ordered(values, n):
+    return np.array([values[node] for node in range(n)])
+
+
+@pytest.mark.parametrize('graph', _graphs())
+def test_exact_betweenness_and_closeness_match_networkx(graph):
+    n = len(graph)
+    betweenness, closeness = centrality.path_centralities(_adjacency(graph))
+    np.testing.assert_allclose(betweenness, _ordered(nx.betweenness_centrality(graph), n), atol=1e-12)
+    np.testing.assert_allclose(closeness, _ordered(nx.harmonic_centrality(graph), n) / (n - 1), atol=1e-12)
+
+
+def test_parallel_betweenness_matches_networkx_and_reports_progress(monkeypatch):
+    graph = _graphs()[1]
+    n = len(graph)
+    monkeypatch.setattr(centrality, 'MAX_WORKERS', 2)
+    monkeypatch.setattr(centrality, 'PARALLEL_MIN_WORK', 0)
+    reports = []
+    betweenness, _ = centrality.path_centralities(_adjacency(graph), progress=reports.append)
+    np.testing.assert_allclose(betweenness, _ordered(nx.betweenness_centrality(graph), n), atol=1e-12)
+    assert len(reports) == 2 * centrality.CHUNKS_PER_WORKER
+    assert reports[-1] == pytest.approx(1.0)
+
+
+def test_sampled_betweenness_tracks_exact():
+    graph = nx.barabasi_albert_graph(300, 3, seed=3)
+    exact = _ordered(nx.betweenness_centrality(graph), len(graph))
+    sampled, _ = centrality.path_centralities(_adjacency(graph), pivots=150)
+    assert np.corrcoef(exact, sampled)[0, 1] > 0.95
+
+
+def test_pagerank_matches_networkx():
+    graph = nx.karate_club_graph()
+    expected = _ordered(nx.pagerank(graph, weight=None, tol=1e-10), len(graph))
+    np.testing.assert_allclose(centrality.pagerank(_adjacency(graph), tol=1e-10), expected, atol=1e-6)
+
+
+def test_cancelled_progress_stops_computation():
+    def cancel(done):
+        raise InterruptedError
+
+    with pytest.raises(InterruptedError):
+        centrality.path_centralities(_adjacency(_graphs()[1]), progress=cancel)
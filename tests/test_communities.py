@@ -0,0 +1,45 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from analytics import communities
+
+
+@pytest.fixture
+def karate():
+    graph = nx.karate_club_graph()
+    return graph, nx.to_scipy_sparse_array(graph, weight=None, format='csr')
+
+
+def _partition(labels):
+    return [set(np.flatnonzero(labels == label).tolist()) for label in np.unique(labels)]
+
+
+def test_modularity_matches_networkx(karate):
+    graph, adjacency = karate
+    labels = communities.louvain(adjacency)
+    expected = nx.community.modularity(graph, _partition(labels), weight=None)
+    assert communities.modularity(adjacency, labels) == pytest.approx(expected)
+
+
+def test_louvain_matches_networkx_quality(karate):
+    graph, adjacency = karate
+    labels = communities.louvain(adjacency)
+    reference = max(
+        nx.community.modularity(graph, nx.community.louvain_communities(graph, weight=None, seed=seed), weight=None)
+        for seed in range(5)
+    )
+    assert communities.modularity(adjacency, labels) >= reference - 0.01
+
+
+def test_louvain_warm_start_keeps_quality(karate):
+    _, adjacency = karate
+    labels = communities.louvain(adjacency)
+    warm = communities.louvain(adjacency, initial=labels, active=np.array([0, 33]))
+    assert communities.modularity(adjacency, warm) >= communities.modularity(adjacency, labels) - 1e-9
+
+
+def test_louvain_labels_are_ordered_by_size(karate):
+    _, adjacency = karate
+    sizes = np.bincount(communities.louvain(adjacency))
+    assert list(sizes) == sorted(sizes, reverse=True)
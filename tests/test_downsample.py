@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics import downsample
+
+
+@pytest.fixture
+def series():
+    rng = np.random.default_rng(0)
+    y = np.cumsum(rng.normal(size=5000))
+    y[1234] += 80
+    y[3210] -= 80
+    return np.arange(len(y)), y
+
+
+@pytest.mark.parametrize('method', downsample.METHODS)
+def test_keeps_endpoints_and_budget(series, method):
+    x, y = series
+    indices = downsample.downsample_indices(x, y, 200, method)
+    assert indices[0] == 0 and indices[-1] == len(y) - 1
+    assert len(indices) <= 200
+    assert np.all(np.diff(indices) > 0)
+
+
+@pytest.mark.parametrize('method', downsample.METHODS)
+def test_keeps_global_extrema(series, method):
+    x, y = series
+    indices = downsample.downsample_indices(x, y, 200, method)
+    assert np.argmax(y) in indices
+    assert np.argmin(y) in indices
+
+
+def test_min_max_keeps_every_bucket_extreme(series):
+    _, y = series
+    indices = set(downsample.min_max_indices(y, 200).tolist())
+    edges = np.linspace(1, len(y) - 1, (200 - 2) // 2 + 1).astype(np.int64)
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        assert lo + np.argmin(y[lo:hi]) in indices
+        assert lo + np.argmax(y[lo:hi]) in indices
+
+
+def test_short_series_untouched(series):
+    x, y = series
+    for method in downsample.METHODS:
+        assert list(downsample.downsample_indices(x[:50], y[:50], 200, method)) == list(range(50))
+
+
+def test_lttb_accepts_dates(series):
+    _, y = series
+    dates = pd.date_range('2026-01-01', periods=len(y), freq='h')
+    indices = downsample.lttb_indices(dates.to_numpy().astype(object), y, 100)
+    assert len(indices) == 100 and indices[0] == 0 and indices[-1] == len(y) - 1
+
+
+def test_unknown_method_rejected(series):
+    x, y = series
+    with pytest.raises(ValueError):
+        downsample.downsample_indices(x, y, 100, 'mean')
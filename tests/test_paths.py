@@ -0,0 +1,67 @@
+import itertools
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from analytics import paths
+
+
+@pytest.fixture(scope='module')
+def graph():
+    graph = nx.disjoint_union(nx.connected_watts_strogatz_graph(200, 4, 0.1, seed=5), nx.path_graph(6))
+    graph.add_node(len(graph))
+    return graph
+
+
+@pytest.fixture(scope='module')
+def index(graph):
+    adjacency = nx.to_scipy_sparse_array(graph, nodelist=range(len(graph)), weight=None, format='csr')
+    return paths.PathIndex(adjacency, [f"n{node}" for node in range(len(graph))], n_landmarks=8)
+
+
+def _pairs(graph, count=300, seed=7):
+    rng = np.random.default_rng(seed)
+    return [tuple(int(node) for node in rng.integers(0, len(graph), size=2)) for _ in range(count)]
+
+
+def test_bfs_distances_match_networkx(graph, index):
+    expected = nx.single_source_shortest_path_length(graph, 0)
+    distances = paths._bfs_distances(index.structure, 0)
+    for node in range(len(graph)):
+        assert distances[node] == expected.get(node, np.inf)
+
+
+def test_landmark_bounds_bracket_true_distance(graph, index):
+    for source, target in _pairs(graph):
+        lower, upper = index.estimate(source, target)
+        if not nx.has_path(graph, source, target):
+            assert (lower, upper) == (np.inf, np.inf)
+            continue
+        distance = nx.shortest_path_length(graph, source, target)
+        assert lower <= distance <= upper
+
+
+def test_bidirectional_bfs_finds_shortest_paths(graph, index):
+    for source, target in _pairs(graph):
+        path = index._bidirectional(source, target)
+        if not nx.has_path(graph, source, target):
+            assert path is None
+            continue
+        assert len(path) - 1 == nx.shortest_path_length(graph, source, target)
+        assert path[0] == source and path[-1] == target
+        assert all(graph.has_edge(a, b) for a, b in zip(path, path[1:]))
+
+
+def test_query_by_label(graph, index):
+    result = index.query('n0', 'n100')
+    assert result['found']
+    assert result['length'] == nx.shortest_path_length(graph, 0, 100)
+    assert result['lowerBound'] <= result['length'] <= result['upperBound']
+    assert not index.query('n0', f"n{len(graph) - 1}")['found']
+    assert 'error' in index.query('n0', 'missing')
+
+
+def test_query_many_keeps_input_order(index):
+    pairs = list(itertools.islice(itertools.combinations(['n0', 'n5', 'n50', 'n150', 'n201'], 2), 8))
+    assert index.query_many(pairs) == [index.query(source, target) for source, target in pairs]
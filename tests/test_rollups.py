@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from analytics import rollups
+
+BASE = datetime(2026, 1, 1)
+
+
+def _records(kind, count, seed):
+    rng = np.random.default_rng(seed)
+    items = []
+    for i in range(count):
+        item = {
+            'id': f"{kind}-{i}",
+            'timestamp': (BASE + timedelta(seconds=int(rng.integers(0, 40 * rollups.DAY)))).isoformat(),
+            'sentiment': rng.choice(['POSITIVE', 'neutral', 'Negative', None])
+        }
+        if kind == 'posts':
+            item.update({field: int(rng.integers(0, 50)) for field in rollups.ENGAGEMENT})
+        items.append(item)
+    return items
+
+
+@pytest.fixture(scope='module')
+def data():
+    posts, comments = _records('posts', 3000, 1), _records('comments', 2000, 2)
+    table = rollups.TimeRollups()
+    # Several batches, so buckets are both created and topped up.
+    for batch in range(0, len(posts), 700):
+        table.add_posts(posts[batch:batch + 700])
+    for batch in range(0, len(comments), 900):
+        table.add_comments(comments[batch:batch + 900])
+    return table, posts, comments
+
+
+def _raw_totals(posts, comments, start, end):
+    """Sum every record in an hour overlapping [start, end), one record at a time."""
+    first, last = start.replace(minute=0, second=0, microsecond=0), _hour_ceiling(end)
+    totals = dict.fromkeys(rollups.METRICS, 0)
+    for kind, items in (('posts', posts), ('comments', comments)):
+        for item in items:
+            if first <= datetime.fromisoformat(item['timestamp']) < last:
+                for metric, value in zip(rollups.METRICS, rollups._metric_row(item, kind)):
+                    totals[metric] += value
+    return totals
+
+
+def _hour_ceiling(moment):
+    floor = moment.replace(minute=0, second=0, microsecond=0)
+    return floor if floor == moment else floor + timedelta(hours=1)
+
+
+@pytest.mark.parametrize('start, end', [
+    (BASE, BASE + timedelta(days=40)),
+    (BASE + timedelta(hours=5), BASE + timedelta(days=3, hours=7)),
+    (BASE + timedelta(days=2, minutes=30), BASE + timedelta(days=2, hours=20, minutes=10)),
+    (BASE + timedelta(days=9, hours=23), BASE + timedelta(days=10, hours=1)),
+    (BASE - timedelta(days=5), BASE + timedelta(days=1)),
+])
+def test_totals_match_raw_sum(data, start, end):
+    table, posts, comments = data
+    assert table.totals(start, end) == _raw_totals(posts, comments, start, end)
+
+
+def test_series_sums_to_totals(data):
+    table, _, _ = data
+    start, end = BASE + timedelta(days=3), BASE + timedelta(days=20)
+    totals = table.totals(start, end)
+    for resolution in rollups.RESOLUTIONS:
+        series = table.series(start, end, resolution)
+        assert {metric: int(series[metric].sum()) for metric in rollups.METRICS} == totals
+
+
+def test_series_fills_empty_buckets():
+    table = rollups.TimeRollups()
+    table.add_posts([{'timestamp': BASE.isoformat()}, {'timestamp': (BASE + timedelta(hours=3)).isoformat()}])
+    series = table.series(BASE, BASE + timedelta(days=1), 'hour')
+    assert list(series['posts']) == [1, 0, 0, 1]
+    assert table.time_range() == (BASE, BASE + timedelta(hours=4))